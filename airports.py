@@ -0,0 +1,19 @@
+"""Reference data: airports served (IATA code -> city) and airlines (IATA code -> name)."""
+
+AIRPORTS = {
+    "LHR": "London", "LGW": "London", "JFK": "New York", "EWR": "Newark", "LAX": "Los Angeles",
+    "SFO": "San Francisco", "ORD": "Chicago", "ATL": "Atlanta", "DFW": "Dallas", "MIA": "Miami",
+    "SEA": "Seattle", "BOS": "Boston", "YYZ": "Toronto", "MEX": "Mexico City", "GRU": "Sao Paulo",
+    "CDG": "Paris", "AMS": "Amsterdam", "FRA": "Frankfurt", "MUC": "Munich", "BER": "Berlin",
+    "MAD": "Madrid", "BCN": "Barcelona", "FCO": "Rome", "ZRH": "Zurich", "IST": "Istanbul",
+    "DXB": "Dubai", "DOH": "Doha", "AUH": "Abu Dhabi", "DEL": "Delhi", "BOM": "Mumbai",
+    "SIN": "Singapore", "HKG": "Hong Kong", "BKK": "Bangkok", "HND": "Tokyo", "NRT": "Tokyo",
+    "ICN": "Seoul", "PEK": "Beijing", "PVG": "Shanghai", "SYD": "Sydney", "MEL": "Melbourne",
+    "JNB": "Johannesburg", "CAI": "Cairo",
+}
+AIRLINES = {
+    "BA": "British Airways", "LH": "Lufthansa", "EK": "Emirates", "QR": "Qatar Airways",
+    "AF": "Air France", "DL": "Delta Airlines", "UA": "United Airlines", "AA": "American Airlines",
+    "SQ": "Singapore Airlines", "KL": "KLM", "TK": "Turkish Airlines", "QF": "Qantas",
+    "NH": "All Nippon Airways", "CX": "Cathay Pacific", "AI": "Air India",
+}
@@ -1,18 +1,154 @@
+import sys
+import threading
+
+import click
 from flask import Flask
 from blueprints.flights.flights import flights_bp
-from blueprints.flight_reviews.flight_reviews import reviews_bp
+from blueprints.flight_reviews.flight_reviews import reviews_bp, migrate_embedded_reviews
 from blueprints.auth.auth import auth_bp
 from blueprints.users.users import users_bp
+from blueprints.itineraries.itineraries import itineraries_bp
+from blueprints.fares.fares import fares_bp
+from blueprints.events.events import events_bp
+from blueprints.suggest.suggest import suggest_bp
 from flask_cors import CORS
+from indexes import ensure_indexes, check_search_plans
+from pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from ratings import rebuild_ratings
+from fare_calendar import rebuild_fare_calendar
+from holds import hold_reaper
+from revocation import migrate_legacy_revocations
+from route_graph import route_graph
+from suggest import suggest_index
+from exports import (build_export_query, export_cursor, summary_cursor, columns_for, csv_chunks, ndjson_lines,
+                     EXPORT_FORMATS, SUMMARY_GROUPS)
+import globalaccess
+from json_provider import FastJSONProvider
+import metrics
+import responses
 
 app = Flask(__name__)
-CORS(app, supports_credentials=True)
+app.json = FastJSONProvider(app)
+CORS(app, supports_credentials=True, expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER])
 
 # ✅ Register blueprints
 app.register_blueprint(flights_bp)
 app.register_blueprint(reviews_bp)
 app.register_blueprint(auth_bp)
 app.register_blueprint(users_bp)
+app.register_blueprint(itineraries_bp)
+app.register_blueprint(fares_bp)
+app.register_blueprint(events_bp)
+app.register_blueprint(suggest_bp)
+
+# ✅ Per-route latency / status counters and Mongo command timings at /metrics
+metrics.init_app(app)
+
+# ✅ ETag / 304 and Cache-Control on GETs, gzip or brotli for large bodies
+responses.init_app(app)
+
+# ✅ Make sure the indexes exist before the first request each process serves.
+# Done lazily rather than at import so no connection is opened before a pre-fork server forks.
+_bootstrap_lock = threading.Lock()
+_bootstrapped = False
+
+@app.before_request
+def bootstrap_once():
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return
+        try:
+            ensure_indexes()
+        except Exception:
+            app.logger.exception("Index bootstrap failed; serving without it (run 'flask ensure-indexes')")
+        # Every worker reaps, so holds left by a process that went away still lapse
+        hold_reaper.start()
+        # Load the itinerary graph in the background; /itineraries answers 503 until it is ready
+        route_graph.warm()
+        suggest_index.warm()  # likewise /suggest
+        _bootstrapped = True
+
+@app.cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Create (or update) every index the app relies on"""
+    failures = ensure_indexes()
+    for collection, name, message in failures:
+        click.echo(f"FAILED: {collection}.{name}: {message}", err=True)
+    if failures:
+        sys.exit(1)
+    click.echo("Indexes are up to date")
+
+@app.cli.command('check-indexes')
+def check_indexes_command():
+    """Fail if a common flight search shape would run as a collection scan"""
+    failures = check_search_plans()
+    for description, query, sort in failures:
+        click.echo(f"COLLSCAN: {description} query={query} sort={sort}", err=True)
+    if failures:
+        sys.exit(1)
+    click.echo("All search shapes are index-backed")
+
+@app.cli.command('migrate-reviews')
+def migrate_reviews_command():
+    """Move embedded flight reviews into the reviews collection"""
+    migrated = migrate_embedded_reviews()
+    click.echo(f"Migrated {migrated} reviews (run 'flask rebuild-ratings' to refresh the rating aggregates)")
+
+@app.cli.command('migrate-blacklist')
+def migrate_blacklist_command():
+    """Rewrite pre-hash blacklist rows ({token: ...}) in the token-hash format revocations are checked against"""
+    migrated = migrate_legacy_revocations()
+    click.echo(f"Migrated {migrated} revoked tokens")
+
+@app.cli.command('rebuild-ratings')
+def rebuild_ratings_command():
+    """Recompute every flight's rating aggregate from the reviews collection"""
+    rebuilt = rebuild_ratings()
+    click.echo(f"Rebuilt ratings for {rebuilt} flights")
+
+@app.cli.command('rebuild-fare-calendar')
+def rebuild_fare_calendar_command():
+    """Recompute the per-route, per-day fare summary from db.flights"""
+    buckets = rebuild_fare_calendar()
+    click.echo(f"Fare calendar has {buckets} route/day buckets")
+
+@app.cli.command('reap-holds')
+def reap_holds_command():
+    """Return the seats of every lapsed seat hold now (the server does this every few seconds)"""
+    total = 0
+    while True:
+        reaped = hold_reaper.reap_once()
+        total += reaped
+        if reaped < hold_reaper.batch:
+            break
+    click.echo(f"Expired {total} seat holds")
+
+@app.cli.command('export-bookings')
+@click.option('--format', 'export_format', type=click.Choice(EXPORT_FORMATS), default='csv', show_default=True)
+@click.option('--from', 'start', help="First booking day, YYYY-MM-DD (UTC)")
+@click.option('--to', 'end', help="Last booking day, YYYY-MM-DD (UTC, inclusive)")
+@click.option('--flight', 'flight_number', help="Only bookings on this flight")
+@click.option('--group-by', type=click.Choice(list(SUMMARY_GROUPS)), help="Write bookings per flight, day or class instead of rows")
+@click.option('--output', '-o', default='-', show_default=True, help="File to write ('-' for stdout)")
+def export_bookings_command(export_format, start, end, flight_number, group_by, output):
+    """Stream bookings (or a summary of them) as CSV or NDJSON without loading them into memory"""
+    try:
+        query = build_export_query(start, end, flight_number)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    bookings = globalaccess.db.bookings
+    cursor = summary_cursor(bookings, query, group_by) if group_by else export_cursor(bookings, query)
+    chunks = csv_chunks(cursor, columns_for(group_by)) if export_format == 'csv' else ndjson_lines(cursor)
+    out = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8', newline='')
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
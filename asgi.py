@@ -0,0 +1,67 @@
+"""ASGI entry point: the flights, reviews, auth, users and flight event routes as coroutines on AsyncMongoClient.
+
+    hypercorn asgi:app --bind 0.0.0.0:5001 --workers 4
+
+One event loop per worker serves every open connection, so concurrency is no
+longer capped by a thread count. Handlers await the async Mongo client; bcrypt
+and the flight_changed subscribers run in async_mongo's offload pool. The
+caches, revocation list and signals are the same objects the Flask app uses.
+Flight event streams (SSE) are served here without a thread per connection.
+"""
+import re
+
+from quart import Quart
+from quart.json.provider import DefaultJSONProvider
+from quart_cors import cors
+
+import async_mongo
+import metrics
+import responses
+from json_provider import FastJSONMixin
+from passwords import hasher
+from holds import hold_reaper
+from blueprints.flights.flights_async import flights_bp
+from blueprints.flight_reviews.flight_reviews_async import reviews_bp
+from blueprints.auth.auth_async import auth_bp
+from blueprints.users.users_async import users_bp
+from blueprints.events.events_async import events_bp
+from indexes import ensure_indexes
+from pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+
+class QuartFastJSONProvider(FastJSONMixin, DefaultJSONProvider):
+    pass
+
+app = Quart(__name__)
+app.json = QuartFastJSONProvider(app)
+# Same policy as flask_cors' CORS(app, supports_credentials=True) in app.py: any origin is
+# echoed back (a literal "*" can't be combined with credentials) and any request header allowed
+app = cors(app, allow_origin=re.compile(r".*"), allow_credentials=True, allow_headers=["*"],
+           expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER])
+
+app.register_blueprint(flights_bp)
+app.register_blueprint(reviews_bp)
+app.register_blueprint(auth_bp)
+app.register_blueprint(users_bp)
+app.register_blueprint(events_bp)
+
+metrics.init_asgi_app(app)
+responses.init_asgi_app(app)
+
+@app.before_serving
+async def startup():
+    # The async client binds to the running loop, so it is created here rather than at import
+    async_mongo.connect()
+    try:
+        await async_mongo.run_sync(ensure_indexes)
+    except Exception:
+        app.logger.exception("Index bootstrap failed; serving without it (run 'flask ensure-indexes')")
+    hold_reaper.start()
+
+@app.after_serving
+async def shutdown():
+    hold_reaper.stop()
+    await async_mongo.close()
+    hasher.shutdown()
+
+if __name__ == '__main__':
+    app.run(port=5001)
@@ -0,0 +1,41 @@
+from quart import request, jsonify, make_response, g
+import jwt
+from functools import wraps
+import globalaccess
+import async_mongo
+from revocation import revocations
+
+# Coroutine versions of decorators.py for the Quart blueprints (asgi.py)
+
+def jwt_required(func):
+    @wraps(func)
+    async def jwt_required_wrapper(*args, **kwargs):
+        token = request.headers.get('x-access-token')
+        if not token:
+            return await make_response(jsonify({'message': 'Token is missing'}), 401)
+        try:
+            data = jwt.decode(token, globalaccess.SECRET_KEY, algorithms='HS256')
+        except Exception:
+            return await make_response(jsonify({'message': 'Token is invalid'}), 401)
+
+        if revocations.refresh_due():
+            await async_mongo.run_sync(revocations.refresh)
+        if revocations.is_revoked(token):
+            return await make_response(jsonify({'message': 'Token is blacklist invalid'}), 401)
+
+        g.token = token
+        g.jwt_claims = data
+        return await func(*args, **kwargs)
+    return jwt_required_wrapper
+
+def admin_required(func):
+    @wraps(func)
+    async def admin_required_wrapper(*args, **kwargs):
+        claims = g.get('jwt_claims')
+        if claims is None:
+            return await make_response(jsonify({'message': 'Token is missing'}), 401)
+        if claims.get('admin'):
+            return await func(*args, **kwargs)
+        else:
+            return await make_response(jsonify({'message': 'Admin access required'}), 403)
+    return admin_required_wrapper
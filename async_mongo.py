@@ -0,0 +1,45 @@
+"""Async Mongo handles and helpers for the ASGI app (asgi.py).
+
+The AsyncMongoClient is created when the server's event loop starts (see
+asgi.py), so `db` is None until then. Blocking work - bcrypt, and the
+flight_changed subscribers, which use the synchronous client - is handed to a
+thread pool with run_sync so it never stalls the event loop.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import globalaccess
+import signals
+
+client = None
+db = None
+
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('ASYNC_EXECUTOR_WORKERS', 16)),
+                               thread_name_prefix='async-offload')
+
+
+def connect(uri=None, database=None, **overrides):
+    global client, db
+    client = globalaccess.create_async_client(uri, **overrides)
+    db = client[database or globalaccess.MONGO_DB]
+    return db
+
+
+async def close():
+    global client, db
+    if client is not None:
+        await client.close()
+    client = db = None
+
+
+async def run_sync(func, *args, **kwargs):
+    """Run a blocking call in the offload pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def send_flight_changed(flight_number, changes=None, **kwargs):
+    """signals.send_flight_changed() off the event loop; its subscribers may query Mongo synchronously"""
+    await run_sync(signals.send_flight_changed, flight_number, changes=changes, **kwargs)
@@ -0,0 +1,180 @@
+"""Sync (Flask, thread per connection) vs async (Quart on AsyncMongoClient) at high concurrency.
+
+Starts both servers against the same database (needs a real mongod in
+MONGO_URI, since two processes must share it), then opens N keep-alive
+connections per level and drives a read mix of flight searches and flight
+details through each server in turn. Reports req/s, latency percentiles and
+errors side by side. Already running servers can be given with --sync-url /
+--async-url instead.
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/async_bench.py --concurrency 50,500,2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+
+from common import ROOT, use_database, percentile
+from loadtest import synthetic_catalog
+
+DATABASE = "flight_booking_bench"
+
+
+##################################### SERVERS #####################################
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind):
+    port = _free_port()
+    if kind == "sync":
+        command = [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--with-threads"]
+    else:
+        command = [sys.executable, "-m", "hypercorn", "asgi:app", "--bind", f"127.0.0.1:{port}"]
+    process = subprocess.Popen(command, cwd=ROOT, env=dict(os.environ, MONGO_DB=DATABASE),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f"{kind} server did not start: {' '.join(command)}")
+
+
+##################################### LOAD #####################################
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get("connection", "").lower() == "close"
+
+
+async def _connection(base_url, paths, deadline, latencies, errors, rng):
+    url = urllib.parse.urlsplit(base_url)
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(url.hostname, url.port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: keep-alive\r\n\r\n".encode())
+            await writer.drain()
+            status, closed = await asyncio.wait_for(_read_response(reader), timeout=30)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 500:
+                errors[0] += 1
+            if closed:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            errors[0] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def drive(base_url, paths, concurrency, duration, seed=3):
+    latencies, errors = [], [0]
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(_connection(base_url, paths, deadline, latencies, errors, random.Random(seed + i))
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def workload(flights, count=2000, seed=5):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        flight = rng.choice(flights)
+        if rng.random() < 0.6:
+            paths.append(f"/flights?departure_location={flight['departure_airport']}"
+                         f"&arrival_location={flight['arrival_airport']}&date={flight['departure_time'][:10]}")
+        else:
+            paths.append(f"/flights/{flight['flight_number']}")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--concurrency", default="50,500,2000", help="comma separated open connection counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per level and mode")
+    parser.add_argument("--sync-url", help="running Flask server (default: start one)")
+    parser.add_argument("--async-url", help="running ASGI server (default: start one)")
+    args = parser.parse_args()
+
+    if not os.environ.get("MONGO_URI"):
+        raise SystemExit("set MONGO_URI: both servers have to share one mongod")
+
+    flights = synthetic_catalog(args.flights)
+    db = use_database(DATABASE)
+    db.flights.insert_many(flights)
+    from indexes import ensure_indexes
+    ensure_indexes(db)
+    paths = workload(flights)
+
+    processes = []
+    urls = {}
+    for kind, url in (("sync", args.sync_url), ("async", args.async_url)):
+        if url is None:
+            process, url = start_server(kind)
+            processes.append(process)
+        urls[kind] = url
+
+    try:
+        print(f"flights={args.flights} duration={args.duration}s per run")
+        print(f"{'conns':>6} {'mode':<6}{'req':>9}{'err':>7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            for kind in ("sync", "async"):
+                # Short warm-up so caches and pools are equally hot for both modes
+                asyncio.run(drive(urls[kind], paths, min(concurrency, 20), 1.0))
+                row = asyncio.run(drive(urls[kind], paths, concurrency, args.duration))
+                print(f"{concurrency:>6} {kind:<6}{row['requests']:>9}{row['errors']:>7}{row['throughput']:>10.1f}"
+                      f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
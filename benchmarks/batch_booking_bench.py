@@ -0,0 +1,61 @@
+"""Compare a group booking made with POST /bookings/batch against a loop of POST /bookings.
+
+    python benchmarks/batch_booking_bench.py --groups 50 --group-size 20
+"""
+import argparse
+
+from common import use_database, backend_name, make_token, Timer
+
+db = use_database()
+
+from app import app  # noqa: E402
+
+
+def passenger(i):
+    return {
+        "passenger_name": f"Passenger {i}",
+        "passport_number": f"P{i:07d}",
+        "email": f"p{i}@example.com",
+        "phone_number": "+441234567890",
+        "seat_class": "Economy",
+        "contact_details": f"p{i}@example.com",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--group-size", type=int, default=20)
+    args = parser.parse_args()
+
+    seats = args.groups * args.group_size
+    db.flights.insert_many([
+        {"flight_number": "LOOP1", "seats_available": seats},
+        {"flight_number": "BATCH1", "seats_available": seats},
+    ])
+    client = app.test_client()
+    headers = {"x-access-token": make_token()}
+
+    with Timer() as loop:
+        for group in range(args.groups):
+            for i in range(args.group_size):
+                body = dict(passenger(group * args.group_size + i), flight_number="LOOP1")
+                assert client.post("/bookings", json=body, headers=headers).status_code == 201
+
+    with Timer() as batch:
+        for group in range(args.groups):
+            body = {"flight_number": "BATCH1",
+                    "passengers": [passenger(group * args.group_size + i) for i in range(args.group_size)]}
+            assert client.post("/bookings/batch", json=body, headers=headers).status_code == 201
+
+    print(f"backend={backend_name()} groups={args.groups} group_size={args.group_size}")
+    print(f"single loop: {seats / loop.elapsed:8.0f} bookings/s ({loop.elapsed:.2f}s)")
+    print(f"batch:       {seats / batch.elapsed:8.0f} bookings/s ({batch.elapsed:.2f}s)")
+    print(f"speedup:     {loop.elapsed / batch.elapsed:.1f}x")
+    for flight_number in ("LOOP1", "BATCH1"):
+        assert db.flights.find_one({"flight_number": flight_number})["seats_available"] == 0
+        assert db.bookings.count_documents({"flight_number": flight_number}) == seats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Shared setup for the benchmark scripts.
+
+Benchmarks run against a real mongod when MONGO_URI is set and against an
+in-memory mongomock database otherwise. use_database() must be called before
+anything that imports globalaccess.db collections (blueprints, inventory, ...).
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import globalaccess
+
+
+def use_database(name="flight_booking_bench"):
+    uri = os.environ.get("MONGO_URI")
+    if uri:
+        client = globalaccess.create_client(uri)
+    else:
+        import mongomock
+        _serialize_mongomock_writes(mongomock)
+        client = mongomock.MongoClient()
+    client.drop_database(name)
+    globalaccess.client = client
+    globalaccess.db = client[name]
+    return globalaccess.db
+
+
+_MONGOMOCK_WRITES = ("insert_one", "insert_many", "update_one", "update_many", "replace_one",
+                     "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete",
+                     "find_one_and_replace", "bulk_write")
+
+
+def _serialize_mongomock_writes(mongomock):
+    """mongomock applies updates as unlocked read-modify-write in Python, so unlike mongod a
+    single update is not atomic across threads. Serialize writes to get server semantics."""
+    import functools
+    import threading
+
+    if getattr(mongomock.Collection, "_bench_serialized", False):
+        return
+    lock = threading.RLock()
+
+    def serialized(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with lock:
+                return method(*args, **kwargs)
+        return wrapper
+
+    for name in _MONGOMOCK_WRITES:
+        setattr(mongomock.Collection, name, serialized(getattr(mongomock.Collection, name)))
+    mongomock.Collection._bench_serialized = True
+
+
+def backend_name():
+    return "mongod" if os.environ.get("MONGO_URI") else "mongomock"
+
+
+def make_token(username="bench", admin=False):
+    import datetime
+    import jwt
+    return jwt.encode({
+        'user': username,
+        'admin': admin,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, globalaccess.SECRET_KEY, algorithm='HS256')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,87 @@
+"""Bookings export throughput and memory, streamed vs materialized.
+
+Loads synthetic bookings, then for each size exports them through
+GET /bookings/export (CSV, NDJSON and a per-day summary) and, for comparison,
+the old way: list(find()) plus one JSON body. Reports rows/s, bytes and the
+peak Python heap during each export (tracemalloc).
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/export_bench.py --sizes 100000 1000000
+
+Streaming peak memory should stay flat as the size grows. mongomock sorts in
+memory, so without MONGO_URI its own copy of the result shows up in the peak.
+"""
+import argparse
+import datetime
+import json
+import random
+import tracemalloc
+import uuid
+
+from common import use_database, backend_name, make_token, Timer
+
+db = use_database()
+
+from app import app  # noqa: E402
+
+
+def load(count, rng, start_date, batch=20000):
+    for start in range(0, count, batch):
+        db.bookings.insert_many([{
+            "_id": str(uuid.uuid4()),
+            "flight_number": f"BX{rng.randrange(2000)}",
+            "seat_class": rng.choice(["Economy", "Premium Economy", "Business", "First Class"]),
+            "booking_time": datetime.datetime.combine(start_date, datetime.time()) + datetime.timedelta(
+                seconds=rng.randrange(90 * 86400)),
+            "user": f"user{rng.randrange(100000)}",
+            "passenger_name": "Bench Passenger",
+            "passport_number": "X0000000",
+            "email": "bench@example.com",
+            "phone_number": "+440000000000",
+            "contact_details": "bench@example.com",
+        } for _ in range(start, min(count, start + batch))])
+
+
+def measure(run):
+    tracemalloc.start()
+    with Timer() as timer:
+        size = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, timer.elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 40000])
+    args = parser.parse_args()
+
+    client = app.test_client()
+    headers = {"x-access-token": make_token("bench-admin", admin=True)}
+    rng = random.Random(9)
+    loaded = 0
+    print(f"backend={backend_name()}")
+    for size in sorted(args.sizes):
+        load(size - loaded, rng, datetime.date(2025, 6, 1))
+        loaded = size
+
+        def streamed(query):
+            def run():
+                response = client.get("/bookings/export" + query, headers=headers, buffered=False)
+                total = sum(len(chunk) for chunk in response.response)
+                response.close()
+                return total
+            return run
+
+        def materialized():
+            rows = list(db.bookings.find({}))
+            return len(json.dumps(rows, default=str))
+
+        for name, run in (("csv", streamed("?format=csv")), ("ndjson", streamed("?format=ndjson")),
+                          ("summary by day", streamed("?group_by=day")), ("list(find())", materialized)):
+            total, elapsed, peak = measure(run)
+            print(f"rows={size:>9,} {name:<15} {size / elapsed:>9,.0f} rows/s {total / 2 ** 20:>8.1f} MiB out "
+                  f"peak heap {peak / 2 ** 20:>7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Checkout contention on a hot flight, booking at the end vs holding seats first.
+
+Buyers race for a flight with fewer seats than buyers. Each one starts a
+checkout, spends --payment-ms paying (some abandon instead), then books.
+
+    book-at-end   seats are only taken by the booking, so a buyer can pay and still fail
+    hold          a hold is taken when checkout starts; paying buyers book from it and
+                  abandoned holds lapse and are returned by the reaper
+
+Reported per mode: buyers failed after paying, buyers turned away before paying,
+operations on the flight document in the post-payment step (with holds that
+step only updates the buyer's own hold), total writes to the flight document
+and, against a real mongod, the server's writeConflicts counter. Both runs
+check seats_left + bookings == seats.
+
+    python benchmarks/hold_contention_bench.py --buyers 2000 --seats 500 --threads 64
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+import datetime
+
+from common import use_database, backend_name, Timer
+
+db = use_database()
+
+from inventory import reserve_seats, release_seats, SeatsUnavailable  # noqa: E402
+from holds import create_hold, take_from_hold, HoldReaper, HoldUnavailable  # noqa: E402
+from signals import flight_changed  # noqa: E402
+from blueprints.flights.flights import bookings  # noqa: E402
+
+FLIGHT = "HOLD1"
+
+
+def write_conflicts():
+    try:
+        return db.command("serverStatus")["metrics"]["operation"]["writeConflicts"]
+    except Exception:
+        return None  # mongomock, or no serverStatus privilege
+
+
+def book(flight_number, user):
+    bookings.insert_one({"_id": str(uuid.uuid4()), "flight_number": flight_number, "user": user,
+                         "booking_time": datetime.datetime.utcnow()})
+
+
+def run(mode, args):
+    db.flights.delete_many({})
+    db.holds.delete_many({})
+    bookings.delete_many({})
+    db.flights.insert_one({"flight_number": FLIGHT, "seats_available": args.seats})
+
+    counts = {"booked": 0, "failed_after_payment": 0, "turned_away": 0, "abandoned": 0, "flight_writes": 0,
+              "payment_flight_ops": 0}
+    lock = threading.Lock()
+    rng = random.Random(7)
+    abandons = [rng.random() < args.abandon for _ in range(args.buyers)]
+    next_buyer = iter(range(args.buyers))
+
+    def count(name):
+        with lock:
+            counts[name] += 1
+
+    def on_flight_write(flight_number, **kwargs):
+        if flight_number == FLIGHT:
+            count("flight_writes")
+
+    flight_changed.connect(on_flight_write)
+    reaper = HoldReaper(db.holds, interval=0.05)
+    reaper.start()
+
+    def buyer():
+        while True:
+            with lock:
+                index = next(next_buyer, None)
+            if index is None:
+                return
+            user = f"user{index}"
+            hold = None
+            if mode == "hold":
+                try:
+                    hold = create_hold(FLIGHT, 1, user, args.hold_seconds)
+                except SeatsUnavailable:
+                    count("turned_away")
+                    continue
+            time.sleep(args.payment_ms / 1000.0)
+            if abandons[index]:
+                count("abandoned")
+                continue
+            try:
+                if hold is not None:
+                    take_from_hold(hold["_id"], FLIGHT, user)
+                else:
+                    count("payment_flight_ops")
+                    reserve_seats(FLIGHT)
+            except (SeatsUnavailable, HoldUnavailable):
+                count("failed_after_payment")
+                continue
+            try:
+                book(FLIGHT, user)
+            except Exception:
+                release_seats(FLIGHT)
+                raise
+            count("booked")
+
+    conflicts_before = write_conflicts()
+    threads = [threading.Thread(target=buyer) for _ in range(args.threads)]
+    with Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # Let every abandoned hold lapse and be reaped before checking the books
+    deadline = time.monotonic() + args.hold_seconds + 5
+    unreaped = {"status": {"$in": ["active", "expiring"]}, "seats": {"$gt": 0}}
+    while db.holds.count_documents(unreaped) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    reaper.stop()
+    flight_changed.disconnect(on_flight_write)
+    conflicts_after = write_conflicts()
+
+    seats_left = db.flights.find_one({"flight_number": FLIGHT})["seats_available"]
+    booked = bookings.count_documents({"flight_number": FLIGHT})
+    conflicts = "n/a" if conflicts_before is None else conflicts_after - conflicts_before
+    print(f"{mode:<12} booked={booked} failed_after_payment={counts['failed_after_payment']} "
+          f"turned_away={counts['turned_away']} abandoned={counts['abandoned']} "
+          f"payment_flight_ops={counts['payment_flight_ops']} flight_writes={counts['flight_writes']} "
+          f"write_conflicts={conflicts} seats_left={seats_left} elapsed={timer.elapsed:.1f}s")
+    if booked > args.seats or seats_left < 0 or booked + seats_left != args.seats:
+        raise SystemExit(f"FAIL: {mode} seat inventory is inconsistent")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=2000)
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--payment-ms", type=int, default=50)
+    parser.add_argument("--abandon", type=float, default=0.2, help="share of buyers who leave at payment")
+    parser.add_argument("--hold-seconds", type=float, default=0.25)
+    args = parser.parse_args()
+
+    print(f"backend={backend_name()} buyers={args.buyers} seats={args.seats} threads={args.threads} "
+          f"payment={args.payment_ms}ms abandon={args.abandon:.0%}")
+    run("book-at-end", args)
+    run("hold", args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Itinerary search latency over an in-memory route graph.
+
+Builds the graph straight from the synthetic flight generator (no Mongo involved)
+and times random origin/destination/day queries.
+
+    python benchmarks/itinerary_bench.py --flights 300000 --queries 500
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common import use_database, percentile, Timer
+
+use_database()
+
+from flight_dummy_data import generate_flights, AIRPORT_CODES  # noqa: E402
+from route_graph import RouteGraph  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=300000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--max-stops", type=int, default=2)
+    args = parser.parse_args()
+
+    start_date = datetime.date(2025, 6, 1)
+    graph = RouteGraph(collection=None)
+    rng = random.Random(3)
+    with Timer() as build:
+        graph.load(generate_flights(0, args.flights, rng, start_date, args.days))
+    print(f"graph: {args.flights:,} flights over {len(AIRPORT_CODES)} airports and {args.days} days, "
+          f"built in {build.elapsed:.1f}s")
+
+    for optimize in ("price", "duration"):
+        latencies, found = [], 0
+        for _ in range(args.queries):
+            origin, destination = rng.sample(AIRPORT_CODES, 2)
+            day = start_date + datetime.timedelta(days=rng.randrange(args.days))
+            started = time.perf_counter()
+            results = graph.search(origin, destination, day, max_stops=args.max_stops, optimize=optimize)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found += bool(results)
+        print(f"{optimize:<9} queries={args.queries} answered={found} p50={percentile(latencies, 50):.2f}ms "
+              f"p95={percentile(latencies, 95):.2f}ms p99={percentile(latencies, 99):.2f}ms max={max(latencies):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
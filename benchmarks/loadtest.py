@@ -0,0 +1,322 @@
+"""Weighted load test built from the Postman collection.
+
+The request templates (booking body, review body, credentials) come from
+Flight_dataset.postman_collection.json; paths are filled in from a synthetic
+catalog. The workload mix is weighted per endpoint:
+
+    search   GET  /flights?departure_location=..&arrival_location=..&date=..
+    details  GET  /flights/<flight_number>
+    book     POST /bookings
+    review   POST /flights/<flight_number>/reviews
+    login    POST /login
+
+By default requests go through the Flask app in-process (mongomock, or mongod
+when MONGO_URI is set); --url sends them to a running server instead. Recorded
+traffic can be mixed in with --replay FILE, a JSON-lines file of
+{"method", "path", "body"?, "auth"?} objects.
+
+Logins are spread over --login-users registered users. In-process runs also
+lift the login rate limits (unless LOGIN_* is set), since every request comes
+from one address; against --url, start the server with raised LOGIN_USER_* /
+LOGIN_IP_* limits or most logins are shed with 429.
+
+    python benchmarks/loadtest.py --duration 20 --threads 16 --save baseline.json
+    python benchmarks/loadtest.py --duration 20 --threads 16 --compare baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from common import ROOT, use_database, backend_name, percentile
+
+COLLECTION = os.path.join(ROOT, "Flight_dataset.postman_collection.json")
+DEFAULT_MIX = {"search": 50, "details": 30, "book": 10, "review": 5, "login": 5}
+AIRPORTS = ["LHR", "JFK", "DXB", "SYD", "BER", "HND", "CDG", "SFO", "ATL", "ORD", "FRA", "DOH", "LAX", "SIN"]
+AIRLINES = ["British Airways", "Lufthansa", "Emirates", "Qatar Airways", "Air France", "Delta Airlines"]
+PASSWORD = "loadtest-password"
+HARNESS_LOGIN_LIMITS = {"LOGIN_USER_RATE_PER_MIN": "600000", "LOGIN_USER_BURST": "10000",
+                        "LOGIN_IP_RATE_PER_MIN": "600000", "LOGIN_IP_BURST": "10000"}
+
+
+##################################### WORKLOAD #####################################
+def load_templates(path=COLLECTION):
+    """Pull request bodies out of the Postman collection, keyed by the route they target"""
+    with open(path) as f:
+        collection = json.load(f)
+    templates = {}
+
+    def walk(items):
+        for item in items:
+            if "item" in item:
+                walk(item["item"])
+                continue
+            request = item["request"]
+            url = request.get("url")
+            raw = url.get("raw", "") if isinstance(url, dict) else (url or "")
+            body = (request.get("body") or {}).get("raw")
+            if not body:
+                continue
+            try:
+                body = json.loads(body)
+            except ValueError:
+                continue
+            path = "/" + raw.split("://", 1)[-1].split("/", 1)[-1]
+            if request["method"] == "POST" and path.rstrip("/").endswith("/bookings"):
+                templates["book"] = body
+            elif request["method"] == "POST" and path.endswith("/reviews"):
+                templates["review"] = body
+            elif request["method"] == "POST" and path.endswith("/register"):
+                templates["register"] = body
+    walk(collection["item"])
+    return templates
+
+
+def synthetic_catalog(count, seed=7):
+    rng = random.Random(seed)
+    flights = []
+    for i in range(count):
+        departure, arrival = rng.sample(AIRPORTS, 2)
+        day = 1 + i % 28
+        hour = rng.randrange(24)
+        flights.append({
+            "flight_number": f"LT{i:05d}",
+            "airline": rng.choice(AIRLINES),
+            "departure_airport": departure,
+            "arrival_airport": arrival,
+            "departure_time": f"2025-06-{day:02d}T{hour:02d}:00:00",
+            "arrival_time": f"2025-06-{day:02d}T{(hour + 2) % 24:02d}:30:00",
+            "duration": 2.5,
+            "price": rng.randrange(80, 2000),
+            "seats_available": 10 ** 6,
+            "status": "On Time",
+        })
+    return flights
+
+
+class Workload:
+    def __init__(self, flights, templates, mix, usernames, replay=None, seed=11):
+        self.flights = flights
+        self.templates = templates
+        self.usernames = usernames
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.replay = replay or []
+        self.rng = random.Random(seed)
+
+    def next_request(self):
+        """(endpoint label, method, path, json body, needs auth token)"""
+        if self.replay and self.rng.random() < 0.5:
+            entry = self.rng.choice(self.replay)
+            return ("replay " + entry["method"], entry["method"], entry["path"], entry.get("body"), entry.get("auth", False))
+        name = self.rng.choices(self.names, self.weights)[0]
+        flight = self.rng.choice(self.flights)
+        if name == "search":
+            path = (f"/flights?departure_location={flight['departure_airport']}"
+                    f"&arrival_location={flight['arrival_airport']}&date={flight['departure_time'][:10]}")
+            return name, "GET", path, None, False
+        if name == "details":
+            return name, "GET", f"/flights/{flight['flight_number']}", None, False
+        if name == "book":
+            return name, "POST", "/bookings", dict(self.templates["book"], flight_number=flight["flight_number"]), True
+        if name == "review":
+            body = dict(self.templates["review"], star=self.rng.randint(1, 5))
+            return name, "POST", f"/flights/{flight['flight_number']}/reviews", body, True
+        return name, "POST", "/login", {"username": self.rng.choice(self.usernames), "password": PASSWORD}, False
+
+
+def load_replay(path):
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "method" in entry and "path" in entry:
+                entries.append(entry)
+    return entries
+
+
+##################################### TARGETS #####################################
+class InProcessTarget:
+    def __init__(self):
+        from app import app
+        self.client = app.test_client()
+
+    def send(self, method, path, body, headers):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpTarget:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def send(self, method, path, body, headers):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers=dict(headers, **({"Content-Type": "application/json"} if data else {})))
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+##################################### RUN + REPORT #####################################
+def run(target, workload, token, threads, duration):
+    results = {}  # endpoint -> {"latencies": [...], "errors": n}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local = {}
+        while time.perf_counter() < deadline:
+            name, method, path, body, auth = workload.next_request()
+            headers = {"x-access-token": token} if auth else {}
+            started = time.perf_counter()
+            try:
+                status, _ = target.send(method, path, body, headers)
+            except Exception:
+                status = 599
+            elapsed = (time.perf_counter() - started) * 1000
+            entry = local.setdefault(name, {"latencies": [], "errors": 0, "shed": 0})
+            entry["latencies"].append(elapsed)
+            if status in (429, 503):
+                entry["shed"] += 1  # rate limited or hash pool full: load shedding, not a failure
+            elif status >= 500 or (status >= 400 and name in ("book", "review", "login")):
+                entry["errors"] += 1
+        with lock:
+            for name, entry in local.items():
+                merged = results.setdefault(name, {"latencies": [], "errors": 0, "shed": 0})
+                merged["latencies"].extend(entry["latencies"])
+                merged["errors"] += entry["errors"]
+                merged["shed"] += entry["shed"]
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for name, entry in sorted(results.items()):
+        latencies = entry["latencies"]
+        report[name] = {
+            "requests": len(latencies),
+            "errors": entry["errors"],
+            "shed": entry["shed"],
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+        }
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"{'endpoint':<16}{'req':>8}{'err':>6}{'shed':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in report.items():
+        line = (f"{name:<16}{row['requests']:>8}{row['errors']:>6}{row.get('shed', 0):>6}{row['throughput']:>10.1f}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+        if baseline and name in baseline:
+            before = baseline[name]
+            line += (f"   p95 {_delta(before['p95_ms'], row['p95_ms'])}"
+                     f"  req/s {_delta(before['throughput'], row['throughput'])}")
+        print(line)
+
+
+def _delta(before, after):
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def regressions(report, baseline, tolerance):
+    """Endpoints whose p95 grew by more than tolerance percent over the baseline"""
+    worse = []
+    for name, row in report.items():
+        before = baseline.get(name)
+        if before and before["p95_ms"] and (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 > tolerance:
+            worse.append(name)
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: in-process Flask app)")
+    parser.add_argument("--flights", type=int, default=5000, help="synthetic catalog size")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="comma separated endpoint=weight pairs")
+    parser.add_argument("--replay", help="JSON-lines file of recorded requests to mix in")
+    parser.add_argument("--login-users", type=int, default=20, help="users registered up front to log in as")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed p95 regression in percent")
+    args = parser.parse_args()
+
+    mix = {}
+    for pair in args.mix.split(","):
+        name, weight = pair.split("=")
+        if name not in DEFAULT_MIX:
+            parser.error(f"unknown endpoint in --mix: {name}")
+        mix[name] = float(weight)
+
+    templates = load_templates()
+    flights = synthetic_catalog(args.flights)
+    if args.url:
+        target = HttpTarget(args.url)
+        backend = args.url
+    else:
+        for name, value in HARNESS_LOGIN_LIMITS.items():
+            os.environ.setdefault(name, value)
+        db = use_database()
+        db.flights.insert_many(flights)
+        target = InProcessTarget()
+        backend = backend_name()
+
+    # Every run registers its own users so login has something to check against
+    prefix = f"loadtest-{os.getpid()}-{int(time.time())}"
+    usernames = [f"{prefix}-{i}" for i in range(max(1, args.login_users))]
+    token = None
+    for username in usernames:
+        status, body = target.send("POST", "/register", dict(templates["register"], username=username,
+                                                             password=PASSWORD, admin=False), {})
+        if status != 201:
+            raise SystemExit(f"could not register load test user {username}: {status} {body}")
+        token = token or body["token"]
+
+    replay = load_replay(args.replay) if args.replay else None
+    workload = Workload(flights, templates, mix, usernames, replay)
+    print(f"target={backend} flights={args.flights} threads={args.threads} duration={args.duration}s "
+          f"login_users={len(usernames)} mix={mix}")
+    report = run(target, workload, token, args.threads, args.duration)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"target": backend, "flights": args.flights, "threads": args.threads,
+                       "duration": args.duration, "mix": mix, "endpoints": report}, f, indent=2)
+        print(f"baseline written to {args.save}")
+    if baseline is not None:
+        worse = regressions(report, baseline, args.tolerance)
+        if worse:
+            raise SystemExit(f"p95 regressed by more than {args.tolerance}% on: {', '.join(worse)}")
+
+
+if __name__ == "__main__":
+    main()
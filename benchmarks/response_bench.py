@@ -0,0 +1,109 @@
+"""Bytes and latency per read endpoint: full documents vs ?fields=, gzip / brotli, and 304 revalidation.
+
+Drives the Flask app in-process against realistic generated flights (mongomock,
+or mongod when MONGO_URI is set) and also times the JSON provider on its own:
+the stdlib encoder Flask ships with vs FastJSONProvider (orjson when installed).
+
+    python benchmarks/response_bench.py --flights 5000 --requests 300
+"""
+import argparse
+import datetime
+import random
+
+from common import use_database, backend_name, percentile, Timer
+
+SEARCH_FIELDS = "flight_number,departure_time,arrival_time,price,seats_available"
+DETAIL_FIELDS = "flight_number,status,gate,seats_available"
+
+
+def measure(client, path, headers, requests):
+    latencies = []
+    response = None
+    for _ in range(requests):
+        with Timer() as timer:
+            response = client.get(path, headers=headers)
+        latencies.append(timer.elapsed * 1000)
+    return response, latencies
+
+
+def scenarios(path, fields):
+    separator = "&" if "?" in path else "?"
+    return [
+        ("full", path, {}),
+        ("full gzip", path, {"Accept-Encoding": "gzip"}),
+        ("full br", path, {"Accept-Encoding": "br, gzip"}),
+        ("fields", f"{path}{separator}fields={fields}", {}),
+        ("fields gzip", f"{path}{separator}fields={fields}", {"Accept-Encoding": "gzip"}),
+        ("304", path, None),  # If-None-Match filled in from the full response
+    ]
+
+
+def bench_json(page, rounds):
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from json_provider import FastJSONProvider, orjson
+
+    app = Flask(__name__)
+    results = {}
+    for name, provider in (("flask default", DefaultJSONProvider(app)), ("FastJSONProvider", FastJSONProvider(app))):
+        provider.dumps(page)  # warm-up
+        with Timer() as timer:
+            for _ in range(rounds):
+                provider.dumps(page)
+        results[name] = timer.elapsed / rounds * 1e6
+    return results, "orjson" if orjson is not None else "stdlib json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    args = parser.parse_args()
+
+    db = use_database()
+    from flight_dummy_data import generate_flights
+    rng = random.Random(1)
+    flights = list(generate_flights(0, args.flights, rng, datetime.date(2025, 6, 1), 30))
+    for flight in flights:
+        count = rng.randrange(0, 40)
+        histogram = {str(star): rng.randrange(0, count + 1) for star in range(1, 6)}
+        flight["rating"] = {"avg": round(rng.uniform(1, 5), 2), "count": count, "sum": count * 4, "histogram": histogram}
+    db.flights.insert_many(flights)
+
+    from app import app
+    client = app.test_client()
+    busiest = max({(f["departure_airport"], f["arrival_airport"]) for f in flights[:500]},
+                  key=lambda route: sum(1 for f in flights if (f["departure_airport"], f["arrival_airport"]) == route))
+    endpoints = [
+        ("search", f"/flights?departure_location={busiest[0]}&arrival_location={busiest[1]}&limit=50", SEARCH_FIELDS),
+        ("details", f"/flights/{flights[0]['flight_number']}", DETAIL_FIELDS),
+    ]
+
+    print(f"backend={backend_name()} flights={args.flights} requests/scenario={args.requests}")
+    print(f"{'endpoint':<9}{'scenario':<13}{'status':>7}{'bytes':>9}{'saved':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for endpoint, path, fields in endpoints:
+        baseline_bytes = None
+        etag = None
+        for scenario, scenario_path, headers in scenarios(path, fields):
+            if headers is None:
+                headers = {"If-None-Match": etag}
+            response, latencies = measure(client, scenario_path, headers, args.requests)
+            size = len(response.data)
+            if scenario == "full":
+                baseline_bytes = size
+                etag = response.headers.get("ETag")
+            if scenario == "full br" and response.headers.get("Content-Encoding") != "br":
+                scenario = "full br*"  # brotli not installed; gzip was used
+            saved = f"{(1 - size / baseline_bytes) * 100:.0f}%" if baseline_bytes else "-"
+            print(f"{endpoint:<9}{scenario:<13}{response.status_code:>7}{size:>9}{saved:>8}"
+                  f"{percentile(latencies, 50):>9.3f}{percentile(latencies, 95):>9.3f}")
+
+    page = client.get(endpoints[0][1]).get_json()
+    timings, backend = bench_json(page, max(50, args.requests))
+    print(f"\nJSON encoding of one {len(page)}-flight search page ({backend}):")
+    for name, micros in timings.items():
+        print(f"  {name:<18}{micros:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Multi-threaded booking stress test for the atomic seat inventory.
+
+Many threads race to book a flight with fewer seats than attempts; the run
+fails if more bookings succeed than there were seats.
+
+    python benchmarks/seat_inventory_bench.py --threads 32 --attempts 2000 --seats 500
+"""
+import argparse
+import threading
+
+from common import use_database, backend_name, Timer
+
+db = use_database()
+
+from inventory import reserve_seats, release_seats, SeatsUnavailable  # noqa: E402
+from blueprints.flights.flights import bookings  # noqa: E402
+import datetime  # noqa: E402
+import uuid  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--attempts", type=int, default=2000)
+    parser.add_argument("--seats", type=int, default=500)
+    args = parser.parse_args()
+
+    db.flights.insert_one({"flight_number": "BENCH1", "seats_available": args.seats})
+    succeeded = []
+    sold_out = []
+    lock = threading.Lock()
+    per_thread = args.attempts // args.threads
+
+    def worker():
+        for _ in range(per_thread):
+            try:
+                reserve_seats("BENCH1")
+            except SeatsUnavailable:
+                with lock:
+                    sold_out.append(1)
+                continue
+            try:
+                bookings.insert_one({"_id": str(uuid.uuid4()), "flight_number": "BENCH1",
+                                     "booking_time": datetime.datetime.utcnow()})
+            except Exception:
+                release_seats("BENCH1")
+                raise
+            with lock:
+                succeeded.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    with Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    remaining = db.flights.find_one({"flight_number": "BENCH1"})["seats_available"]
+    booked = bookings.count_documents({"flight_number": "BENCH1"})
+    oversold = max(0, booked - args.seats)
+    print(f"backend={backend_name()} threads={args.threads} attempts={per_thread * args.threads} seats={args.seats}")
+    print(f"booked={booked} rejected={len(sold_out)} seats_left={remaining} oversold={oversold}")
+    print(f"throughput={(len(succeeded) + len(sold_out)) / timer.elapsed:.0f} attempts/s "
+          f"({len(succeeded) / timer.elapsed:.0f} bookings/s)")
+    if oversold or remaining < 0 or booked + remaining != args.seats:
+        raise SystemExit("FAIL: seat inventory is inconsistent")
+
+
+if __name__ == "__main__":
+    main()
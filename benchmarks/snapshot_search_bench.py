@@ -0,0 +1,122 @@
+"""Flight search on the NumPy snapshot engine vs the Mongo query path.
+
+Loads synthetic flights, builds the columnar snapshot and runs the same random
+search shapes (route/day, route by price, day under a price cap, price floor
+by rating, plus a second page through the cursor) both ways. Every page is
+compared, so the run doubles as a check that the engines agree.
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/snapshot_search_bench.py --flights 1000000
+
+Without MONGO_URI the Mongo side is mongomock, which scans without indexes;
+use a smaller --flights there.
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common import use_database, backend_name, percentile, Timer
+
+db = use_database()
+
+from flight_dummy_data import generate_flights, AIRPORT_CODES  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from pagination import encode_cursor, decode_cursor, keyset_filter  # noqa: E402
+from blueprints.flights.flights import build_search_query, flight_projection, _sort_value  # noqa: E402
+from flight_snapshot import FlightSnapshot  # noqa: E402
+
+
+def load(count, days, rng, start_date, batch=20000):
+    for start in range(0, count, batch):
+        flights = list(generate_flights(start, min(count, start + batch), rng, start_date, days))
+        for flight in flights:
+            if rng.random() < 0.4:
+                flight["rating"] = {"avg": round(rng.uniform(1, 5), 2), "count": rng.randrange(1, 200)}
+        db.flights.insert_many(flights)
+
+
+def random_args(rng, start_date, days):
+    origin, destination = rng.sample(AIRPORT_CODES, 2)
+    day = (start_date + datetime.timedelta(days=rng.randrange(days))).isoformat()
+    return {
+        "route_day": {"departure_location": origin, "arrival_location": destination, "date": day},
+        "route_by_price": {"departure_location": origin, "arrival_location": destination, "sort_by": "price"},
+        "day_price_cap": {"date": day, "max_price": str(rng.randrange(100, 400)),
+                          "sort_by": "price", "sort_order": "desc"},
+        "floor_by_rating": {"min_price": str(rng.randrange(200, 1500)), "sort_by": "rating", "sort_order": "desc"},
+    }
+
+
+def mongo_page(args, after, limit):
+    query, sort = build_search_query(args)
+    if after:
+        query = {"$and": [query, keyset_filter(sort[0][0], after[0], "flight_number", after[1], sort[0][1])]}
+    projection = flight_projection(None)
+    flights = list(db.flights.find(query, projection).sort(sort).limit(limit + 1))
+    return flights[:limit], len(flights) > limit
+
+
+def snapshot_page(snapshot, args, after, limit):
+    _, sort = build_search_query(args)
+    numbers, has_more = snapshot.search(args, sort, after, limit)
+    found = {f["flight_number"]: f for f in db.flights.find({"flight_number": {"$in": numbers}}, flight_projection(None))}
+    return [found[n] for n in numbers if n in found], has_more
+
+
+def timed(page, *args):
+    started = time.perf_counter()
+    result = page(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    start_date = datetime.date(2025, 6, 1)
+    rng = random.Random(11)
+    with Timer() as loading:
+        load(args.flights, args.days, rng, start_date)
+        ensure_indexes()
+    print(f"backend: {backend_name()}, {args.flights:,} flights loaded and indexed in {loading.elapsed:.1f}s")
+
+    snapshot = FlightSnapshot(db.flights, refresh_interval=3600, max_staleness=3600)
+    with Timer() as building:
+        snapshot.load()
+    stats = snapshot.stats()
+    print(f"snapshot: {stats['rows']:,} rows, {stats['bytes'] / 2 ** 20:.1f} MiB of columns, built in {building.elapsed:.1f}s")
+
+    timings = {}
+    mismatches = 0
+    for _ in range(args.queries):
+        for shape, search_args in random_args(rng, start_date, args.days).items():
+            after = None
+            for page_number in (1, 2):
+                name = shape if page_number == 1 else f"{shape} (page 2)"
+                (mongo_flights, mongo_more), mongo_ms = timed(mongo_page, search_args, after, args.limit)
+                (snap_flights, snap_more), snap_ms = timed(snapshot_page, snapshot, search_args, after, args.limit)
+                timings.setdefault(name, ([], []))
+                timings[name][0].append(mongo_ms)
+                timings[name][1].append(snap_ms)
+                if ([f["flight_number"] for f in mongo_flights] != [f["flight_number"] for f in snap_flights]
+                        or mongo_more != snap_more):
+                    mismatches += 1
+                if not mongo_more:
+                    break
+                _, sort = build_search_query(search_args)
+                last = mongo_flights[-1]
+                after = decode_cursor(encode_cursor([_sort_value(last, sort[0][0]), last["flight_number"]]))
+
+    print(f"{'shape':<28} {'n':>5} {'mongo p50':>10} {'mongo p95':>10} {'snap p50':>10} {'snap p95':>10}")
+    for name, (mongo_ms, snap_ms) in timings.items():
+        print(f"{name:<28} {len(mongo_ms):>5} {percentile(mongo_ms, 50):>8.2f}ms {percentile(mongo_ms, 95):>8.2f}ms "
+              f"{percentile(snap_ms, 50):>8.2f}ms {percentile(snap_ms, 95):>8.2f}ms")
+    print(f"pages that differed between engines: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Cold boot time of the app and MongoClient pool behaviour under concurrent requests.
+
+Boot: imports app.py in fresh interpreters with MONGO_URI pointing at an unreachable
+host, so any connection attempt made at import time shows up as a stall.
+
+Pool (needs a real mongod in MONGO_URI): drives concurrent GET /flights/<number>
+requests through one worker's shared client and reports how many connections the
+pool opened, checkout waits and latency percentiles.
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/startup_bench.py --threads 64
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from common import ROOT, percentile
+
+BOOT_SNIPPET = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+
+def measure_boot(runs):
+    env = dict(os.environ, MONGO_URI="mongodb://10.255.255.1:27017", MONGO_SERVER_SELECTION_TIMEOUT_MS="3000")
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", BOOT_SNIPPET], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        total = time.perf_counter() - started
+        samples.append((float(out.stdout.strip().splitlines()[-1]), total))
+    imports = [s[0] * 1000 for s in samples]
+    totals = [s[1] * 1000 for s in samples]
+    print(f"boot: import app p50={percentile(imports, 50):.0f}ms max={max(imports):.0f}ms; "
+          f"interpreter+import p50={percentile(totals, 50):.0f}ms over {runs} runs")
+
+
+def measure_pool(threads, requests_per_thread):
+    from pymongo import monitoring
+    import globalaccess
+
+    class PoolCounter(monitoring.ConnectionPoolListener):
+        created = checked_out = failed_checkouts = 0
+
+        def connection_created(self, event):
+            PoolCounter.created += 1
+
+        def connection_checked_out(self, event):
+            PoolCounter.checked_out += 1
+
+        def connection_check_out_failed(self, event):
+            PoolCounter.failed_checkouts += 1
+
+        def pool_created(self, event): pass
+        def pool_ready(self, event): pass
+        def pool_cleared(self, event): pass
+        def pool_closed(self, event): pass
+        def connection_ready(self, event): pass
+        def connection_closed(self, event): pass
+        def connection_check_out_started(self, event): pass
+        def connection_checked_in(self, event): pass
+
+    listener = PoolCounter()
+    options = globalaccess.client_options()
+    globalaccess.client = globalaccess.create_client(
+        event_listeners=options["event_listeners"] + [listener])
+    globalaccess.db = globalaccess.client["flight_booking_bench"]
+    globalaccess.db.flights.drop()
+    globalaccess.db.flights.insert_many([{"flight_number": f"P{i}", "seats_available": 10, "price": i}
+                                         for i in range(1000)])
+
+    from app import app
+    from cache import flight_cache
+    flight_cache.max_entries = 0  # measure the database path, not the cache
+
+    client = app.test_client()
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        local = []
+        for i in range(requests_per_thread):
+            started = time.perf_counter()
+            client.get(f"/flights/P{(offset * requests_per_thread + i) % 1000}")
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    print(f"pool: threads={threads} maxPoolSize={options['maxPoolSize']} connections_created={PoolCounter.created} "
+          f"checkouts={PoolCounter.checked_out} failed_checkouts={PoolCounter.failed_checkouts}")
+    print(f"pool: {len(latencies) / elapsed:.0f} req/s p50={percentile(latencies, 50):.1f}ms "
+          f"p95={percentile(latencies, 95):.1f}ms p99={percentile(latencies, 99):.1f}ms")
+    globalaccess.client.drop_database("flight_booking_bench")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boot-runs", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="requests per thread")
+    args = parser.parse_args()
+
+    measure_boot(args.boot_runs)
+    if os.environ.get("MONGO_URI"):
+        measure_pool(args.threads, args.requests)
+    else:
+        print("pool: skipped (set MONGO_URI to a running mongod)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Autocomplete latency over the in-memory prefix index.
+
+Counts flight volumes from the synthetic generator (no Mongo involved), loads
+the index and times every 1-, 2- and 3-character prefix that matches something,
+both straight against the index and through GET /suggest on the Flask test client.
+
+    python benchmarks/suggest_bench.py --flights 200000
+"""
+import argparse
+import datetime
+import random
+import time
+from collections import Counter
+
+from common import use_database, percentile, Timer
+
+use_database()
+
+from flight_dummy_data import generate_flights  # noqa: E402
+from suggest import suggest_index  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    volumes = Counter()
+    for flight in generate_flights(0, args.flights, random.Random(5), datetime.date(2025, 6, 1), 30):
+        volumes[("airport", flight["departure_airport"])] += 1
+        volumes[("airport", flight["arrival_airport"])] += 1
+        volumes[("airline", flight["airline"])] += 1
+    with Timer() as build:
+        suggest_index.load(volumes)
+    keys, _, entries = suggest_index._index
+    print(f"index: {len(entries)} suggestions, {len(keys)} keys, built in {build.elapsed * 1000:.2f}ms")
+
+    prefixes = sorted({key[:length] for key in keys for length in (1, 2, 3) if len(key) >= length})
+
+    latencies = []
+    for _ in range(args.rounds):
+        for prefix in prefixes:
+            started = time.perf_counter()
+            suggest_index.suggest(prefix)
+            latencies.append((time.perf_counter() - started) * 1000)
+    print(f"index lookup  prefixes={len(prefixes)} p50={percentile(latencies, 50):.3f}ms "
+          f"p99={percentile(latencies, 99):.3f}ms max={max(latencies):.3f}ms")
+
+    from app import app
+    client = app.test_client()
+    latencies = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        response = client.get("/suggest", query_string={"q": prefix})
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.data
+    print(f"GET /suggest  prefixes={len(prefixes)} p50={percentile(latencies, 50):.3f}ms "
+          f"p99={percentile(latencies, 99):.3f}ms max={max(latencies):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
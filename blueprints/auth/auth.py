@@ -1,17 +1,29 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from decorators import jwt_required
 from flask_cors import cross_origin
 
 import jwt
 import datetime
-import bcrypt
+import math
 import globalaccess
+from revocation import revocations
+from passwords import hasher, HasherBusy
+from ratelimit import check_login
 
 auth_bp = Blueprint('auth_bp', __name__)
 
-blacklist = globalaccess.db.blacklist
 users = globalaccess.db.users
 
+def _busy():
+    return jsonify({'message': 'Server busy, please retry shortly'}), 503, {'Retry-After': '1'}
+
+def issue_token(username, admin):
+    return jwt.encode({
+        'user': username,
+        'admin': admin,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
+    }, globalaccess.SECRET_KEY, algorithm='HS256')
+
 ####################################### REGISTER ###########################################
 @auth_bp.route('/register', methods=['POST'])
 @cross_origin()
@@ -24,7 +36,10 @@ def register():
     if users.find_one({'username': data['username']}):
         return jsonify({'message': 'Username already exists'}), 409
 
-    hashed_password = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt())
+    try:
+        hashed_password = hasher.hash_password(data['password'])
+    except HasherBusy:
+        return _busy()
 
     new_user = {
         'username': data['username'],
@@ -34,16 +49,10 @@ def register():
 
     users.insert_one(new_user)
 
-    # Generate token immediately after signup
-    token = jwt.encode({
-        'user': new_user['username'],
-        'admin': new_user['admin'],
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
-    }, globalaccess.SECRET_KEY, algorithm='HS256')
-
     return jsonify({
         'message': 'User registered successfully',
-        'token': token,
+        # Generate token immediately after signup
+        'token': issue_token(new_user['username'], new_user['admin']),
         'user': {'username': new_user['username'], 'admin': new_user['admin']}
     }), 201
 
@@ -58,21 +67,31 @@ def login():
     username = data['username']
     password = data['password']
 
+    allowed, retry_after = check_login(username, request.remote_addr or '')
+    if not allowed:
+        return jsonify({'message': 'Too many login attempts'}), 429, {'Retry-After': str(math.ceil(retry_after))}
+
     user = users.find_one({'username': username})
     if not user:
         return jsonify({'message': 'Invalid username or password'}), 401
 
-    if not bcrypt.checkpw(password.encode('utf-8'), user['password']):
+    try:
+        matches, needs_rehash = hasher.check_password(password, user['password'])
+    except HasherBusy:
+        return _busy()
+    if not matches:
         return jsonify({'message': 'Invalid username or password'}), 401
 
-    token = jwt.encode({
-        'user': username,
-        'admin': user.get('admin', False),
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
-    }, globalaccess.SECRET_KEY, algorithm='HS256')
+    if needs_rehash:
+        # Move the stored hash to the configured BCRYPT_ROUNDS while we have the plain password
+        try:
+            users.update_one({'_id': user['_id'], 'password': user['password']},
+                             {'$set': {'password': hasher.hash_password(password)}})
+        except HasherBusy:
+            pass  # keep the old hash; a later login upgrades it
 
     return jsonify({
-        'token': token,
+        'token': issue_token(username, user.get('admin', False)),
         'user': {'username': username, 'admin': user.get('admin', False)}
     }), 200
 
@@ -81,9 +100,5 @@ def login():
 @cross_origin()
 @jwt_required
 def logout():
-    token = request.headers.get('x-access-token')
-    if not token:
-        return jsonify({'message': 'Token is missing'}), 400
-
-    blacklist.insert_one({'token': token})
+    revocations.revoke(g.token, g.jwt_claims['exp'])
     return jsonify({'message': 'Logged out successfully'}), 200
@@ -0,0 +1,89 @@
+from quart import Blueprint, request, jsonify, g
+from async_decorators import jwt_required
+
+import math
+import async_mongo
+from revocation import revocations
+from passwords import hasher, HasherBusy
+from ratelimit import check_login
+from blueprints.auth.auth import issue_token
+
+auth_bp = Blueprint('auth_bp', __name__)
+
+def _busy():
+    return jsonify({'message': 'Server busy, please retry shortly'}), 503, {'Retry-After': '1'}
+
+####################################### REGISTER ###########################################
+@auth_bp.route('/register', methods=['POST'])
+async def register():
+    data = await request.get_json(silent=True)
+
+    if not data or not data.get('username') or not data.get('password'):
+        return jsonify({'message': 'Username and password are required'}), 400
+
+    users = async_mongo.db.users
+    if await users.find_one({'username': data['username']}):
+        return jsonify({'message': 'Username already exists'}), 409
+
+    try:
+        hashed_password = await hasher.hash_password_async(data['password'])
+    except HasherBusy:
+        return _busy()
+
+    new_user = {
+        'username': data['username'],
+        'password': hashed_password,
+        'admin': data.get('admin', False)
+    }
+
+    await users.insert_one(new_user)
+
+    return jsonify({
+        'message': 'User registered successfully',
+        'token': issue_token(new_user['username'], new_user['admin']),
+        'user': {'username': new_user['username'], 'admin': new_user['admin']}
+    }), 201
+
+####################################### LOGIN ###########################################
+@auth_bp.route('/login', methods=['POST'])
+async def login():
+    data = await request.get_json(silent=True)
+    if not data or not data.get('username') or not data.get('password'):
+        return jsonify({'message': 'Username and password required'}), 400
+
+    username = data['username']
+    password = data['password']
+
+    allowed, retry_after = check_login(username, request.remote_addr or '')
+    if not allowed:
+        return jsonify({'message': 'Too many login attempts'}), 429, {'Retry-After': str(math.ceil(retry_after))}
+
+    user = await async_mongo.db.users.find_one({'username': username})
+    if not user:
+        return jsonify({'message': 'Invalid username or password'}), 401
+
+    try:
+        matches, needs_rehash = await hasher.check_password_async(password, user['password'])
+    except HasherBusy:
+        return _busy()
+    if not matches:
+        return jsonify({'message': 'Invalid username or password'}), 401
+
+    if needs_rehash:
+        try:
+            await async_mongo.db.users.update_one({'_id': user['_id'], 'password': user['password']},
+                                                  {'$set': {'password': await hasher.hash_password_async(password)}})
+        except HasherBusy:
+            pass  # keep the old hash; a later login upgrades it
+
+    return jsonify({
+        'token': issue_token(username, user.get('admin', False)),
+        'user': {'username': username, 'admin': user.get('admin', False)}
+    }), 200
+
+####################################### LOGOUT ###########################################
+@auth_bp.route('/logout', methods=['GET'])
+@jwt_required
+async def logout():
+    await async_mongo.run_sync(revocations.revoke, g.token, g.jwt_claims['exp'])
+    return jsonify({'message': 'Logged out successfully'}), 200
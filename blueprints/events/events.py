@@ -0,0 +1,69 @@
+from flask import Blueprint, Response, request, jsonify, make_response
+import json
+import os
+
+from event_stream import flight_events
+
+events_bp = Blueprint('events_bp', __name__)
+
+MAX_FLIGHTS_PER_STREAM = 100
+# An SSE comment is sent this often so proxies and load balancers keep idle streams open
+KEEPALIVE_SECONDS = float(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def parse_flight_numbers(args):
+    """?flight_numbers=BA1,LH2 -> unique flight numbers in order. Raises ValueError."""
+    flight_numbers = list(dict.fromkeys(
+        number.strip() for number in args.get('flight_numbers', '').split(',') if number.strip()))
+    if not flight_numbers:
+        raise ValueError("flight_numbers is required")
+    if len(flight_numbers) > MAX_FLIGHTS_PER_STREAM:
+        raise ValueError(f"At most {MAX_FLIGHTS_PER_STREAM} flights per stream")
+    return flight_numbers
+
+def snapshot_events(snapshot):
+    yield "retry: 5000\n\n"
+    for flight_number, state in snapshot.items():
+        yield _sse("snapshot", dict(state, flight_number=flight_number))
+
+def change_events(pending):
+    """The SSE text for one wait() result: its changes, or a keepalive when it timed out"""
+    if not pending:
+        return ": keepalive\n\n"
+    return "".join(_sse("change", dict(delta, flight_number=flight_number)) for flight_number, delta in pending.items())
+
+##################################### FLIGHT CHANGE STREAM #####################################
+@events_bp.route('/flights/events', methods=['GET'])
+def stream_flight_events():
+    """Server-Sent Events stream of status, gate and seat changes for ?flight_numbers=BA1,LH2
+
+    The first events are a snapshot of each flight; after that only changed fields are sent.
+    Each open stream holds a worker thread here; asgi.py serves the same stream as a coroutine.
+    """
+    try:
+        try:
+            flight_numbers = parse_flight_numbers(request.args)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+
+        subscription, snapshot = flight_events.subscribe(flight_numbers)
+        if not snapshot:
+            flight_events.unsubscribe(subscription)
+            return make_response(jsonify({"error": "Flight not found"}), 404)
+
+        def stream():
+            try:
+                yield from snapshot_events(snapshot)
+                while True:
+                    yield change_events(subscription.wait(KEEPALIVE_SECONDS))
+            finally:
+                # Runs when the client disconnects and the server closes the generator
+                flight_events.unsubscribe(subscription)
+
+        return Response(stream(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
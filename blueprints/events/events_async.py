@@ -0,0 +1,47 @@
+from quart import Blueprint, Response, request, jsonify
+import asyncio
+import functools
+
+import async_mongo
+from event_stream import flight_events, AsyncSubscription
+from blueprints.events.events import (parse_flight_numbers, snapshot_events, change_events, KEEPALIVE_SECONDS,
+                                      SSE_HEADERS)
+
+events_bp = Blueprint('events_bp', __name__)
+
+##################################### FLIGHT CHANGE STREAM #####################################
+@events_bp.route('/flights/events', methods=['GET'])
+async def stream_flight_events():
+    """Server-Sent Events stream of status, gate and seat changes for ?flight_numbers=BA1,LH2
+
+    The first events are a snapshot of each flight; after that only changed fields are sent.
+    An open stream is a coroutine waiting on an asyncio.Event, not a thread.
+    """
+    try:
+        try:
+            flight_numbers = parse_flight_numbers(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        factory = functools.partial(AsyncSubscription, loop=asyncio.get_running_loop())
+        subscription, snapshot = await async_mongo.run_sync(flight_events.subscribe, flight_numbers, factory)
+        if not snapshot:
+            flight_events.unsubscribe(subscription)
+            return jsonify({"error": "Flight not found"}), 404
+
+        async def stream():
+            try:
+                for event in snapshot_events(snapshot):
+                    yield event
+                while True:
+                    yield change_events(await subscription.wait(KEEPALIVE_SECONDS))
+            finally:
+                # Runs when the client disconnects and the server cancels the generator
+                flight_events.unsubscribe(subscription)
+
+        response = Response(stream(), mimetype='text/event-stream', headers=SSE_HEADERS)
+        response.timeout = None  # streams stay open far beyond RESPONSE_TIMEOUT
+        return response
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
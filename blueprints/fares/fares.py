@@ -0,0 +1,24 @@
+from flask import Blueprint, request, jsonify, make_response
+import re
+
+from fare_calendar import month_calendar
+
+fares_bp = Blueprint('fares_bp', __name__)
+
+##################################### FARE CALENDAR #####################################
+@fares_bp.route('/fares/calendar', methods=['GET'])
+def get_fare_calendar():
+    """Cheapest fare, flight count and seats left for every day of a month on one route"""
+    try:
+        departure = request.args.get('departure_location')
+        arrival = request.args.get('arrival_location')
+        month = request.args.get('month')
+        if not departure or not arrival or not month:
+            return make_response(jsonify({"error": "departure_location, arrival_location and month are required"}), 400)
+        if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", month):
+            return make_response(jsonify({"error": "month must be in YYYY-MM format"}), 400)
+
+        return make_response(jsonify(month_calendar(departure, arrival, month)), 200)
+
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
@@ -1,30 +1,60 @@
 from flask import Blueprint, request, jsonify, make_response
 from decorators import jwt_required, admin_required
 from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne, ReturnDocument
 import uuid
+import datetime
 
 import globalaccess
+from ratings import apply_rating_delta
+from pagination import parse_limit, decode_cursor, encode_cursor, keyset_filter, fetch_page, page_response
 
 reviews_bp = Blueprint('reviews_bp', __name__)
 
 flights = globalaccess.db.flights
+reviews = globalaccess.db.reviews
+
+REVIEW_SORT = [("created_at", 1), ("_id", 1)]
+
+def review_page_query(query, cursor):
+    """Reviews in insertion order: (created_at, _id) keyset, served by the flight_created_review / created_review indexes"""
+    if cursor:
+        created_at, review_id = decode_cursor(cursor)
+        created_at = datetime.datetime.fromisoformat(created_at) if created_at is not None else None
+        query = {"$and": [query, keyset_filter("created_at", created_at, "_id", review_id, 1)]}
+    return query
+
+def review_page_result(page, has_more):
+    """(reviews without created_at, next cursor or None) for one fetched page"""
+    next_cursor = None
+    if has_more:
+        last = page[-1]
+        created_at = last.get("created_at")
+        next_cursor = encode_cursor([created_at.isoformat() if created_at else None, last["_id"]])
+    for review in page:
+        review.pop("created_at", None)
+    return page, next_cursor
+
+def _review_page(query):
+    """One page of reviews; returns (reviews, next cursor or None)"""
+    limit = parse_limit(request.args)
+    query = review_page_query(query, request.args.get('cursor'))
+    return review_page_result(*fetch_page(reviews.find(query).sort(REVIEW_SORT), limit))
 
 ##################################### GET ALL REVIEWS FOR A FLIGHT #####################################
 @reviews_bp.route('/flights/<string:f_id>/reviews', methods=['GET'])
 def get_review(f_id):
-    """Retrieve all reviews for a specific flight"""
+    """Retrieve one page of reviews for a specific flight"""
     try:
-        data_to_return = []
-        flight = flights.find_one({'flight_number': f_id}, {'reviews': 1, '_id': 0})
+        try:
+            data_to_return, next_cursor = _review_page({'flight_number': f_id})
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
 
-        if not flight or 'reviews' not in flight:
+        if not data_to_return and not request.args.get('cursor'):
             return make_response(jsonify({"error": "Flight not found or no reviews available"}), 404)
 
-        for review in flight['reviews']:
-            review['_id'] = str(review['_id'])
-            data_to_return.append(review)
-
-        return make_response(jsonify(data_to_return), 200)
+        return page_response(data_to_return, next_cursor)
 
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
@@ -33,60 +63,68 @@ def get_review(f_id):
 ##################################### GET ALL REVIEWS FROM ALL FLIGHTS #####################################
 @reviews_bp.route('/flights/reviews', methods=['GET'])
 def get_all_reviews():
-    """Retrieve all reviews from all flights"""
+    """Retrieve one page of reviews across all flights"""
     try:
-        data_to_return = []
-
-        
-        flights_with_reviews = flights.find({"reviews": {"$exists": True, "$ne": []}}, {"flight_number": 1, "reviews": 1, "_id": 0})
-
-        for flight in flights_with_reviews:
-            flight_number = flight["flight_number"]
-            for review in flight["reviews"]:
-                review["_id"] = str(review["_id"])
-                review["flight_number"] = flight_number
-                data_to_return.append(review)
+        try:
+            data_to_return, next_cursor = _review_page({})
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
 
-        if not data_to_return:
+        if not data_to_return and not request.args.get('cursor'):
             return make_response(jsonify({"error": "No reviews found for any flight"}), 404)
 
-        return make_response(jsonify(data_to_return), 200)
+        return page_response(data_to_return, next_cursor)
 
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
 
 
+def _parse_star(value):
+    try:
+        star = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Star rating must be a number")
+    if star < 1 or star > 5:
+        raise ValueError("Star rating must be between 1 and 5")
+    return star
+
+def parse_new_review(f_id, data):
+    """The review document to insert (without created_at) from a POST body. Raises ValueError."""
+    if not data or not data.get('username') or not data.get('comment') or not data.get('star'):
+        raise ValueError("Missing required fields")
+    return {
+        "_id": str(uuid.uuid4()),
+        "flight_number": f_id,
+        "username": data['username'],
+        "comment": data['comment'],
+        "star": _parse_star(data.get('star'))
+    }
+
+def parse_review_update(data):
+    """The fields to $set from a PUT body. Raises ValueError."""
+    update_fields = {field: data[field] for field in ("username", "comment", "star") if field in (data or {})}
+    if not update_fields:
+        raise ValueError("Nothing to update")
+    if "star" in update_fields:
+        update_fields["star"] = _parse_star(update_fields["star"])
+    return update_fields
+
 ##################################### ADD A NEW REVIEW #####################################
 @reviews_bp.route('/flights/<string:f_id>/reviews', methods=['POST'])
 @jwt_required
 def add_review(f_id):
     """Add a review for a flight"""
     try:
-        data = request.json
-
-        if not data or not data.get('username') or not data.get('comment') or not data.get('star'):
-            return make_response(jsonify({"error": "Missing required fields"}), 400)
-
         try:
-            star = int(data.get('star'))
-            if star < 1 or star > 5:
-                return make_response(jsonify({"error": "Star rating must be between 1 and 5"}), 400)
-        except ValueError:
-            return make_response(jsonify({"error": "Star rating must be a number"}), 400)
+            new_review = parse_new_review(f_id, request.json)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
 
-        flight = flights.find_one({'flight_number': f_id})
-
-        if not flight:
+        if flights.count_documents({'flight_number': f_id}, limit=1) == 0:
             return make_response(jsonify({"error": "Flight not found"}), 404)
 
-        new_review = {
-            "_id": str(uuid.uuid4()),
-            "username": data['username'],
-            "comment": data['comment'],
-            "star": star
-        }
-
-        flights.update_one({'flight_number': f_id}, {"$push": {"reviews": new_review}})
+        reviews.insert_one(dict(new_review, created_at=datetime.datetime.utcnow()))
+        apply_rating_delta(f_id, added=new_review["star"])
         return make_response(jsonify({"message": "Review added successfully", "review": new_review}), 201)
 
     except Exception as e:
@@ -99,27 +137,23 @@ def add_review(f_id):
 def update_review(f_id, review_id):
     """Update a specific review for a flight"""
     try:
-        data = request.json
-        flight = flights.find_one({'flight_number': f_id})
-
-        if not flight:
-            return make_response(jsonify({"error": "Flight not found"}), 404)
-
-        updated_reviews = []
-        review_found = False
-
-        for review in flight["reviews"]:
-            if str(review["_id"]) == review_id:
-                review["username"] = data.get("username", review["username"])
-                review["comment"] = data.get("comment", review["comment"])
-                review["star"] = data.get("star", review["star"])
-                review_found = True
-            updated_reviews.append(review)
-
-        if not review_found:
+        try:
+            update_fields = parse_review_update(request.json)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+
+        old_review = reviews.find_one_and_update(
+            {'_id': review_id, 'flight_number': f_id},
+            {"$set": update_fields},
+            projection={"star": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if old_review is None:
             return make_response(jsonify({"error": "Review not found"}), 404)
 
-        flights.update_one({'flight_number': f_id}, {"$set": {"reviews": updated_reviews}})
+        if update_fields.get("star", old_review["star"]) != old_review["star"]:
+            apply_rating_delta(f_id, added=update_fields["star"], removed=old_review["star"])
+
         return make_response(jsonify({"message": "Review updated successfully"}), 200)
 
     except Exception as e:
@@ -133,18 +167,58 @@ def update_review(f_id, review_id):
 def delete_review(f_id, review_id):
     """Admin can delete a specific review from a flight"""
     try:
-        flight = flights.find_one({'flight_number': f_id})
-
-        if not flight:
-            return make_response(jsonify({"error": "Flight not found"}), 404)
-
-        updated_reviews = [review for review in flight["reviews"] if str(review["_id"]) != review_id]
-
-        if len(updated_reviews) == len(flight["reviews"]):
+        review = reviews.find_one_and_delete({'_id': review_id, 'flight_number': f_id}, projection={"star": 1})
+        if review is None:
             return make_response(jsonify({"error": "Review not found"}), 404)
+        apply_rating_delta(f_id, removed=review["star"])
 
-        flights.update_one({'flight_number': f_id}, {"$set": {"reviews": updated_reviews}})
         return make_response(jsonify({"message": "Review deleted successfully"}), 200)
 
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
+
+
+##################################### MIGRATE EMBEDDED REVIEWS #####################################
+def migrate_embedded_reviews(batch_size=500):
+    """Move flights.reviews arrays into the reviews collection. Safe to re-run."""
+    migrated = 0
+    review_writes = []
+    flight_writes = []
+
+    def flush():
+        if review_writes:
+            reviews.bulk_write(review_writes, ordered=False)
+        # Only drop the embedded arrays once their reviews are safely copied
+        if flight_writes:
+            flights.bulk_write(flight_writes, ordered=False)
+        review_writes.clear()
+        flight_writes.clear()
+
+    cursor = flights.find({"reviews": {"$exists": True}}, {"flight_number": 1, "reviews": 1})
+    for flight in cursor.batch_size(batch_size):
+        for review in flight.get("reviews") or []:
+            # Old update_review stored whatever it was sent; keep the review but not a star that isn't 1-5
+            try:
+                star = int(review.get("star"))
+            except (TypeError, ValueError):
+                star = None
+            if star is not None and not 1 <= star <= 5:
+                star = None
+            doc = {
+                "_id": str(review["_id"]),
+                "flight_number": flight["flight_number"],
+                "username": review.get("username"),
+                "comment": review.get("comment"),
+                "star": star,
+                "created_at": review.get("created_at") or (
+                    review["_id"].generation_time.replace(tzinfo=None) if isinstance(review["_id"], ObjectId)
+                    else datetime.datetime.utcnow()
+                )
+            }
+            review_writes.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+            migrated += 1
+        flight_writes.append(UpdateOne({"_id": flight["_id"]}, {"$unset": {"reviews": ""}}))
+        if len(review_writes) >= batch_size or len(flight_writes) >= batch_size:
+            flush()
+    flush()
+    return migrated
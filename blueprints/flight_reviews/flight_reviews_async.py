@@ -0,0 +1,124 @@
+from quart import Blueprint, request, jsonify
+from async_decorators import jwt_required, admin_required
+from pymongo import ReturnDocument
+import datetime
+
+import async_mongo
+from ratings import apply_rating_delta_async
+from pagination import parse_limit, fetch_page_async, page_headers
+from blueprints.flight_reviews.flight_reviews import (review_page_query, review_page_result, parse_new_review,
+                                                     parse_review_update, REVIEW_SORT)
+
+reviews_bp = Blueprint('reviews_bp', __name__)
+
+async def _review_page(query):
+    """One page of reviews; returns (reviews, next cursor or None)"""
+    limit = parse_limit(request.args)
+    query = review_page_query(query, request.args.get('cursor'))
+    return review_page_result(*await fetch_page_async(async_mongo.db.reviews.find(query).sort(REVIEW_SORT), limit))
+
+##################################### GET ALL REVIEWS FOR A FLIGHT #####################################
+@reviews_bp.route('/flights/<string:f_id>/reviews', methods=['GET'])
+async def get_review(f_id):
+    """Retrieve one page of reviews for a specific flight"""
+    try:
+        try:
+            data_to_return, next_cursor = await _review_page({'flight_number': f_id})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if not data_to_return and not request.args.get('cursor'):
+            return jsonify({"error": "Flight not found or no reviews available"}), 404
+
+        return jsonify(data_to_return), 200, page_headers(next_cursor)
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+##################################### GET ALL REVIEWS FROM ALL FLIGHTS #####################################
+@reviews_bp.route('/flights/reviews', methods=['GET'])
+async def get_all_reviews():
+    """Retrieve one page of reviews across all flights"""
+    try:
+        try:
+            data_to_return, next_cursor = await _review_page({})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if not data_to_return and not request.args.get('cursor'):
+            return jsonify({"error": "No reviews found for any flight"}), 404
+
+        return jsonify(data_to_return), 200, page_headers(next_cursor)
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+##################################### ADD A NEW REVIEW #####################################
+@reviews_bp.route('/flights/<string:f_id>/reviews', methods=['POST'])
+@jwt_required
+async def add_review(f_id):
+    """Add a review for a flight"""
+    try:
+        try:
+            new_review = parse_new_review(f_id, await request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if await async_mongo.db.flights.count_documents({'flight_number': f_id}, limit=1) == 0:
+            return jsonify({"error": "Flight not found"}), 404
+
+        await async_mongo.db.reviews.insert_one(dict(new_review, created_at=datetime.datetime.utcnow()))
+        await apply_rating_delta_async(f_id, added=new_review["star"])
+        return jsonify({"message": "Review added successfully", "review": new_review}), 201
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+##################################### UPDATE A REVIEW #####################################
+@reviews_bp.route('/flights/<string:f_id>/reviews/<string:review_id>', methods=['PUT'])
+@jwt_required
+async def update_review(f_id, review_id):
+    """Update a specific review for a flight"""
+    try:
+        try:
+            update_fields = parse_review_update(await request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        old_review = await async_mongo.db.reviews.find_one_and_update(
+            {'_id': review_id, 'flight_number': f_id},
+            {"$set": update_fields},
+            projection={"star": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if old_review is None:
+            return jsonify({"error": "Review not found"}), 404
+
+        if update_fields.get("star", old_review["star"]) != old_review["star"]:
+            await apply_rating_delta_async(f_id, added=update_fields["star"], removed=old_review["star"])
+
+        return jsonify({"message": "Review updated successfully"}), 200
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+##################################### DELETE A REVIEW  #####################################
+@reviews_bp.route('/flights/<string:f_id>/reviews/<string:review_id>', methods=['DELETE'])
+@jwt_required
+@admin_required
+async def delete_review(f_id, review_id):
+    """Admin can delete a specific review from a flight"""
+    try:
+        review = await async_mongo.db.reviews.find_one_and_delete({'_id': review_id, 'flight_number': f_id}, projection={"star": 1})
+        if review is None:
+            return jsonify({"error": "Review not found"}), 404
+        await apply_rating_delta_async(f_id, removed=review["star"])
+
+        return jsonify({"message": "Review deleted successfully"}), 200
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
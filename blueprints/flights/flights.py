@@ -1,49 +1,180 @@
-from flask import Blueprint, request, jsonify, make_response
+from flask import Blueprint, Response, request, jsonify, make_response, g, stream_with_context
 from decorators import jwt_required, admin_required
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 import uuid
 import datetime
+import re
 import globalaccess
+from cache import search_cache, flight_cache, query_key, search_tags
+from signals import send_flight_changed
+from ratings import full_rating
+from pagination import parse_limit, decode_cursor, encode_cursor, keyset_filter, fetch_page, page_response, wants_ndjson, ndjson_response
+from inventory import reserve_seats, release_seats, FlightNotFound, SeatsUnavailable
+from flight_snapshot import flight_snapshot
+from holds import create_hold, take_from_hold, release_hold, parse_hold_request, hold_response, HoldUnavailable
+from exports import (build_export_query, export_cursor, summary_cursor, columns_for, csv_chunks, ndjson_lines,
+                     export_filename, EXPORT_FORMATS, SUMMARY_GROUPS)
 
 flights_bp = Blueprint('flights_bp', __name__)
 
 flights = globalaccess.db.flights
 bookings = globalaccess.db.bookings
 
+# sort_by value -> indexed document field
+SORTABLE_FIELDS = {"departure_time": "departure_time", "price": "price", "rating": "rating.avg"}
+
+FIELD_PATH = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+MAX_FIELDS = 50
+
+def parse_fields(args):
+    """?fields=flight_number,price,rating.avg -> list of field paths, or None for whole documents.
+
+    Raises ValueError for anything that isn't a plain (dotted) field name.
+    """
+    value = args.get('fields')
+    if not value:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields or len(fields) > MAX_FIELDS or not all(FIELD_PATH.match(field) for field in fields):
+        raise ValueError("fields must be a comma separated list of field names")
+    return fields
+
+def flight_projection(fields, required=()):
+    """Mongo projection for the requested fields plus those needed internally (sort keys for the cursor)"""
+    if fields is None:
+        return {"_id": 0, "reaped_holds": 0, "seats_version": 0}  # inventory.py bookkeeping
+    paths = set(fields) | set(required)
+    # Mongo rejects a projection naming both "rating" and "rating.avg"
+    paths = [path for path in paths if not any(path.startswith(other + ".") for other in paths)]
+    return dict({"_id": 0}, **{path: 1 for path in sorted(paths)})
+
+def shape_flight(flight, fields):
+    """Drop fields fetched only for internal use and fill in the rating when it was asked for"""
+    if fields is None:
+        flight["rating"] = full_rating(flight.get("rating"))
+        return flight
+    wanted = {field.split(".")[0] for field in fields}
+    for key in [key for key in flight if key not in wanted]:
+        del flight[key]
+    if "rating" in fields:
+        flight["rating"] = full_rating(flight.get("rating"))
+    return flight
+
+def _int_arg(args, name):
+    try:
+        return int(args.get(name))
+    except (TypeError, ValueError):
+        return None
+
+def build_search_query(args):
+    """Translate search arguments into an index-friendly (query, sort) pair.
+
+    Raises ValueError for arguments that cannot be served from an index.
+    """
+    departure = args.get('departure_location')
+    arrival = args.get('arrival_location')
+    date = args.get('date')
+    min_price = _int_arg(args, 'min_price')
+    max_price = _int_arg(args, 'max_price')
+    sort_by = args.get('sort_by') or "departure_time"
+    sort_order = args.get('sort_order') or "asc"
+
+    if sort_by not in SORTABLE_FIELDS:
+        raise ValueError(f"sort_by must be one of: {', '.join(SORTABLE_FIELDS)}")
+
+    query = {}
+    if departure:
+        query["departure_airport"] = departure
+    if arrival:
+        query["arrival_airport"] = arrival
+    if date:
+        try:
+            day = datetime.date.fromisoformat(date)
+        except ValueError:
+            raise ValueError("date must be in YYYY-MM-DD format")
+        # departure_time is an ISO string, so one day is the half-open range [day, day + 1)
+        query["departure_time"] = {"$gte": day.isoformat(), "$lt": (day + datetime.timedelta(days=1)).isoformat()}
+    if min_price is not None:
+        query["price"] = {"$gte": min_price}
+    if max_price is not None:
+        query.setdefault("price", {})["$lte"] = max_price
+
+    sort_order_value = 1 if sort_order == "asc" else -1
+    # flight_number breaks ties so the order is total and keyset pagination is stable
+    return query, [(SORTABLE_FIELDS[sort_by], sort_order_value), ("flight_number", sort_order_value)]
+
+def _sort_value(flight, field):
+    for part in field.split("."):
+        flight = (flight or {}).get(part)
+    return flight
+
+def search_page_query(query, sort, cursor):
+    """(query narrowed to the page after `cursor`, decoded cursor or None). Raises ValueError."""
+    if not cursor:
+        return query, None
+    after = decode_cursor(cursor)
+    (field, direction), _ = sort
+    return {"$and": [query, keyset_filter(field, after[0], "flight_number", after[1], direction)]}, after
+
+def search_cache_key(query, sort, limit, fields):
+    return query_key(query, sort) + f"|{limit}|{','.join(fields or ())}"
+
+def search_page_result(flights_list, has_more, sort, fields):
+    """((shaped flights, next cursor or None), cache tags) for one fetched page"""
+    next_cursor = None
+    if has_more:
+        last = flights_list[-1]
+        next_cursor = encode_cursor([_sort_value(last, sort[0][0]), last["flight_number"]])
+    tags = search_tags(flights_list, sort)
+    return ([shape_flight(flight, fields) for flight in flights_list], next_cursor), tags
+
+def snapshot_page(numbers, found):
+    """The documents read for a snapshot-ordered page, in the snapshot's order"""
+    return [found[n] for n in numbers if n in found]
+
 ##################################### SEARCH FLIGHTS  #####################################
 @flights_bp.route('/flights', methods=['GET'])
 def search_flights():
     try:
-        departure = request.args.get('departure_location')
-        arrival = request.args.get('arrival_location')
-        date = request.args.get('date')
-        min_price = request.args.get('min_price', type=int)
-        max_price = request.args.get('max_price', type=int)
-        sort_by = request.args.get('sort_by', default="departure_time")
-        sort_order = request.args.get('sort_order', default="asc")
-
-        query = {}
-        if departure:
-            query["departure_airport"] = departure
-        if arrival:
-            query["arrival_airport"] = arrival
-        if date:
-            query["departure_time"] = {"$regex": f"^{date}"}
-        if min_price is not None:
-            query["price"] = {"$gte": min_price}
-        if max_price is not None:
-            if "price" in query:
-                query["price"]["$lte"] = max_price
-            else:
-                query["price"] = {"$lte": max_price}
+        try:
+            query, sort = build_search_query(request.args)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+
+        try:
+            limit = parse_limit(request.args)
+            fields = parse_fields(request.args)
+            cursor = request.args.get('cursor')
+            query, after = search_page_query(query, sort, cursor)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
 
-        sort_order_value = 1 if sort_order == "asc" else -1
-        flights_list = list(flights.find(query, {"_id": 0}).sort([(sort_by, sort_order_value)]))
+        if wants_ndjson(request):
+            stream_limit = limit if request.args.get('limit') else 0
+            return ndjson_response(flights.find(query, flight_projection(fields)).sort(sort).limit(stream_limit).batch_size(500),
+                                   transform=lambda flight: shape_flight(flight, fields))
 
-        if not flights_list:
+        key = search_cache_key(query, sort, limit, fields)
+        page = search_cache.get(key)
+        if page is None:
+            projection = flight_projection(fields, required=(sort[0][0], "flight_number"))
+            ordered = flight_snapshot.search(request.args, sort, after, limit) if flight_snapshot.enabled else None
+            if ordered is not None:
+                # The snapshot picked and ordered the page; read just those documents
+                numbers, has_more = ordered
+                found = {f["flight_number"]: f for f in flights.find({"flight_number": {"$in": numbers}}, projection)}
+                flights_list = snapshot_page(numbers, found)
+            else:
+                flights_list, has_more = fetch_page(flights.find(query, projection).sort(sort), limit)
+            page, tags = search_page_result(flights_list, has_more, sort, fields)
+            search_cache.set(key, page, tags=tags)
+        flights_list, next_cursor = page
+
+        if not flights_list and not cursor:
             return make_response(jsonify({"error": "No flights found for the given criteria"}), 404)
 
-        return make_response(jsonify(flights_list), 200)
+        return page_response(flights_list, next_cursor)
 
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
@@ -52,64 +183,208 @@ def search_flights():
 @flights_bp.route('/flights/<string:flight_number>', methods=['GET'])
 def get_flight_details(flight_number):
     try:
-        flight = flights.find_one({'flight_number': flight_number}, {"_id": 0})
-        if not flight:
-            return make_response(jsonify({"error": "Flight not found"}), 404)
+        try:
+            fields = parse_fields(request.args)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+
+        key = flight_number if fields is None else f"{flight_number}|{','.join(fields)}"
+        flight = flight_cache.get(key)
+        if flight is None:
+            flight = flights.find_one({'flight_number': flight_number}, flight_projection(fields))
+            if flight is None:
+                return make_response(jsonify({"error": "Flight not found"}), 404)
+            flight = shape_flight(flight, fields)
+            flight_cache.set(key, flight, tags=[flight_number])
         return make_response(jsonify(flight), 200)
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
 
+BOOKING_REQUIRED_FIELDS = ["passenger_name", "passport_number", "email", "phone_number", "flight_number", "seat_class", "contact_details"]
+BOOKING_UPDATE_FIELDS = ["passenger_name", "passport_number", "email", "phone_number", "seat_class", "contact_details"]
+FLIGHT_STATUSES = ["On Time", "Delayed", "Cancelled", "Boarding", "Departed", "Landed"]
+MAX_BATCH_SIZE = 100
+
+def _new_booking(data, flight_number, user):
+    return {
+        "_id": str(uuid.uuid4()),
+        "passenger_name": data["passenger_name"],
+        "passport_number": data["passport_number"],
+        "email": data["email"],
+        "phone_number": data["phone_number"],
+        "flight_number": flight_number,
+        "seat_class": data["seat_class"],
+        "contact_details": data["contact_details"],
+        "user": user,
+        "booking_time": datetime.datetime.utcnow()
+    }
+
+def reservation_error(error, flight_number, seats=None):
+    """(body, status) for a failed reservation; seats=None for a single booking"""
+    if isinstance(error, HoldUnavailable):
+        if seats is None:
+            return {"error": "Hold not found, expired or already used"}, 409
+        return {"error": f"Hold not found, expired or holding fewer than {seats} seats"}, 409
+    if isinstance(error, FlightNotFound):
+        return {"error": f"Flight '{flight_number}' not found"}, 404
+    return {"error": "No seats available" if seats is None else f"Fewer than {seats} seats available"}, 400
+
+def batch_request_error(data):
+    """(body, status) if a batch booking request is malformed, else None"""
+    if not data or not data.get("flight_number") or not isinstance(data.get("passengers"), list) or not data["passengers"]:
+        return {"error": "flight_number and a non-empty passengers list are required"}, 400
+    if len(data["passengers"]) > MAX_BATCH_SIZE:
+        return {"error": f"At most {MAX_BATCH_SIZE} passengers per batch"}, 400
+    flight_number = data["flight_number"].strip()
+    results = []
+    for index, passenger in enumerate(data["passengers"]):
+        passenger = dict(passenger, flight_number=flight_number) if isinstance(passenger, dict) else {}
+        missing = [field for field in BOOKING_REQUIRED_FIELDS if field not in passenger]
+        if missing:
+            results.append({"index": index, "status": "invalid", "missing_fields": missing})
+    if results:
+        return {"error": "Missing required fields", "results": results}, 400
+    return None
+
+def batch_failed_indexes(error):
+    """Indexes of the bookings a BulkWriteError says were not written"""
+    return {write_error["index"] for write_error in error.details.get("writeErrors", [])}
+
+def batch_result(new_bookings, failed):
+    """(body, status) once a batch has been written; status 207 if some bookings failed"""
+    results = []
+    for index, booking in enumerate(new_bookings):
+        if index in failed:
+            results.append({"index": index, "status": "failed"})
+        else:
+            results.append({"index": index, "status": "booked", "booking_id": booking["_id"]})
+    seats = len(new_bookings)
+    body = {"message": f"{seats - len(failed)} of {seats} bookings successful", "results": results}
+    return body, 201 if not failed else 207
+
+def parse_status_update(data):
+    """{status[, gate]} to $set from a status update body. Raises ValueError."""
+    if data.get("status") not in FLIGHT_STATUSES:
+        raise ValueError("Invalid status")
+    changes = {"status": data["status"]}
+    if data.get("gate"):
+        changes["gate"] = str(data["gate"])
+    return changes
+
 ##################################### BOOK A FLIGHT TICKET #####################################
 @flights_bp.route('/bookings', methods=['POST'])
 @jwt_required
 def book_ticket():
     try:
         data = request.json
-        required_fields = ["passenger_name", "passport_number", "email", "phone_number", "flight_number", "seat_class", "contact_details"]
-        if not all(field in data for field in required_fields):
+        if not all(field in data for field in BOOKING_REQUIRED_FIELDS):
             return make_response(jsonify({"error": "Missing required fields"}), 400)
 
         flight_number = data["flight_number"].strip()
-        flight = flights.find_one({"flight_number": flight_number})
-        if not flight:
-            return make_response(jsonify({"error": f"Flight '{flight_number}' not found"}), 404)
-
-        if flight["seats_available"] <= 0:
-            return make_response(jsonify({"error": "No seats available"}), 400)
-
-        booking_id = str(uuid.uuid4())
-        new_booking = {
-            "_id": booking_id,
-            "passenger_name": data["passenger_name"],
-            "passport_number": data["passport_number"],
-            "email": data["email"],
-            "phone_number": data["phone_number"],
-            "flight_number": flight_number,
-            "seat_class": data["seat_class"],
-            "contact_details": data["contact_details"],
-            "booking_time": datetime.datetime.utcnow()
-        }
-
-        bookings.insert_one(new_booking)
-        flights.update_one({"flight_number": flight_number}, {"$inc": {"seats_available": -1}})
+        try:
+            if data.get("hold_id"):
+                # The seat was taken off the flight when the hold was made; only the hold changes
+                take_from_hold(data["hold_id"], flight_number, g.jwt_claims.get('user'))
+            else:
+                reserve_seats(flight_number)
+        except (HoldUnavailable, FlightNotFound, SeatsUnavailable) as e:
+            body, status = reservation_error(e, flight_number)
+            return make_response(jsonify(body), status)
+
+        new_booking = _new_booking(data, flight_number, g.jwt_claims.get('user'))
+        booking_id = new_booking["_id"]
+
+        try:
+            bookings.insert_one(new_booking)
+        except Exception:
+            # Compensate the reservation so a failed insert doesn't leak a seat
+            release_seats(flight_number)
+            raise
 
         return make_response(jsonify({"message": "Booking successful", "booking_id": booking_id, "passenger_details": new_booking}), 201)
 
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
 
+##################################### BOOK A GROUP OF PASSENGERS #####################################
+@flights_bp.route('/bookings/batch', methods=['POST'])
+@jwt_required
+def book_tickets_batch():
+    try:
+        data = request.json
+        error = batch_request_error(data)
+        if error:
+            return make_response(jsonify(error[0]), error[1])
+
+        flight_number = data["flight_number"].strip()
+        # The whole group gets its seats in one atomic update or not at all
+        seats = len(data["passengers"])
+        try:
+            if data.get("hold_id"):
+                take_from_hold(data["hold_id"], flight_number, g.jwt_claims.get('user'), seats)
+            else:
+                reserve_seats(flight_number, seats)
+        except (HoldUnavailable, FlightNotFound, SeatsUnavailable) as e:
+            body, status = reservation_error(e, flight_number, seats)
+            return make_response(jsonify(body), status)
+
+        new_bookings = [_new_booking(passenger, flight_number, g.jwt_claims.get('user')) for passenger in data["passengers"]]
+        failed = set()
+        try:
+            bookings.insert_many(new_bookings, ordered=False)
+        except BulkWriteError as e:
+            failed = batch_failed_indexes(e)
+        except Exception:
+            release_seats(flight_number, seats)
+            raise
+        if failed:
+            # Give back the seats of the passengers whose booking could not be written
+            release_seats(flight_number, len(failed))
+
+        body, status = batch_result(new_bookings, failed)
+        return make_response(jsonify(body), status)
+
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
+
+##################################### HOLD SEATS #####################################
+@flights_bp.route('/flights/<string:flight_number>/holds', methods=['POST'])
+@jwt_required
+def hold_seats(flight_number):
+    try:
+        try:
+            seats, seconds = parse_hold_request(request.get_json(silent=True) or {})
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+
+        try:
+            hold = create_hold(flight_number, seats, g.jwt_claims.get('user'), seconds)
+        except (FlightNotFound, SeatsUnavailable) as e:
+            body, status = reservation_error(e, flight_number, seats)
+            return make_response(jsonify(body), status)
+
+        return make_response(jsonify(hold_response(hold)), 201)
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
+
+##################################### RELEASE A HOLD #####################################
+@flights_bp.route('/holds/<string:hold_id>', methods=['DELETE'])
+@jwt_required
+def delete_hold(hold_id):
+    try:
+        if release_hold(hold_id, g.jwt_claims.get('user')) is None:
+            return make_response(jsonify({"error": "Hold not found or no longer active"}), 404)
+        return make_response(jsonify({"message": "Hold released"}), 200)
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
+
 ##################################### UPDATE A BOOKING #####################################
 @flights_bp.route('/bookings/<string:booking_id>', methods=['PUT'])
 @jwt_required
 def update_booking(booking_id):
     try:
         data = request.json
-        update_fields = {}
-
-        allowed_fields = ["passenger_name", "passport_number", "email", "phone_number", "seat_class", "contact_details"]
-        for field in allowed_fields:
-            if field in data:
-                update_fields[field] = data[field]
+        update_fields = {field: data[field] for field in BOOKING_UPDATE_FIELDS if field in data}
 
         result = bookings.update_one({"_id": booking_id}, {"$set": update_fields})
         if result.matched_count == 0:
@@ -124,9 +399,10 @@ def update_booking(booking_id):
 @jwt_required
 def delete_booking(booking_id):
     try:
-        result = bookings.delete_one({"_id": booking_id})
-        if result.deleted_count == 0:
+        booking = bookings.find_one_and_delete({"_id": booking_id}, projection={"flight_number": 1})
+        if booking is None:
             return make_response(jsonify({"error": "Booking not found"}), 404)
+        release_seats(booking["flight_number"])
         return make_response(jsonify({"message": "Booking deleted successfully"}), 200)
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
@@ -137,29 +413,139 @@ def delete_booking(booking_id):
 @admin_required
 def update_flight_status(flight_number):
     try:
-        data = request.json
-        new_status = data.get("status")
-        valid_statuses = ["On Time", "Delayed", "Cancelled", "Boarding", "Departed", "Landed"]
-        if new_status not in valid_statuses:
-            return make_response(jsonify({"error": "Invalid status"}), 400)
+        try:
+            changes = parse_status_update(request.json)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
 
-        result = flights.update_one({"flight_number": flight_number}, {"$set": {"status": new_status}})
+        result = flights.update_one({"flight_number": flight_number}, {"$set": changes})
         if result.matched_count == 0:
             return make_response(jsonify({"error": "Flight not found"}), 404)
+        send_flight_changed(flight_number, changes=changes)
 
-        return make_response(jsonify({"message": f"Flight status updated to '{new_status}'"}), 200)
+        return make_response(jsonify({"message": f"Flight status updated to '{changes['status']}'"}), 200)
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
 
+def booking_json(booking):
+    return dict(booking, _id=str(booking["_id"]))
+
+def all_bookings_query(cursor):
+    """Bookings after `cursor` in _id order. Raises ValueError."""
+    return {"_id": {"$gt": decode_cursor(cursor)[0]}} if cursor else {}
+
+def all_bookings_result(bookings_list, has_more):
+    """(bookings, next cursor or None) for one fetched page in _id order"""
+    next_cursor = encode_cursor([bookings_list[-1]["_id"]]) if has_more else None
+    return [booking_json(booking) for booking in bookings_list], next_cursor
+
 ##################################### GET ALL BOOKINGS #####################################
 @flights_bp.route('/bookings', methods=['GET'])
 @jwt_required
 def get_all_bookings():
     try:
-        bookings_list = list(bookings.find({}))
-        for booking in bookings_list:
-            booking["_id"] = str(booking["_id"])
-        return make_response(jsonify(bookings_list), 200)
+        try:
+            limit = parse_limit(request.args)
+            query = all_bookings_query(request.args.get('cursor'))
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+
+        if wants_ndjson(request):
+            stream_limit = limit if request.args.get('limit') else 0
+            return ndjson_response(bookings.find(query).sort("_id", 1).limit(stream_limit).batch_size(1000),
+                                   transform=booking_json)
+
+        return page_response(*all_bookings_result(*fetch_page(bookings.find(query).sort("_id", 1), limit)))
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
+
+##################################### EXPORT BOOKINGS #####################################
+def export_args(args):
+    """(format, group_by, query, Content-Disposition headers) for an export. Raises ValueError."""
+    export_format = args.get('format') or 'csv'
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    group_by = args.get('group_by') or None
+    if group_by is not None and group_by not in SUMMARY_GROUPS:
+        raise ValueError(f"group_by must be one of: {', '.join(SUMMARY_GROUPS)}")
+    start, end, flight_number = args.get('from'), args.get('to'), args.get('flight_number')
+    query = build_export_query(start, end, flight_number)
+    filename = export_filename(export_format, start, end, flight_number, group_by)
+    return export_format, group_by, query, {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+@flights_bp.route('/bookings/export', methods=['GET'])
+@jwt_required
+@admin_required
+def export_bookings():
+    """Bookings by date range and/or flight as CSV or NDJSON, optionally summarized per flight, day or class"""
+    try:
+        try:
+            export_format, group_by, query, headers = export_args(request.args)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+
+        if group_by:
+            cursor = summary_cursor(bookings, query, group_by)
+        else:
+            cursor = export_cursor(bookings, query)
+        if export_format == 'csv':
+            chunks, mimetype = csv_chunks(cursor, columns_for(group_by)), 'text/csv'
+        else:
+            chunks, mimetype = ndjson_lines(cursor), 'application/x-ndjson'
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
+
+BOOKINGS_PAGE_SORT = [("booking_time", -1), ("_id", -1)]
+
+def bookings_page_query(scope, cursor):
+    """Newest-first keyset query over the bookings matching scope, which must prefix a (..., booking_time, _id) index"""
+    query = dict(scope)
+    if cursor:
+        booking_time, booking_id = decode_cursor(cursor)
+        query.update(keyset_filter("booking_time", datetime.datetime.fromisoformat(booking_time), "_id", booking_id, -1))
+    return query
+
+def bookings_page_result(bookings_list, has_more):
+    """(bookings, next cursor or None) for one fetched newest-first page"""
+    next_cursor = None
+    if has_more:
+        last = bookings_list[-1]
+        next_cursor = encode_cursor([last["booking_time"].isoformat(), last["_id"]])
+    return [booking_json(booking) for booking in bookings_list], next_cursor
+
+def _bookings_page(scope):
+    """One newest-first page of the bookings matching scope; returns (bookings, next cursor or None)"""
+    limit = parse_limit(request.args)
+    query = bookings_page_query(scope, request.args.get('cursor'))
+    return bookings_page_result(*fetch_page(bookings.find(query).sort(BOOKINGS_PAGE_SORT), limit))
+
+##################################### GET MY BOOKINGS #####################################
+@flights_bp.route('/bookings/me', methods=['GET'])
+@jwt_required
+def get_my_bookings():
+    try:
+        scope = {"user": g.jwt_claims.get('user')}
+        try:
+            bookings_list, next_cursor = _bookings_page(scope)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+        return page_response(bookings_list, next_cursor, total=bookings.count_documents(scope))
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
+
+##################################### GET BOOKINGS FOR A FLIGHT #####################################
+@flights_bp.route('/flights/<string:flight_number>/bookings', methods=['GET'])
+@jwt_required
+@admin_required
+def get_flight_bookings(flight_number):
+    try:
+        scope = {"flight_number": flight_number}
+        try:
+            bookings_list, next_cursor = _bookings_page(scope)
+        except ValueError as e:
+            return make_response(jsonify({"error": str(e)}), 400)
+        return page_response(bookings_list, next_cursor, total=bookings.count_documents(scope))
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
 
@@ -171,7 +557,13 @@ def get_booking(booking_id):
         booking = bookings.find_one({'_id': booking_id})
         if not booking:
             return make_response(jsonify({"error": "Booking not found"}), 404)
-        booking["_id"] = str(booking["_id"])
-        return make_response(jsonify(booking), 200)
+        return make_response(jsonify(booking_json(booking)), 200)
     except Exception as e:
         return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
+
+##################################### CACHE STATISTICS #####################################
+@flights_bp.route('/cache/stats', methods=['GET'])
+@jwt_required
+@admin_required
+def get_cache_stats():
+    return make_response(jsonify({"search": search_cache.stats(), "flights": flight_cache.stats()}), 200)
@@ -0,0 +1,371 @@
+from quart import Blueprint, Response, request, jsonify, g, current_app
+from async_decorators import jwt_required, admin_required
+from pymongo.errors import BulkWriteError
+
+import async_mongo
+from cache import search_cache, flight_cache
+from pagination import parse_limit, fetch_page_async, page_headers, wants_ndjson
+from inventory import reserve_seats_async, release_seats_async, FlightNotFound, SeatsUnavailable
+from flight_snapshot import flight_snapshot
+from holds import (create_hold_async, take_from_hold_async, release_hold_async, parse_hold_request, hold_response,
+                   HoldUnavailable)
+from exports import export_cursor, summary_pipeline, columns_for, CsvChunker, EXPORT_BATCH_SIZE
+from blueprints.flights.flights import (build_search_query, parse_fields, flight_projection, shape_flight,
+                                       search_page_query, search_cache_key, search_page_result, snapshot_page,
+                                       _new_booking, reservation_error, batch_request_error, batch_failed_indexes,
+                                       batch_result, parse_status_update, booking_json, all_bookings_query,
+                                       all_bookings_result, bookings_page_query, bookings_page_result, export_args,
+                                       BOOKING_REQUIRED_FIELDS, BOOKING_UPDATE_FIELDS, BOOKINGS_PAGE_SORT)
+
+# The same routes as flights.py, served by the ASGI app (asgi.py) on the async Mongo client.
+# Everything but the I/O - query building, validation, caching, paging and
+# response bodies - is shared with the sync blueprint.
+
+flights_bp = Blueprint('flights_bp', __name__)
+
+def _ndjson_response(cursor, transform=None):
+    """Stream an async Mongo cursor as one JSON document per line"""
+    dumps = current_app.json.dumps
+
+    async def generate():
+        try:
+            async for doc in cursor:
+                if transform is not None:
+                    doc = transform(doc)
+                yield dumps(doc) + '\n'
+        finally:
+            await cursor.close()
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def _csv_response(cursor, columns):
+    """Stream an async Mongo cursor as CSV, a chunk of rows at a time"""
+    async def generate():
+        chunker = CsvChunker(columns)
+        try:
+            async for doc in cursor:
+                chunk = chunker.add(doc)
+                if chunk:
+                    yield chunk
+            yield chunker.flush()
+        finally:
+            await cursor.close()
+    return Response(generate(), mimetype='text/csv')
+
+##################################### SEARCH FLIGHTS  #####################################
+@flights_bp.route('/flights', methods=['GET'])
+async def search_flights():
+    try:
+        try:
+            query, sort = build_search_query(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            limit = parse_limit(request.args)
+            fields = parse_fields(request.args)
+            cursor = request.args.get('cursor')
+            query, after = search_page_query(query, sort, cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        flights = async_mongo.db.flights
+        if wants_ndjson(request):
+            stream_limit = limit if request.args.get('limit') else 0
+            return _ndjson_response(flights.find(query, flight_projection(fields)).sort(sort).limit(stream_limit).batch_size(500),
+                                    transform=lambda flight: shape_flight(flight, fields))
+
+        key = search_cache_key(query, sort, limit, fields)
+        page = search_cache.get(key)
+        if page is None:
+            projection = flight_projection(fields, required=(sort[0][0], "flight_number"))
+            ordered = flight_snapshot.search(request.args, sort, after, limit) if flight_snapshot.enabled else None
+            if ordered is not None:
+                numbers, has_more = ordered
+                found = {f["flight_number"]: f async for f in flights.find({"flight_number": {"$in": numbers}}, projection)}
+                flights_list = snapshot_page(numbers, found)
+            else:
+                flights_list, has_more = await fetch_page_async(flights.find(query, projection).sort(sort), limit)
+            page, tags = search_page_result(flights_list, has_more, sort, fields)
+            search_cache.set(key, page, tags=tags)
+        flights_list, next_cursor = page
+
+        if not flights_list and not cursor:
+            return jsonify({"error": "No flights found for the given criteria"}), 404
+
+        return jsonify(flights_list), 200, page_headers(next_cursor)
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### GET FLIGHT DETAILS #####################################
+@flights_bp.route('/flights/<string:flight_number>', methods=['GET'])
+async def get_flight_details(flight_number):
+    try:
+        try:
+            fields = parse_fields(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        key = flight_number if fields is None else f"{flight_number}|{','.join(fields)}"
+        flight = flight_cache.get(key)
+        if flight is None:
+            flight = await async_mongo.db.flights.find_one({'flight_number': flight_number}, flight_projection(fields))
+            if flight is None:
+                return jsonify({"error": "Flight not found"}), 404
+            flight = shape_flight(flight, fields)
+            flight_cache.set(key, flight, tags=[flight_number])
+        return jsonify(flight), 200
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### BOOK A FLIGHT TICKET #####################################
+@flights_bp.route('/bookings', methods=['POST'])
+@jwt_required
+async def book_ticket():
+    try:
+        data = await request.get_json(silent=True) or {}
+        if not all(field in data for field in BOOKING_REQUIRED_FIELDS):
+            return jsonify({"error": "Missing required fields"}), 400
+
+        flight_number = data["flight_number"].strip()
+        try:
+            if data.get("hold_id"):
+                await take_from_hold_async(data["hold_id"], flight_number, g.jwt_claims.get('user'))
+            else:
+                await reserve_seats_async(flight_number)
+        except (HoldUnavailable, FlightNotFound, SeatsUnavailable) as e:
+            return reservation_error(e, flight_number)
+
+        new_booking = _new_booking(data, flight_number, g.jwt_claims.get('user'))
+        booking_id = new_booking["_id"]
+
+        try:
+            await async_mongo.db.bookings.insert_one(new_booking)
+        except Exception:
+            await release_seats_async(flight_number)
+            raise
+
+        return jsonify({"message": "Booking successful", "booking_id": booking_id, "passenger_details": new_booking}), 201
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### BOOK A GROUP OF PASSENGERS #####################################
+@flights_bp.route('/bookings/batch', methods=['POST'])
+@jwt_required
+async def book_tickets_batch():
+    try:
+        data = await request.get_json(silent=True)
+        error = batch_request_error(data)
+        if error:
+            return error
+
+        flight_number = data["flight_number"].strip()
+        seats = len(data["passengers"])
+        try:
+            if data.get("hold_id"):
+                await take_from_hold_async(data["hold_id"], flight_number, g.jwt_claims.get('user'), seats)
+            else:
+                await reserve_seats_async(flight_number, seats)
+        except (HoldUnavailable, FlightNotFound, SeatsUnavailable) as e:
+            return reservation_error(e, flight_number, seats)
+
+        new_bookings = [_new_booking(passenger, flight_number, g.jwt_claims.get('user')) for passenger in data["passengers"]]
+        failed = set()
+        try:
+            await async_mongo.db.bookings.insert_many(new_bookings, ordered=False)
+        except BulkWriteError as e:
+            failed = batch_failed_indexes(e)
+        except Exception:
+            await release_seats_async(flight_number, seats)
+            raise
+        if failed:
+            await release_seats_async(flight_number, len(failed))
+
+        return batch_result(new_bookings, failed)
+
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### HOLD SEATS #####################################
+@flights_bp.route('/flights/<string:flight_number>/holds', methods=['POST'])
+@jwt_required
+async def hold_seats(flight_number):
+    try:
+        try:
+            seats, seconds = parse_hold_request(await request.get_json(silent=True) or {})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            hold = await create_hold_async(flight_number, seats, g.jwt_claims.get('user'), seconds)
+        except (FlightNotFound, SeatsUnavailable) as e:
+            return reservation_error(e, flight_number, seats)
+
+        return jsonify(hold_response(hold)), 201
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### RELEASE A HOLD #####################################
+@flights_bp.route('/holds/<string:hold_id>', methods=['DELETE'])
+@jwt_required
+async def delete_hold(hold_id):
+    try:
+        if await release_hold_async(hold_id, g.jwt_claims.get('user')) is None:
+            return jsonify({"error": "Hold not found or no longer active"}), 404
+        return jsonify({"message": "Hold released"}), 200
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### UPDATE A BOOKING #####################################
+@flights_bp.route('/bookings/<string:booking_id>', methods=['PUT'])
+@jwt_required
+async def update_booking(booking_id):
+    try:
+        data = await request.get_json(silent=True) or {}
+        update_fields = {field: data[field] for field in BOOKING_UPDATE_FIELDS if field in data}
+
+        result = await async_mongo.db.bookings.update_one({"_id": booking_id}, {"$set": update_fields})
+        if result.matched_count == 0:
+            return jsonify({"error": "Booking not found"}), 404
+
+        return jsonify({"message": "Booking updated successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### DELETE A BOOKING #####################################
+@flights_bp.route('/bookings/<string:booking_id>', methods=['DELETE'])
+@jwt_required
+async def delete_booking(booking_id):
+    try:
+        booking = await async_mongo.db.bookings.find_one_and_delete({"_id": booking_id}, projection={"flight_number": 1})
+        if booking is None:
+            return jsonify({"error": "Booking not found"}), 404
+        await release_seats_async(booking["flight_number"])
+        return jsonify({"message": "Booking deleted successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### UPDATE FLIGHT STATUS #####################################
+@flights_bp.route('/flights/<string:flight_number>/status', methods=['PUT'])
+@jwt_required
+@admin_required
+async def update_flight_status(flight_number):
+    try:
+        try:
+            changes = parse_status_update(await request.get_json(silent=True) or {})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = await async_mongo.db.flights.update_one({"flight_number": flight_number}, {"$set": changes})
+        if result.matched_count == 0:
+            return jsonify({"error": "Flight not found"}), 404
+        await async_mongo.send_flight_changed(flight_number, changes=changes)
+
+        return jsonify({"message": f"Flight status updated to '{changes['status']}'"}), 200
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### GET ALL BOOKINGS #####################################
+@flights_bp.route('/bookings', methods=['GET'])
+@jwt_required
+async def get_all_bookings():
+    try:
+        try:
+            limit = parse_limit(request.args)
+            query = all_bookings_query(request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        bookings = async_mongo.db.bookings
+        if wants_ndjson(request):
+            stream_limit = limit if request.args.get('limit') else 0
+            return _ndjson_response(bookings.find(query).sort("_id", 1).limit(stream_limit).batch_size(1000),
+                                    transform=booking_json)
+
+        bookings_list, next_cursor = all_bookings_result(*await fetch_page_async(bookings.find(query).sort("_id", 1), limit))
+        return jsonify(bookings_list), 200, page_headers(next_cursor)
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### EXPORT BOOKINGS #####################################
+@flights_bp.route('/bookings/export', methods=['GET'])
+@jwt_required
+@admin_required
+async def export_bookings():
+    try:
+        try:
+            export_format, group_by, query, headers = export_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        bookings = async_mongo.db.bookings
+        if group_by:
+            cursor = await bookings.aggregate(summary_pipeline(query, group_by), allowDiskUse=True,
+                                              batchSize=EXPORT_BATCH_SIZE)
+        else:
+            cursor = export_cursor(bookings, query)
+        if export_format == 'csv':
+            response = _csv_response(cursor, columns_for(group_by))
+        else:
+            response = _ndjson_response(cursor)
+        response.headers.update(headers)
+        return response
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+async def _bookings_page(scope):
+    """One newest-first page of the bookings matching scope; returns (bookings, next cursor or None)"""
+    limit = parse_limit(request.args)
+    query = bookings_page_query(scope, request.args.get('cursor'))
+    return bookings_page_result(*await fetch_page_async(async_mongo.db.bookings.find(query).sort(BOOKINGS_PAGE_SORT), limit))
+
+##################################### GET MY BOOKINGS #####################################
+@flights_bp.route('/bookings/me', methods=['GET'])
+@jwt_required
+async def get_my_bookings():
+    try:
+        scope = {"user": g.jwt_claims.get('user')}
+        try:
+            bookings_list, next_cursor = await _bookings_page(scope)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        total = await async_mongo.db.bookings.count_documents(scope)
+        return jsonify(bookings_list), 200, page_headers(next_cursor, total)
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### GET BOOKINGS FOR A FLIGHT #####################################
+@flights_bp.route('/flights/<string:flight_number>/bookings', methods=['GET'])
+@jwt_required
+@admin_required
+async def get_flight_bookings(flight_number):
+    try:
+        scope = {"flight_number": flight_number}
+        try:
+            bookings_list, next_cursor = await _bookings_page(scope)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        total = await async_mongo.db.bookings.count_documents(scope)
+        return jsonify(bookings_list), 200, page_headers(next_cursor, total)
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### GET A SPECIFIC BOOKING #####################################
+@flights_bp.route('/bookings/<string:booking_id>', methods=['GET'])
+@jwt_required
+async def get_booking(booking_id):
+    try:
+        booking = await async_mongo.db.bookings.find_one({'_id': booking_id})
+        if not booking:
+            return jsonify({"error": "Booking not found"}), 404
+        return jsonify(booking_json(booking)), 200
+    except Exception as e:
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+##################################### CACHE STATISTICS #####################################
+@flights_bp.route('/cache/stats', methods=['GET'])
+@jwt_required
+@admin_required
+async def get_cache_stats():
+    return jsonify({"search": search_cache.stats(), "flights": flight_cache.stats()}), 200
@@ -0,0 +1,50 @@
+from flask import Blueprint, request, jsonify, make_response
+import datetime
+
+from route_graph import route_graph, GraphLoading
+
+itineraries_bp = Blueprint('itineraries_bp', __name__)
+
+SORT_OPTIONS = ["price", "duration"]
+
+##################################### SEARCH ITINERARIES #####################################
+@itineraries_bp.route('/itineraries', methods=['GET'])
+def search_itineraries():
+    """Cheapest or fastest direct, 1-stop and 2-stop connections between two airports on a day"""
+    try:
+        departure = request.args.get('departure_location')
+        arrival = request.args.get('arrival_location')
+        date = request.args.get('date')
+        if not departure or not arrival or not date:
+            return make_response(jsonify({"error": "departure_location, arrival_location and date are required"}), 400)
+        try:
+            day = datetime.date.fromisoformat(date)
+        except ValueError:
+            return make_response(jsonify({"error": "date must be in YYYY-MM-DD format"}), 400)
+
+        max_stops = request.args.get('max_stops', default=2, type=int)
+        min_layover = request.args.get('min_layover', default=45, type=int)
+        max_layover = request.args.get('max_layover', default=360, type=int)
+        limit = request.args.get('limit', default=5, type=int)
+        sort_by = request.args.get('sort_by', default="price")
+        if sort_by not in SORT_OPTIONS:
+            return make_response(jsonify({"error": f"sort_by must be one of: {', '.join(SORT_OPTIONS)}"}), 400)
+        if not 0 <= max_stops <= 2:
+            return make_response(jsonify({"error": "max_stops must be between 0 and 2"}), 400)
+        if min_layover < 0 or max_layover < min_layover:
+            return make_response(jsonify({"error": "Layover bounds must satisfy 0 <= min_layover <= max_layover"}), 400)
+        if not 1 <= limit <= 50:
+            return make_response(jsonify({"error": "limit must be between 1 and 50"}), 400)
+
+        try:
+            itineraries = route_graph.search(departure, arrival, day, max_stops=max_stops, min_layover=min_layover,
+                                             max_layover=max_layover, optimize=sort_by, limit=limit)
+        except GraphLoading:
+            return make_response(jsonify({"error": "Route graph is loading, please retry shortly"}), 503, {"Retry-After": "5"})
+        if not itineraries:
+            return make_response(jsonify({"error": "No itineraries found for the given criteria"}), 404)
+
+        return make_response(jsonify(itineraries), 200)
+
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
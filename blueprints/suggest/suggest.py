@@ -0,0 +1,31 @@
+from flask import Blueprint, request, jsonify, make_response
+
+from suggest import suggest_index, SuggestLoading, MAX_LIMIT
+
+suggest_bp = Blueprint('suggest_bp', __name__)
+
+SUGGEST_TYPES = ["airport", "airline"]
+
+##################################### AUTOCOMPLETE #####################################
+@suggest_bp.route('/suggest', methods=['GET'])
+def suggest():
+    """Airports (by code or city) and airlines (by name or code) matching a typed prefix, busiest first"""
+    try:
+        prefix = request.args.get('q', '').strip()
+        if not prefix:
+            return make_response(jsonify({"error": "q is required"}), 400)
+        limit = request.args.get('limit', default=10, type=int)
+        if not 1 <= limit <= MAX_LIMIT:
+            return make_response(jsonify({"error": f"limit must be between 1 and {MAX_LIMIT}"}), 400)
+        kind = request.args.get('type')
+        if kind is not None and kind not in SUGGEST_TYPES:
+            return make_response(jsonify({"error": f"type must be one of: {', '.join(SUGGEST_TYPES)}"}), 400)
+
+        try:
+            suggestions = suggest_index.suggest(prefix, limit, kind)
+        except SuggestLoading:
+            return make_response(jsonify({"error": "Suggestions are loading, please retry shortly"}), 503, {"Retry-After": "5"})
+        return make_response(jsonify(suggestions), 200)
+
+    except Exception as e:
+        return make_response(jsonify({"error": "Internal Server Error", "details": str(e)}), 500)
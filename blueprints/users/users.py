@@ -1,9 +1,8 @@
 from flask import Blueprint, jsonify
-from pymongo import MongoClient
+import globalaccess
 
 users_bp = Blueprint('users', __name__)
-client = MongoClient("mongodb://localhost:27017/")
-db = client.flight_booking
+db = globalaccess.db
 
 @users_bp.route('/users', methods=['GET'])
 def get_users():
@@ -0,0 +1,9 @@
+from quart import Blueprint, jsonify
+import async_mongo
+
+users_bp = Blueprint('users', __name__)
+
+@users_bp.route('/users', methods=['GET'])
+async def get_users():
+    users = await async_mongo.db.users.find({}, {'_id': 0, 'username': 1, 'admin': 1}).to_list(None)
+    return jsonify(users)
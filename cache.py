@@ -0,0 +1,109 @@
+from collections import OrderedDict
+import json
+import threading
+import time
+
+from signals import flight_changed
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds.
+
+    Entries can be tagged with flight numbers so a write to one flight only
+    evicts the entries that actually contain it, and search pages also with
+    the field they are sorted on (see sort_tag).
+    """
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tagged = {}              # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, frozenset(tags))
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._tagged.get(tag, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+
+def query_key(query, sort):
+    """Normalize a Mongo query so equivalent searches share one cache entry"""
+    return json.dumps([query, sort], sort_keys=True, default=str)
+
+
+def sort_tag(field):
+    """Tag for search pages sorted on `field` ("rating.avg" -> "sort:rating")"""
+    return "sort:" + field.split(".")[0]
+
+
+def search_tags(flights, sort):
+    return [flight["flight_number"] for flight in flights] + [sort_tag(sort[0][0])]
+
+
+search_cache = LRUCache(max_entries=2048, ttl=30)
+flight_cache = LRUCache(max_entries=4096, ttl=60)
+
+
+@flight_changed.connect
+def _invalidate_flight(flight_number, changes=None, **kwargs):
+    # Searches filter on airports, dates and price - none of which our writes change -
+    # so cached results that contain this flight can be stale, and so can any page
+    # sorted on a changed field (a rating change can move the flight onto it).
+    flight_cache.invalidate_tag(flight_number)
+    search_cache.invalidate_tag(flight_number)
+    for field in changes or ():
+        search_cache.invalidate_tag(sort_tag(field))
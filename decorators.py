@@ -1,9 +1,8 @@
-from flask import request, jsonify, make_response
+from flask import request, jsonify, make_response, g
 import jwt
 from functools import wraps
 import globalaccess
-
-blacklist = globalaccess.db.blacklist
+from revocation import revocations
 
 def jwt_required(func):
     @wraps(func)
@@ -18,20 +17,23 @@ def jwt_required(func):
         except:
             return make_response(jsonify({'message': 'Token is invalid'}), 401)
         
-        bl_token = blacklist.find_one({'token': token})
-        if bl_token is not None:
+        if revocations.is_revoked(token):
             return make_response(jsonify({'message': 'Token is blacklist invalid'}), 401)
-        
+
+        # Decoded once here; later decorators and handlers read the claims from g
+        g.token = token
+        g.jwt_claims = data
         return func(*args, **kwargs)
     return jwt_required_wrapper
             
 def admin_required(func):
     @wraps(func)
     def admin_required_wrapper(*args, **kwargs):
-        token = request.headers['x-access-token']
-        data = jwt.decode(token, globalaccess.SECRET_KEY, algorithms=["HS256"])
-        if data['admin']:
+        claims = g.get('jwt_claims')
+        if claims is None:
+            return make_response(jsonify({'message': 'Token is missing'}), 401)
+        if claims.get('admin'):
             return func(*args, **kwargs)
         else:
             return make_response(jsonify({'message': 'Admin access required'}), 403)
-    return admin_required_wrapper
\ No newline at end of file
+    return admin_required_wrapper
@@ -0,0 +1,212 @@
+"""In-process pub/sub of flight status, gate and seat changes for the SSE endpoint.
+
+Every stream owns one Subscription: a dict of pending deltas plus an event to
+wake its reader. Deltas for the same flight are coalesced while a client is
+slow, so memory per stream stays bounded. The WSGI app (app.py) parks a worker
+thread on each open stream (Subscription); the ASGI app (asgi.py) serves them as
+coroutines waiting on an asyncio.Event (AsyncSubscription), so an idle stream
+there costs a few objects and no thread.
+
+Changes come from the flight_changed signal sent by the write handlers
+(FLIGHT_EVENTS_SOURCE=signals, the default). FLIGHT_EVENTS_SOURCE=changestream
+reads a Mongo change stream on db.flights instead, which also sees writes made
+by other processes; it needs a replica set.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from pymongo.errors import PyMongoError
+
+import globalaccess
+from signals import flight_changed
+
+WATCHED_FIELDS = ("status", "gate", "seats_available")
+EVENT_SOURCE = os.environ.get("FLIGHT_EVENTS_SOURCE", "signals")
+
+log = logging.getLogger("flightbooking.events")
+
+
+class Subscription:
+    """Pending deltas for one open stream, keyed by flight number"""
+
+    __slots__ = ("flight_numbers", "_pending", "_lock", "_ready")
+
+    def __init__(self, flight_numbers):
+        self.flight_numbers = tuple(flight_numbers)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def push(self, flight_number, delta):
+        with self._lock:
+            self._pending.setdefault(flight_number, {}).update(delta)
+        self._notify()
+
+    def _notify(self):
+        self._ready.set()
+
+    def _take(self):
+        with self._lock:
+            self._ready.clear()
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def wait(self, timeout):
+        """Block until deltas arrive (or timeout) and take them; {} on timeout"""
+        self._ready.wait(timeout)
+        return self._take()
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read by a coroutine on `loop`.
+
+    Deltas are published from whatever thread made the write (request threads,
+    async_mongo's offload pool, the change stream watcher), so the asyncio.Event
+    is only ever set from inside the loop via call_soon_threadsafe.
+    """
+
+    __slots__ = ("_loop",)
+
+    def __init__(self, flight_numbers, loop):
+        super().__init__(flight_numbers)
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def _notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # the loop has shut down; nobody is reading any more
+
+    async def wait(self, timeout):
+        """Wait until deltas arrive (or timeout) and take them; {} on timeout"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._take()
+
+
+class FlightEventBroker:
+    """Fans flight changes out to the subscriptions watching each flight.
+
+    The last published value of every watched field is kept per subscribed
+    flight, so only fields that really changed are pushed. Seat counts carry
+    the flight's seats_version; one older than the version already published
+    arrived out of order and is dropped.
+    """
+
+    def __init__(self, collection, source=EVENT_SOURCE):
+        self.collection = collection
+        self.source = source
+        self._lock = threading.Lock()
+        self._subscribers = {}  # flight_number -> set of Subscription
+        self._state = {}        # flight_number -> {field: last published value}
+        self._seats_versions = {}  # flight_number -> seats_version of the published seats_available
+        self._watcher = None
+
+    def subscribe(self, flight_numbers, factory=Subscription):
+        """Register a stream; returns (subscription, current state of the flights that exist).
+
+        `factory` builds the subscription from the flight numbers found.
+        """
+        projection = dict({"_id": 0, "flight_number": 1, "seats_version": 1},
+                          **{field: 1 for field in WATCHED_FIELDS})
+        flights = list(self.collection.find({"flight_number": {"$in": list(flight_numbers)}}, projection))
+        snapshot = {flight["flight_number"]: {field: flight.get(field) for field in WATCHED_FIELDS} for flight in flights}
+        subscription = factory(snapshot)
+        with self._lock:
+            for flight in flights:
+                flight_number = flight["flight_number"]
+                self._subscribers.setdefault(flight_number, set()).add(subscription)
+                if flight_number not in self._state:
+                    self._state[flight_number] = dict(snapshot[flight_number])
+                    self._seats_versions[flight_number] = flight.get("seats_version", 0)
+        if self.source == "changestream":
+            self._ensure_watcher()
+        return subscription, snapshot
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for flight_number in subscription.flight_numbers:
+                subscribers = self._subscribers.get(flight_number)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[flight_number]
+                    self._state.pop(flight_number, None)
+                    self._seats_versions.pop(flight_number, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+    def publish(self, flight_number, changes=None, seats_version=None):
+        """Push the watched fields that changed; changes=None means "re-read the flight" """
+        if flight_number not in self._subscribers:
+            return  # nobody is watching this flight
+        if changes is None:
+            projection = dict({"_id": 0, "seats_version": 1}, **{field: 1 for field in WATCHED_FIELDS})
+            flight = self.collection.find_one({"flight_number": flight_number}, projection) or {}
+            changes = {field: flight.get(field) for field in WATCHED_FIELDS}
+            seats_version = flight.get("seats_version", 0)
+        else:
+            changes = {field: value for field, value in changes.items() if field in WATCHED_FIELDS}
+            if not changes:
+                return
+
+        with self._lock:
+            state = self._state.get(flight_number)
+            if state is None:
+                return
+            if "seats_available" in changes and seats_version is not None:
+                if seats_version < self._seats_versions.get(flight_number, 0):
+                    changes = {field: value for field, value in changes.items() if field != "seats_available"}
+                else:
+                    self._seats_versions[flight_number] = seats_version
+            delta = {field: value for field, value in changes.items() if state.get(field) != value}
+            if not delta:
+                return
+            state.update(delta)
+            subscribers = list(self._subscribers.get(flight_number, ()))
+        for subscription in subscribers:
+            subscription.push(flight_number, delta)
+
+    # ------------------------------------------------------------------ change stream source
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        """Follow db.flights updates, resuming after the last seen event on errors"""
+        pipeline = [{"$match": {"operationType": {"$in": ["update", "replace"]}}}]
+        resume_token = None
+        while True:
+            try:
+                with self.collection.watch(pipeline, full_document="updateLookup",
+                                           resume_after=resume_token) as stream:
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        flight = change.get("fullDocument")
+                        if flight and "flight_number" in flight:
+                            self.publish(flight["flight_number"],
+                                         {field: flight.get(field) for field in WATCHED_FIELDS},
+                                         flight.get("seats_version", 0))
+            except PyMongoError:
+                log.exception("flight change stream failed; reconnecting")
+                time.sleep(5)
+
+
+flight_events = FlightEventBroker(globalaccess.db.flights)
+
+
+@flight_changed.connect
+def _publish_flight_change(flight_number, changes=None, seats_version=None, **kwargs):
+    if flight_events.source == "signals":
+        flight_events.publish(flight_number, changes, seats_version)
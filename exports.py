@@ -0,0 +1,155 @@
+"""Bookings export for reporting: rows or a $group summary, streamed from a batched cursor.
+
+Nothing is accumulated beyond one cursor batch and one CSV chunk, so memory
+stays flat however many bookings match. Used by GET /bookings/export and
+`flask export-bookings`.
+"""
+import csv
+import datetime
+import io
+import json
+
+from flask import current_app
+
+EXPORT_BATCH_SIZE = 5000
+CSV_CHUNK_ROWS = 1000
+
+# Passport numbers stay out of reports
+EXPORT_FIELDS = ["_id", "booking_time", "flight_number", "seat_class", "user", "passenger_name", "email",
+                 "phone_number", "contact_details"]
+EXPORT_SORT = [("booking_time", 1), ("_id", 1)]
+
+# group_by -> (output column, $group key)
+SUMMARY_GROUPS = {
+    "flight": ("flight_number", "$flight_number"),
+    "day": ("day", {"$dateToString": {"format": "%Y-%m-%d", "date": "$booking_time"}}),
+    "class": ("seat_class", "$seat_class"),
+}
+SUMMARY_FIELDS = ["bookings", "first_booking", "last_booking"]
+EXPORT_FORMATS = ["csv", "ndjson"]
+
+
+def _day(value, name):
+    try:
+        return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time())
+    except ValueError:
+        raise ValueError(f"{name} must be in YYYY-MM-DD format")
+
+
+def build_export_query(start=None, end=None, flight_number=None):
+    """Bookings made on days start..end (both inclusive, UTC) and/or on one flight.
+
+    Raises ValueError for malformed dates. Every shape is served by the
+    flight_booking_time or booking_time index in EXPORT_SORT order.
+    """
+    query = {}
+    if flight_number:
+        query["flight_number"] = flight_number
+    if start or end:
+        query["booking_time"] = {}
+        if start:
+            query["booking_time"]["$gte"] = _day(start, "from")
+        if end:
+            query["booking_time"]["$lt"] = _day(end, "to") + datetime.timedelta(days=1)
+        if start and end and query["booking_time"]["$gte"] >= query["booking_time"]["$lt"]:
+            raise ValueError("from must not be after to")
+    return query
+
+
+def export_cursor(bookings, query, batch_size=EXPORT_BATCH_SIZE):
+    return (bookings.find(query, {field: 1 for field in EXPORT_FIELDS})
+            .sort(EXPORT_SORT).batch_size(batch_size))
+
+
+def summary_pipeline(query, group_by):
+    column, key = SUMMARY_GROUPS[group_by]
+    return [
+        {"$match": query},
+        {"$group": {"_id": key, "bookings": {"$sum": 1},
+                    "first_booking": {"$min": "$booking_time"}, "last_booking": {"$max": "$booking_time"}}},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, column: "$_id", "bookings": 1, "first_booking": 1, "last_booking": 1}},
+    ]
+
+
+def summary_cursor(bookings, query, group_by, batch_size=EXPORT_BATCH_SIZE):
+    return bookings.aggregate(summary_pipeline(query, group_by), allowDiskUse=True, batchSize=batch_size)
+
+
+def columns_for(group_by=None):
+    return EXPORT_FIELDS if group_by is None else [SUMMARY_GROUPS[group_by][0]] + SUMMARY_FIELDS
+
+
+# A text cell starting with one of these is run as a formula by spreadsheet programs
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value  # user-supplied text (names, emails, contact details) stays text
+    return value
+
+
+class CsvChunker:
+    """Formats documents as CSV text, handing it out CSV_CHUNK_ROWS rows at a time"""
+
+    def __init__(self, columns, chunk_rows=CSV_CHUNK_ROWS):
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._rows = 0
+        self._writer.writerow(columns)
+
+    def add(self, doc):
+        """Buffer one row; returns a chunk of text once chunk_rows rows are buffered, else None"""
+        self._writer.writerow([_csv_value(doc.get(column)) for column in self.columns])
+        self._rows += 1
+        return self.flush() if self._rows >= self.chunk_rows else None
+
+    def flush(self):
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._rows = 0
+        return text
+
+
+def csv_chunks(cursor, columns):
+    chunker = CsvChunker(columns)
+    try:
+        for doc in cursor:
+            chunk = chunker.add(doc)
+            if chunk:
+                yield chunk
+        yield chunker.flush()
+    finally:
+        cursor.close()
+
+
+def ndjson_lines(cursor):
+    dumps = current_app.json.dumps
+    try:
+        for doc in cursor:
+            yield dumps(doc) + '\n'
+    finally:
+        cursor.close()
+
+
+def export_filename(export_format, start=None, end=None, flight_number=None, group_by=None):
+    parts = ["bookings"]
+    if group_by:
+        parts.append(f"by-{group_by}")
+    if flight_number:
+        parts.append(flight_number)
+    if start or end:
+        parts.append(f"{start or 'start'}_{end or 'now'}")
+    return "-".join(parts) + "." + export_format
@@ -0,0 +1,153 @@
+import datetime
+import logging
+import threading
+import uuid
+
+import globalaccess
+from signals import flight_changed
+
+flights = globalaccess.db.flights
+fare_calendar = globalaccess.db.fare_calendar
+
+log = logging.getLogger('flightbooking.fare_calendar')
+
+BOOKABLE = {"$and": [{"$gt": ["$seats_available", 0]}, {"$ne": ["$status", "Cancelled"]}]}
+
+
+def _summary_pipeline(match, date=None):
+    """Per route and departure day: cheapest bookable fare, flights operating and seats left"""
+    day = {"$literal": date} if date else {"$substrBytes": ["$departure_time", 0, 10]}
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "departure_airport": "$departure_airport",
+                "arrival_airport": "$arrival_airport",
+                "date": day,
+            },
+            # $min skips the nulls produced for sold out / cancelled flights
+            "min_price": {"$min": {"$cond": [BOOKABLE, "$price", None]}},
+            "flight_count": {"$sum": {"$cond": [{"$ne": ["$status", "Cancelled"]}, 1, 0]}},
+            "seats_left": {"$sum": {"$cond": [{"$ne": ["$status", "Cancelled"]}, "$seats_available", 0]}},
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.departure_airport", "|", "$_id.arrival_airport", "|", "$_id.date"]},
+            "departure_airport": "$_id.departure_airport",
+            "arrival_airport": "$_id.arrival_airport",
+            "date": "$_id.date",
+            "min_price": 1,
+            "flight_count": 1,
+            "seats_left": 1,
+        }},
+    ]
+
+
+def refresh_day(departure_airport, arrival_airport, date):
+    """Recompute a single route/day bucket from the (indexed) flights departing that day"""
+    day = datetime.date.fromisoformat(date)
+    match = {
+        "departure_airport": departure_airport,
+        "arrival_airport": arrival_airport,
+        "departure_time": {"$gte": day.isoformat(), "$lt": (day + datetime.timedelta(days=1)).isoformat()},
+    }
+    summary = next(iter(flights.aggregate(_summary_pipeline(match, date))), None)
+    key = f"{departure_airport}|{arrival_airport}|{date}"
+    if summary is None:
+        fare_calendar.delete_one({"_id": key})
+    else:
+        summary["updated_at"] = datetime.datetime.utcnow()
+        # No generation field: a rebuild running meanwhile keeps this bucket
+        fare_calendar.replace_one({"_id": key}, summary, upsert=True)
+    return summary
+
+
+def rebuild_fare_calendar():
+    """Rebuild every bucket server-side with $merge, then drop buckets whose flights are gone.
+
+    Leftovers are found by generation id rather than by comparing timestamps,
+    which would mix the app's clock with the server's: existing buckets are
+    marked with a null generation first, the $merge tags every bucket it
+    writes with this rebuild's id, and refresh_day() writes buckets without
+    one. Whatever still carries another generation afterwards is stale.
+    """
+    generation = uuid.uuid4().hex
+    fare_calendar.update_many({}, {"$set": {"generation": None}})
+    pipeline = _summary_pipeline({"departure_time": {"$type": "string"}}) + [
+        {"$set": {"updated_at": "$$NOW", "generation": generation}},
+        {"$merge": {"into": fare_calendar.name, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    flights.aggregate(pipeline, allowDiskUse=True)
+    fare_calendar.delete_many({"generation": {"$exists": True, "$ne": generation}})
+    return fare_calendar.count_documents({})
+
+
+def month_calendar(departure_airport, arrival_airport, month):
+    """One entry per day of month (YYYY-MM); days without flights have no fare"""
+    first = datetime.date.fromisoformat(f"{month}-01")
+    following = (first.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    buckets = fare_calendar.find(
+        {"departure_airport": departure_airport, "arrival_airport": arrival_airport,
+         "date": {"$gte": first.isoformat(), "$lt": following.isoformat()}},
+        {"_id": 0, "date": 1, "min_price": 1, "flight_count": 1, "seats_left": 1}
+    )
+    by_date = {bucket["date"]: bucket for bucket in buckets}
+    days = []
+    day = first
+    while day < following:
+        days.append(by_date.get(day.isoformat(),
+                                {"date": day.isoformat(), "min_price": None, "flight_count": 0, "seats_left": 0}))
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def refresh_flight(flight_number):
+    """Recompute the route/day bucket a flight departs in"""
+    flight = flights.find_one({"flight_number": flight_number},
+                              {"_id": 0, "departure_airport": 1, "arrival_airport": 1, "departure_time": 1})
+    if not flight or not isinstance(flight.get("departure_time"), str):
+        return
+    refresh_day(flight["departure_airport"], flight["arrival_airport"], flight["departure_time"][:10])
+
+
+class FareCalendarRefresher:
+    """Background thread refreshing the buckets of changed flights, off the request path.
+
+    Changed flight numbers are collected in a set, so a burst of bookings on
+    one flight costs a single refresh. A refresh that fails is logged and
+    retried on the flight's next change; `flask rebuild-fare-calendar` repairs
+    anything missed.
+    """
+
+    def __init__(self):
+        self._pending = set()
+        self._wakeup = threading.Condition()
+        self._thread = None
+
+    def enqueue(self, flight_number):
+        with self._wakeup:
+            self._pending.add(flight_number)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="fare-calendar-refresh")
+                self._thread.start()
+            self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._pending:
+                    self._wakeup.wait()
+                flight_number = self._pending.pop()
+            try:
+                refresh_flight(flight_number)
+            except Exception:
+                log.exception("fare calendar refresh failed for %s", flight_number)
+
+
+fare_calendar_refresher = FareCalendarRefresher()
+
+
+@flight_changed.connect
+def _refresh_fare_calendar(flight_number, changes=None, **kwargs):
+    if changes is not None and not set(changes) & {"seats_available", "status", "price"}:
+        return  # e.g. rating changes don't move fares
+    fare_calendar_refresher.enqueue(flight_number)
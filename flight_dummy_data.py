@@ -1,105 +1,269 @@
+"""Synthetic data generator and bulk importer.
+
+Generates realistic flights, users, bookings and reviews in a streaming way
+(nothing is held in memory beyond one batch per worker), loads them into Mongo
+with unordered insert_many batches from several worker processes, builds the
+indexes after the load and reports rows/sec.
+
+    python flight_dummy_data.py --load --flights 10000000 --bookings 5000000 --users 200000 \\
+        --reviews 2000000 --workers 8 --drop
+    python flight_dummy_data.py   # 20 flights to flights.json, no Mongo
+
+Only the collections given a nonzero count are dropped (--drop) or loaded.
+
+Every shard is seeded from --seed and its shard number, so a run is reproducible.
+"""
+import argparse
+import datetime
 import json
+import multiprocessing
+import random
+import time
 
-flights_data = {
-    "F101": {
-        "flight_number": "BA123",
-        "airline": "British Airways",
-        "departure_airport": "LHR",
-        "arrival_airport": "JFK",
-        "departure_time": "2025-06-15T08:30:00",
-        "arrival_time": "2025-06-15T16:45:00",
-        "departing_date": "2025-06-15",
-        "returning_date": "2025-06-30",
-        "duration": 8.25,
-        "price": 750.00,
-        "seats_available": 45,
-        "number_of_passengers": 180,
-        "class": "Economy",
-        "status": "On Time",
-        "baggage_allowance": "23kg",
-        "gate": "B12",
-        "terminal": "5",
-        "wifi_available": True,
-        "entertainment": ["Movies", "TV Shows", "Music"],
-        "check_in_online": True,
-        "flight_status": "On Time"
-    },
-    "F102": {
-        "flight_number": "LH456",
-        "airline": "Lufthansa",
-        "departure_airport": "BER",
-        "arrival_airport": "HND",
-        "departure_time": "2025-06-16T10:00:00",
-        "arrival_time": "2025-06-16T23:30:00",
-        "departing_date": "2025-06-16",
-        "returning_date": "2025-07-01",
-        "duration": 13.5,
-        "price": 1200.00,
-        "seats_available": 30,
-        "number_of_passengers": 220,
-        "class": "Business",
-        "status": "Delayed",
-        "baggage_allowance": "25kg",
-        "gate": "C5",
-        "terminal": "1",
-        "wifi_available": True,
-        "entertainment": ["Movies", "Music"],
-        "check_in_online": True,
-        "flight_status": "Delayed"
-    },
-    "F103": {
-        "flight_number": "EK777",
-        "airline": "Emirates",
-        "departure_airport": "DXB",
-        "arrival_airport": "SYD",
-        "departure_time": "2025-06-20T22:00:00",
-        "arrival_time": "2025-06-21T15:30:00",
-        "departing_date": "2025-06-20",
-        "returning_date": "2025-07-10",
-        "duration": 14.5,
-        "price": 1500.00,
-        "seats_available": 20,
-        "number_of_passengers": 250,
-        "class": "First Class",
-        "status": "On Time",
-        "baggage_allowance": "32kg",
-        "gate": "D1",
-        "terminal": "3",
-        "wifi_available": True,
-        "entertainment": ["Live TV", "Movies", "Games"],
-        "check_in_online": True,
-        "flight_status": "On Time"
-    }
-}
-
-# Generating 17 more dummy flights
-for i in range(4, 21):
-    flights_data[f"F10{i}"] = {
-        "flight_number": f"FN{i}",
-        "airline": "Air France" if i % 2 == 0 else "Delta Airlines",
-        "departure_airport": "CDG" if i % 2 == 0 else "ATL",
-        "arrival_airport": "SFO" if i % 2 == 0 else "ORD",
-        "departure_time": f"2025-06-{10+i}T{(i%12)+1}:00:00",
-        "arrival_time": f"2025-06-{10+i}T{(i%12)+5}:30:00",
-        "departing_date": f"2025-06-{10+i}",
-        "returning_date": f"2025-07-{10+i}",
-        "duration": (i % 12) + 5.5,
-        "price": round(600 + (i * 50), 2),
-        "seats_available": 40 - (i % 10),
-        "number_of_passengers": 200 + (i * 2),
-        "class": "Premium Economy" if i % 3 == 0 else "Economy",
-        "status": "On Time" if i % 4 != 0 else "Delayed",
-        "baggage_allowance": f"{20 + (i%3)}kg",
-        "gate": f"A{(i%15)+1}",
-        "terminal": str((i % 3) + 1),
-        "wifi_available": i % 2 == 0,
-        "entertainment": ["Movies", "TV Shows"] if i % 2 == 0 else ["Music", "Live TV"],
-        "check_in_online": True,
-        "flight_status": "On Time" if i % 4 != 0 else "Delayed"
+import bcrypt
+
+from airports import AIRPORTS, AIRLINES
+from passwords import BCRYPT_ROUNDS
+
+CLASSES = ["Economy", "Economy", "Economy", "Premium Economy", "Business", "First Class"]
+STATUSES = ["On Time"] * 8 + ["Delayed", "Cancelled"]
+ENTERTAINMENT = ["Movies", "TV Shows", "Music", "Live TV", "Games"]
+COMMENTS = ["Great flight experience!", "Decent flight, food could be better.", "Crew was very friendly.",
+            "Delayed departure but smooth flight.", "Seats were cramped.", "Would fly again."]
+DEFAULT_PASSWORD = "password"
+
+AIRPORT_CODES = sorted(AIRPORTS)
+AIRLINE_CODES = sorted(AIRLINES)
+
+
+##################################### GENERATORS #####################################
+def flight_number(index):
+    return f"{AIRLINE_CODES[index % len(AIRLINE_CODES)]}{index}"
+
+
+def generate_flights(start, stop, rng, start_date, days):
+    for i in range(start, stop):
+        departure, arrival = rng.sample(AIRPORT_CODES, 2)
+        departs = datetime.datetime.combine(start_date, datetime.time()) + datetime.timedelta(
+            days=rng.randrange(days), minutes=5 * rng.randrange(288))
+        duration = round(rng.uniform(1, 16) * 4) / 4
+        arrives = departs + datetime.timedelta(hours=duration)
+        capacity = rng.choice([150, 180, 220, 250, 300, 400])
+        status = rng.choice(STATUSES)
+        yield {
+            "flight_number": flight_number(i),
+            "airline": AIRLINES[AIRLINE_CODES[i % len(AIRLINE_CODES)]],
+            "departure_airport": departure,
+            "arrival_airport": arrival,
+            "departure_time": departs.strftime("%Y-%m-%dT%H:%M:%S"),
+            "arrival_time": arrives.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration": duration,
+            "price": round(rng.uniform(40, 300) * max(1.0, duration / 2), 2),
+            "seats_available": rng.randrange(0, capacity),
+            "number_of_passengers": capacity,
+            "class": rng.choice(CLASSES),
+            "status": status,
+            "flight_status": status,
+            "baggage_allowance": f"{rng.choice([20, 23, 25, 30, 32])}kg",
+            "gate": f"{rng.choice('ABCDEF')}{rng.randrange(1, 40)}",
+            "terminal": str(rng.randrange(1, 6)),
+            "wifi_available": rng.random() < 0.6,
+            "entertainment": rng.sample(ENTERTAINMENT, rng.randrange(0, 4)),
+            "check_in_online": True,
+        }
+
+
+def generate_users(start, stop, rng, password_hash):
+    for i in range(start, stop):
+        yield {"username": f"user{i}", "password": password_hash, "admin": i == 0}
+
+
+def generate_bookings(start, stop, rng, flights, users, start_date, days):
+    for i in range(start, stop):
+        name = f"Passenger {i}"
+        email = f"passenger{i}@example.com"
+        yield {
+            "_id": f"bk-{i:012d}",
+            "passenger_name": name,
+            "passport_number": f"P{rng.randrange(10 ** 8):08d}",
+            "email": email,
+            "phone_number": f"+44{rng.randrange(10 ** 9, 10 ** 10)}",
+            "flight_number": flight_number(rng.randrange(flights)),
+            "seat_class": rng.choice(CLASSES),
+            "contact_details": email,
+            "user": f"user{rng.randrange(users)}" if users else None,
+            "booking_time": datetime.datetime.combine(start_date, datetime.time()) - datetime.timedelta(
+                seconds=rng.randrange(days * 86400)),
+        }
+
+
+def generate_reviews(start, stop, rng, flights, users, start_date, days):
+    for i in range(start, stop):
+        yield {
+            "_id": f"rv-{i:012d}",
+            "flight_number": flight_number(rng.randrange(flights)),
+            "username": f"user{rng.randrange(users)}" if users else f"guest{i}",
+            "comment": rng.choice(COMMENTS),
+            "star": rng.choices([1, 2, 3, 4, 5], [1, 1, 3, 5, 4])[0],
+            "created_at": datetime.datetime.combine(start_date, datetime.time()) + datetime.timedelta(
+                seconds=rng.randrange(days * 86400)),
+        }
+
+
+##################################### LOADING #####################################
+def _load_shard(task):
+    """Worker process: generate one shard and insert it in batches with its own client"""
+    import globalaccess
+
+    kind, start, stop, options = task
+    rng = random.Random(f"{options['seed']}-{kind}-{start}")
+    start_date = datetime.date.fromisoformat(options["start_date"])
+    if kind == "flights":
+        rows = generate_flights(start, stop, rng, start_date, options["days"])
+    elif kind == "users":
+        rows = generate_users(start, stop, rng, options["password_hash"])
+    elif kind == "bookings":
+        rows = generate_bookings(start, stop, rng, options["flights"], options["users"], start_date, options["days"])
+    else:
+        rows = generate_reviews(start, stop, rng, options["flights"], options["users"], start_date, options["days"])
+
+    client = globalaccess.create_client(options["uri"])
+    collection = client[options["database"]][kind]
+    batch = []
+    written = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= options["batch_size"]:
+            collection.insert_many(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        written += len(batch)
+    client.close()
+    return kind, written
+
+
+def _shards(kind, total, shard_size, options):
+    return [(kind, start, min(start + shard_size, total), options) for start in range(0, total, shard_size)]
+
+
+def load_into_mongo(args):
+    import globalaccess
+
+    options = {
+        "uri": args.uri or globalaccess.MONGO_URI,
+        "database": args.database or globalaccess.MONGO_DB,
+        "seed": args.seed,
+        "start_date": args.start_date,
+        "days": args.days,
+        "flights": args.flights,
+        "users": args.users,
+        "batch_size": args.batch_size,
+        # bcrypt at full cost per user would dominate the load; every user shares one hash
+        "password_hash": bcrypt.hashpw(DEFAULT_PASSWORD.encode("utf-8"), bcrypt.gensalt(BCRYPT_ROUNDS)),
     }
 
-# Save to JSON file
-with open("flights.json", "w") as file:
-    json.dump(flights_data, file, indent=4)
+    # Touch the server only in a short-lived client so no pool is inherited by the workers
+    client = globalaccess.create_client(options["uri"])
+    db = client[options["database"]]
+    kinds = ("flights", "users", "bookings", "reviews")
+    if not args.drop:
+        # The generator is seeded, so loading twice would insert the same ids and flight numbers again
+        occupied = [kind for kind in kinds if getattr(args, kind) and db[kind].estimated_document_count()]
+        if occupied:
+            client.close()
+            raise SystemExit(f"{', '.join(occupied)} already hold documents; pass --drop to replace them")
+    for kind in kinds:
+        if not getattr(args, kind):
+            continue  # never touch a collection this run does not load
+        if args.drop:
+            db[kind].drop()
+        else:
+            # Loading into existing indexes is much slower than building them once afterwards
+            db[kind].drop_indexes()
+    client.close()
+
+    try:
+        _load_shards(args, options)
+    finally:
+        # Indexes are built once, after the bulk load - and also after a failed one,
+        # so the database is never left without them
+        globalaccess.client = globalaccess.create_client(options["uri"])
+        globalaccess.db = globalaccess.client[options["database"]]
+        from indexes import ensure_indexes
+        started = time.perf_counter()
+        ensure_indexes()
+        print(f"indexes built in {time.perf_counter() - started:.1f}s")
+
+    from fare_calendar import rebuild_fare_calendar
+    started = time.perf_counter()
+    buckets = rebuild_fare_calendar()
+    print(f"fare calendar ({buckets:,} route/day buckets) built in {time.perf_counter() - started:.1f}s")
+    if args.reviews:
+        from ratings import rebuild_ratings
+        started = time.perf_counter()
+        rebuilt = rebuild_ratings()
+        print(f"rating aggregates for {rebuilt:,} flights rebuilt in {time.perf_counter() - started:.1f}s")
+
+
+def _load_shards(args, options):
+    tasks = (_shards("flights", args.flights, args.shard_size, options)
+             + _shards("users", args.users, args.shard_size, options)
+             + _shards("bookings", args.bookings, args.shard_size, options)
+             + _shards("reviews", args.reviews, args.shard_size, options))
+    counts = {"flights": 0, "users": 0, "bookings": 0, "reviews": 0}
+    started = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+        for kind, written in pool.imap_unordered(_load_shard, tasks):
+            counts[kind] += written
+            done = sum(counts.values())
+            print(f"\r{done:,} rows, {done / (time.perf_counter() - started):,.0f} rows/s", end="", flush=True)
+    load_seconds = time.perf_counter() - started
+    print()
+    for kind, count in counts.items():
+        print(f"{kind:<9} {count:>12,}")
+    print(f"loaded {sum(counts.values()):,} rows in {load_seconds:.1f}s "
+          f"({sum(counts.values()) / load_seconds:,.0f} rows/s, {args.workers} workers)")
+
+
+def write_json(args):
+    """Stream flights to a JSON array file (no Mongo involved)"""
+    rng = random.Random(f"{args.seed}-flights-0")
+    with open(args.json, "w") as file:
+        file.write("[\n")
+        for i, flight in enumerate(generate_flights(0, args.flights, rng,
+                                                    datetime.date.fromisoformat(args.start_date), args.days)):
+            file.write((",\n" if i else "") + json.dumps(flight, indent=4))
+        file.write("\n]\n")
+    print(f"wrote {args.flights} flights to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=20)
+    parser.add_argument("--users", type=int, default=0)
+    parser.add_argument("--bookings", type=int, default=0)
+    parser.add_argument("--reviews", type=int, default=0)
+    parser.add_argument("--start-date", default="2025-06-01", help="first departure day (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=90, help="number of departure days to spread flights over")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many")
+    parser.add_argument("--shard-size", type=int, default=100000, help="documents generated per worker task")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--uri", help="Mongo URI (default: MONGO_URI / globalaccess)")
+    parser.add_argument("--database", help="database name (default: MONGO_DB / flight_booking)")
+    parser.add_argument("--drop", action="store_true",
+                        help="drop the collections being loaded first (required when they already hold documents)")
+    parser.add_argument("--load", action="store_true", help="load into Mongo instead of writing --json")
+    parser.add_argument("--json", default="flights.json", help="JSON file the flights are written to without --load")
+    args = parser.parse_args()
+
+    if args.load:
+        load_into_mongo(args)
+    else:
+        write_json(args)
 
 
+if __name__ == "__main__":
+    main()
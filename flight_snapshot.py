@@ -0,0 +1,273 @@
+"""Optional columnar snapshot of db.flights for search_flights (SEARCH_ENGINE=snapshot).
+
+The columns a search filters and sorts on are held as NumPy arrays, with rows
+ordered by flight_number so the row index doubles as the tiebreak rank:
+
+    departure / arrival   int32 codes into a dictionary of airport codes
+    departure_ts          int64 epoch seconds (NaT's int64 min when missing)
+    price, rating_avg     float64 (NaN when missing)
+
+A search is a handful of vectorized comparisons plus a sort of the matching
+rows, and yields the ordered flight numbers of one page; the documents are
+then read from Mongo by flight_number, so the snapshot holds no documents.
+
+The snapshot is kept current incrementally: rating changes are patched in
+from flight_changed and other writes re-read the one flight. Only a flight
+number the snapshot has never seen marks it stale, which triggers a rebuild in
+the background and makes search() return None (the caller uses the Mongo
+query) until it is done. The full rebuild otherwise runs every
+REFRESH_INTERVAL seconds (15 minutes, like the route graph's), to pick up
+writes made by other processes; a snapshot older than MAX_STALENESS, because
+those rebuilds keep failing, is not used. NumPy is optional: without it the
+engine stays disabled.
+"""
+import datetime
+import logging
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import globalaccess
+from signals import flight_changed
+
+SEARCH_ENGINE = os.environ.get('SEARCH_ENGINE', 'mongo')
+REFRESH_INTERVAL = int(os.environ.get('SNAPSHOT_REFRESH_INTERVAL', 900))
+MAX_STALENESS = int(os.environ.get('SNAPSHOT_MAX_STALENESS', 3600))
+
+SNAPSHOT_FIELDS = {"_id": 0, "flight_number": 1, "departure_airport": 1, "arrival_airport": 1,
+                   "departure_time": 1, "price": 1, "rating.avg": 1}
+MISSING_TS = -2 ** 63  # what NaT becomes as int64; sorts first like Mongo's null
+
+log = logging.getLogger('flightbooking.snapshot')
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else float('nan')
+
+
+def _timestamps(values):
+    """ISO strings -> int64 epoch seconds, vectorized where the strings allow it"""
+    try:
+        return np.array([v if isinstance(v, str) else 'NaT' for v in values], dtype='datetime64[s]').astype(np.int64)
+    except ValueError:
+        out = np.full(len(values), MISSING_TS, dtype=np.int64)
+        for i, value in enumerate(values):
+            try:
+                out[i] = int(datetime.datetime.fromisoformat(value).replace(tzinfo=datetime.timezone.utc).timestamp())
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+class _Columns:
+    """One immutable-shape snapshot; element values are patched in place"""
+
+    def __init__(self, flights):
+        numbers, departures, arrivals, times, prices, ratings = [], [], [], [], [], []
+        for f in flights:
+            numbers.append(str(f.get("flight_number", "")))
+            departures.append(str(f.get("departure_airport")))
+            arrivals.append(str(f.get("arrival_airport")))
+            times.append(f.get("departure_time"))
+            prices.append(_number(f.get("price")))
+            ratings.append(_number((f.get("rating") or {}).get("avg")))
+        numbers = np.array(numbers, dtype=bytes)
+        order = np.argsort(numbers, kind='stable')
+        codes, encoded = np.unique(np.array(departures + arrivals, dtype=str), return_inverse=True)
+        encoded = encoded.astype(np.int32).reshape(2, -1)
+
+        self.airports = {code: index for index, code in enumerate(codes.tolist())}
+        self.numbers = numbers[order]
+        self.departure = encoded[0][order]
+        self.arrival = encoded[1][order]
+        self.departure_ts = _timestamps(times)[order]
+        self.price = np.array(prices, dtype=np.float64)[order]
+        self.rating_avg = np.array(ratings, dtype=np.float64)[order]
+        self.alive = np.ones(len(order), dtype=bool)
+        self.rank = np.arange(len(order), dtype=np.int64)
+
+    def airport_code(self, code):
+        return self.airports.setdefault(str(code), len(self.airports))
+
+    def rows(self, flight_number):
+        key = str(flight_number).encode()
+        start = int(np.searchsorted(self.numbers, key, 'left'))
+        stop = int(np.searchsorted(self.numbers, key, 'right'))
+        return start, stop
+
+    def sort_key(self, field):
+        """Sort column with missing values mapped below every real value, as Mongo orders null"""
+        if field == "departure_time":
+            return self.departure_ts
+        column = self.price if field == "price" else self.rating_avg
+        return np.where(np.isnan(column), -np.inf, column)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.numbers, self.departure, self.arrival, self.departure_ts,
+                                      self.price, self.rating_avg, self.alive, self.rank))
+
+
+class FlightSnapshot:
+    def __init__(self, collection, refresh_interval=REFRESH_INTERVAL, max_staleness=MAX_STALENESS):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self._columns = None
+        self._loaded_at = None
+        self._stale = False
+        self._loading = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return np is not None and SEARCH_ENGINE == 'snapshot'
+
+    # ------------------------------------------------------------------ maintenance
+    def load(self, flights=None):
+        """Build a new snapshot (default: from all of db.flights) and swap it in"""
+        started = time.monotonic()
+        if flights is None:
+            flights = self.collection.find({}, SNAPSHOT_FIELDS).batch_size(10000)
+        columns = _Columns(list(flights))
+        with self._lock:
+            self._columns = columns
+            self._loaded_at = started
+            self._stale = False
+        return columns
+
+    def _background_load(self):
+        try:
+            self.load()
+        except Exception:
+            log.exception("flight snapshot rebuild failed; searches use Mongo until the next attempt")
+        finally:
+            self._loading = False
+
+    def _refresh_if_due(self):
+        due = (self._loaded_at is None or self._stale
+               or time.monotonic() - self._loaded_at > self.refresh_interval)
+        if due and not self._loading:
+            with self._lock:
+                if self._loading:
+                    return
+                self._loading = True
+            threading.Thread(target=self._background_load, daemon=True).start()
+
+    def usable(self):
+        self._refresh_if_due()
+        return (self._columns is not None and not self._stale
+                and time.monotonic() - self._loaded_at <= self.max_staleness)
+
+    def update(self, flight_number, changes=None):
+        columns = self._columns
+        if columns is None:
+            return
+        if changes is not None and set(changes) <= {"seats_available", "status", "gate", "rating"}:
+            if "rating" not in changes:
+                return  # nothing search filters or sorts on
+            start, stop = columns.rows(flight_number)
+            columns.rating_avg[start:stop] = _number((changes["rating"] or {}).get("avg"))
+            return
+
+        flight = self.collection.find_one({"flight_number": flight_number}, SNAPSHOT_FIELDS)
+        start, stop = columns.rows(flight_number)
+        if start == stop:
+            if flight is not None:
+                self._stale = True  # a new flight: only a rebuild can place it
+            return
+        if flight is None:
+            columns.alive[start:stop] = False
+            return
+        columns.departure[start:stop] = columns.airport_code(flight.get("departure_airport"))
+        columns.arrival[start:stop] = columns.airport_code(flight.get("arrival_airport"))
+        columns.departure_ts[start:stop] = _timestamps([flight.get("departure_time")])[0]
+        columns.price[start:stop] = _number(flight.get("price"))
+        columns.rating_avg[start:stop] = _number((flight.get("rating") or {}).get("avg"))
+        columns.alive[start:stop] = True
+
+    # ------------------------------------------------------------------ search
+    def search(self, args, sort, after, limit):
+        """Flight numbers of one search page, in the order the Mongo query would return them.
+
+        args are the (already validated) search arguments, sort the pair from
+        build_search_query and after the decoded cursor ([value, flight_number])
+        or None. Returns (flight_numbers, has_more), or None when the snapshot
+        can't be trusted and the caller should query Mongo.
+        """
+        if not self.usable():
+            return None
+        columns = self._columns
+        mask = columns.alive.copy()
+
+        for arg, column in (('departure_location', columns.departure), ('arrival_location', columns.arrival)):
+            code = args.get(arg)
+            if code:
+                if code not in columns.airports:  # an airport no flight uses
+                    return [], False
+                mask &= column == columns.airports[code]
+        date = args.get('date')
+        if date:
+            start = int(datetime.datetime.combine(datetime.date.fromisoformat(date), datetime.time())
+                        .replace(tzinfo=datetime.timezone.utc).timestamp())
+            mask &= (columns.departure_ts >= start) & (columns.departure_ts < start + 86400)
+        for arg, compare in (('min_price', np.greater_equal), ('max_price', np.less_equal)):
+            try:
+                bound = int(args.get(arg))
+            except (TypeError, ValueError):
+                continue
+            mask &= compare(columns.price, bound)
+
+        (field, direction), _ = sort
+        rows = np.flatnonzero(mask)
+        keys = columns.sort_key(field)[rows]
+        ranks = columns.rank[rows]
+
+        if after is not None:
+            value, last_number = after
+            if field == "departure_time":
+                value = MISSING_TS if value is None else int(_timestamps([value])[0])
+            else:
+                value = -np.inf if value is None else float(value)
+            start, stop = columns.rows(last_number)
+            if direction == 1:
+                tiebreak = ranks >= stop if stop > start else ranks >= start
+                keep = (keys > value) | ((keys == value) & tiebreak)
+            else:
+                keep = (keys < value) | ((keys == value) & (ranks < start))
+            keys, ranks, rows = keys[keep], ranks[keep], rows[keep]
+
+        if direction == -1:
+            keys, ranks = -keys, -ranks
+        wanted = limit + 1
+        if len(keys) > 4 * wanted:
+            # Only rows whose key is within the first `wanted` can be on the page (ties included)
+            kth = np.partition(keys, wanted - 1)[wanted - 1]
+            near = keys <= kth
+            keys, ranks, rows = keys[near], ranks[near], rows[near]
+        order = np.lexsort((ranks, keys))[:wanted]
+        numbers = [columns.numbers[row].decode() for row in rows[order]]
+        return numbers[:limit], len(numbers) > limit
+
+    def stats(self):
+        columns = self._columns
+        return {
+            "enabled": self.enabled,
+            "rows": 0 if columns is None else int(columns.alive.sum()),
+            "bytes": 0 if columns is None else columns.nbytes(),
+            "age_seconds": None if self._loaded_at is None else round(time.monotonic() - self._loaded_at, 1),
+            "stale": self._stale,
+        }
+
+
+flight_snapshot = FlightSnapshot(globalaccess.db.flights)
+
+
+@flight_changed.connect
+def _update_flight_snapshot(flight_number, changes=None, **kwargs):
+    if flight_snapshot.enabled:
+        flight_snapshot.update(flight_number, changes)
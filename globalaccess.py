@@ -1,7 +1,56 @@
+import os
+
 from pymongo import MongoClient
+import metrics
 
-client = MongoClient("mongodb://localhost:27017")
-db = client.flight_booking
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
+MONGO_DB = os.environ.get('MONGO_DB', 'flight_booking')
 
 SECRET_KEY = 'mysecret'
 
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def client_options():
+    """MongoClient settings, tunable per deployment through the environment"""
+    options = {
+        'maxPoolSize': _env_int('MONGO_MAX_POOL_SIZE', 100),
+        'minPoolSize': _env_int('MONGO_MIN_POOL_SIZE', 0),
+        'maxIdleTimeMS': _env_int('MONGO_MAX_IDLE_TIME_MS', 300000),
+        'waitQueueTimeoutMS': _env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000),
+        'connectTimeoutMS': _env_int('MONGO_CONNECT_TIMEOUT_MS', 5000),
+        'serverSelectionTimeoutMS': _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        'socketTimeoutMS': _env_int('MONGO_SOCKET_TIMEOUT_MS', 30000),
+        'appname': os.environ.get('MONGO_APPNAME', 'flightbooking_backend'),
+        # No sockets or monitor threads until the first operation, so the app can be
+        # imported in a pre-fork master and each worker builds its own pool after fork
+        'connect': False,
+        'event_listeners': [metrics.mongo_listener],
+    }
+    compressors = os.environ.get('MONGO_COMPRESSORS')  # e.g. "zstd,snappy,zlib"
+    if compressors:
+        options['compressors'] = compressors
+    return options
+
+
+def create_client(uri=None, **overrides):
+    """The single place the app builds a MongoClient"""
+    options = client_options()
+    options.update(overrides)
+    return MongoClient(uri or MONGO_URI, **options)
+
+
+def create_async_client(uri=None, **overrides):
+    """AsyncMongoClient with the same settings, for the ASGI app (asgi.py)"""
+    from pymongo import AsyncMongoClient
+
+    options = client_options()
+    options.update(overrides)
+    return AsyncMongoClient(uri or MONGO_URI, **options)
+
+
+client = create_client()
+db = client[MONGO_DB]
@@ -0,0 +1,239 @@
+"""Seat holds: seats taken off a flight for a few minutes while a user checks out.
+
+A hold takes its seats from the flight when it is created, so users are turned
+away before payment rather than after it, and turning the hold into bookings
+only touches the hold document, not the hot flight document.
+
+Lifecycle: active -> converted (every seat booked), released (DELETE) or
+expiring -> expired (reaped). Active holds past expires_at are claimed in
+batches by the HoldReaper and their seats go back with one $inc per flight. A
+TTL index can't do that part, since Mongo would delete the hold without
+returning its seats, so TTL only purges holds once they are finished: purge_at
+is set on the way out.
+"""
+import datetime
+import logging
+import os
+import threading
+import uuid
+
+from pymongo import ReturnDocument
+
+import globalaccess
+import async_mongo
+from inventory import reserve_seats, release_seats, reserve_seats_async, release_seats_async, return_reaped_seats
+
+HOLD_SECONDS = int(os.environ.get('HOLD_SECONDS', 600))
+MAX_HOLD_SECONDS = int(os.environ.get('MAX_HOLD_SECONDS', 1800))
+MAX_HOLD_SEATS = int(os.environ.get('MAX_HOLD_SEATS', 9))
+HOLD_RETENTION_SECONDS = int(os.environ.get('HOLD_RETENTION_SECONDS', 86400))  # finished holds kept for support
+REAP_INTERVAL = float(os.environ.get('HOLD_REAP_INTERVAL', 5))
+REAP_BATCH = int(os.environ.get('HOLD_REAP_BATCH', 500))
+REAP_RETRY_SECONDS = float(os.environ.get('HOLD_REAP_RETRY', 60))  # before another pass finishes a stuck claim
+
+holds = globalaccess.db.holds
+log = logging.getLogger('flightbooking.holds')
+
+
+class HoldUnavailable(Exception):
+    """The hold doesn't exist, isn't the caller's, has expired or has too few seats left"""
+
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+def _finished(status, now):
+    return {"status": status, "finished_at": now,
+            "purge_at": now + datetime.timedelta(seconds=HOLD_RETENTION_SECONDS)}
+
+
+def _new_hold(flight_number, seats, user, seconds):
+    now = _now()
+    return {
+        "_id": str(uuid.uuid4()),
+        "flight_number": flight_number,
+        "user": user,
+        "seats": seats,
+        "booked": 0,
+        "status": "active",
+        "created_at": now,
+        "expires_at": now + datetime.timedelta(seconds=seconds),
+    }
+
+
+def parse_hold_request(data):
+    """(seats, seconds) from a hold request body. Raises ValueError for bad values."""
+    try:
+        seats = int(data.get("seats", 1))
+        seconds = int(data.get("seconds", HOLD_SECONDS))
+    except (TypeError, ValueError):
+        raise ValueError("seats and seconds must be integers")
+    if not 1 <= seats <= MAX_HOLD_SEATS:
+        raise ValueError(f"seats must be between 1 and {MAX_HOLD_SEATS}")
+    if not 1 <= seconds <= MAX_HOLD_SECONDS:
+        raise ValueError(f"seconds must be between 1 and {MAX_HOLD_SECONDS}")
+    return seats, seconds
+
+
+def create_hold(flight_number, seats, user, seconds=HOLD_SECONDS):
+    """Take `seats` seats off the flight and record the hold.
+
+    Raises FlightNotFound or SeatsUnavailable like reserve_seats.
+    """
+    reserve_seats(flight_number, seats)
+    hold = _new_hold(flight_number, seats, user, seconds)
+    try:
+        holds.insert_one(hold)
+    except Exception:
+        release_seats(flight_number, seats)
+        raise
+    hold_reaper.start()
+    return hold
+
+
+def _take_filter(hold_id, flight_number, user, seats):
+    return {"_id": hold_id, "flight_number": flight_number, "user": user, "status": "active",
+            "expires_at": {"$gt": _now()}, "seats": {"$gte": seats}}
+
+
+def _take_update(seats):
+    return {"$inc": {"seats": -seats, "booked": seats}}
+
+
+def take_from_hold(hold_id, flight_number, user, seats=1):
+    """Atomically move `seats` seats from an active hold to bookings.
+
+    The flight's seats_available was already decremented when the hold was
+    made, so this is a single guarded update on the hold. Raises HoldUnavailable.
+    """
+    hold = holds.find_one_and_update(_take_filter(hold_id, flight_number, user, seats), _take_update(seats),
+                                     projection={"seats": 1}, return_document=ReturnDocument.AFTER)
+    if hold is None:
+        raise HoldUnavailable(hold_id)
+    if hold["seats"] == 0:
+        holds.update_one({"_id": hold_id, "seats": 0, "status": "active"}, {"$set": _finished("converted", _now())})
+    return hold
+
+
+def release_hold(hold_id, user):
+    """Give an active hold's seats back early (checkout abandoned). Returns the hold or None."""
+    hold = holds.find_one_and_update({"_id": hold_id, "user": user, "status": "active"},
+                                     {"$set": _finished("released", _now())},
+                                     projection={"flight_number": 1, "seats": 1})
+    if hold is not None and hold["seats"]:
+        release_seats(hold["flight_number"], hold["seats"])
+    return hold
+
+
+async def create_hold_async(flight_number, seats, user, seconds=HOLD_SECONDS):
+    """create_hold on the async client (ASGI app)"""
+    await reserve_seats_async(flight_number, seats)
+    hold = _new_hold(flight_number, seats, user, seconds)
+    try:
+        await async_mongo.db.holds.insert_one(hold)
+    except Exception:
+        await release_seats_async(flight_number, seats)
+        raise
+    hold_reaper.start()
+    return hold
+
+
+async def take_from_hold_async(hold_id, flight_number, user, seats=1):
+    """take_from_hold on the async client (ASGI app)"""
+    holds_async = async_mongo.db.holds
+    hold = await holds_async.find_one_and_update(_take_filter(hold_id, flight_number, user, seats), _take_update(seats),
+                                                 projection={"seats": 1}, return_document=ReturnDocument.AFTER)
+    if hold is None:
+        raise HoldUnavailable(hold_id)
+    if hold["seats"] == 0:
+        await holds_async.update_one({"_id": hold_id, "seats": 0, "status": "active"},
+                                     {"$set": _finished("converted", _now())})
+    return hold
+
+
+async def release_hold_async(hold_id, user):
+    """release_hold on the async client (ASGI app)"""
+    hold = await async_mongo.db.holds.find_one_and_update({"_id": hold_id, "user": user, "status": "active"},
+                                                          {"$set": _finished("released", _now())},
+                                                          projection={"flight_number": 1, "seats": 1})
+    if hold is not None and hold["seats"]:
+        await release_seats_async(hold["flight_number"], hold["seats"])
+    return hold
+
+
+def hold_response(hold):
+    return {"hold_id": hold["_id"], "flight_number": hold["flight_number"], "seats": hold["seats"],
+            "expires_at": hold["expires_at"]}
+
+
+class HoldReaper:
+    """Background thread returning the seats of lapsed holds, REAP_BATCH holds at a time.
+
+    Each pass claims a batch with one update_many guarded on status, moving the
+    holds to "expiring", so a hold being booked at the same moment is either
+    converted or reaped, never both, and several processes can reap side by
+    side. Only once a flight's seats are back are its holds marked expired. If
+    the pass fails or stalls in between, its holds stay expiring and a pass at
+    least retry_after seconds later claims and finishes them. The flight
+    records which holds' seats it got back (inventory.return_reaped_seats), so
+    a slow pass and the one that took its holds over return their seats once.
+    """
+
+    def __init__(self, collection, interval=REAP_INTERVAL, batch=REAP_BATCH, retry_after=REAP_RETRY_SECONDS):
+        self.collection = collection
+        self.interval = interval
+        self.batch = batch
+        self.retry_after = retry_after
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="hold-reaper")
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                while self.reap_once() == self.batch:
+                    pass  # a full batch means there may be more waiting
+            except Exception:
+                log.exception("hold reaper pass failed; retrying in %ss", self.interval)
+
+    def reap_once(self):
+        """Expire one batch of lapsed holds and return their seats. Returns the number of holds reaped."""
+        now = _now()
+        # Lapsed holds, and holds an earlier pass claimed but never finished
+        reapable = {"$or": [
+            {"status": "active", "expires_at": {"$lte": now}},
+            {"status": "expiring", "claimed_at": {"$lte": now - datetime.timedelta(seconds=self.retry_after)}},
+        ]}
+        candidates = list(self.collection.find(reapable, {"_id": 1}).sort("expires_at", 1).limit(self.batch))
+        if not candidates:
+            return 0
+        token = str(uuid.uuid4())
+        ids = [hold["_id"] for hold in candidates]
+        claimed = self.collection.update_many(dict(reapable, _id={"$in": ids}),
+                                              {"$set": {"status": "expiring", "claimed_at": now, "reaped_by": token}})
+        if not claimed.modified_count:
+            return 0
+        by_flight = {}  # flight_number -> [(hold id, seats)]
+        for hold in self.collection.find({"_id": {"$in": ids}, "reaped_by": token}, {"flight_number": 1, "seats": 1}):
+            by_flight.setdefault(hold["flight_number"], []).append((hold["_id"], hold["seats"]))
+        for flight_number, flight_holds in by_flight.items():
+            return_reaped_seats(flight_number, flight_holds)
+            self.collection.update_many({"_id": {"$in": [hold_id for hold_id, _ in flight_holds]},
+                                         "status": "expiring", "reaped_by": token},
+                                        {"$set": _finished("expired", now)})
+        return claimed.modified_count
+
+
+hold_reaper = HoldReaper(holds)
@@ -0,0 +1,113 @@
+import logging
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, PyMongoError
+import globalaccess
+
+log = logging.getLogger('flightbooking.indexes')
+
+##################################### INDEX DEFINITIONS #####################################
+# (collection, keys, options) - created idempotently by ensure_indexes()
+INDEXES = [
+    ("flights", [("flight_number", ASCENDING)], {"unique": True, "name": "flight_number_unique"}),
+    # Every search sort is (field, flight_number) so keyset pages can be read straight off an index
+    ("flights", [("departure_airport", ASCENDING), ("arrival_airport", ASCENDING),
+                 ("departure_time", ASCENDING), ("flight_number", ASCENDING)], {"name": "route_departure_time_flight"}),
+    ("flights", [("departure_airport", ASCENDING), ("arrival_airport", ASCENDING),
+                 ("price", ASCENDING), ("flight_number", ASCENDING)], {"name": "route_price_flight"}),
+    ("flights", [("departure_airport", ASCENDING), ("arrival_airport", ASCENDING),
+                 ("rating.avg", ASCENDING), ("flight_number", ASCENDING)], {"name": "route_rating_flight"}),
+    ("flights", [("departure_time", ASCENDING), ("flight_number", ASCENDING)], {"name": "departure_time_flight"}),
+    ("flights", [("price", ASCENDING), ("flight_number", ASCENDING)], {"name": "price_flight"}),
+    ("flights", [("rating.avg", ASCENDING), ("flight_number", ASCENDING)], {"name": "rating_flight"}),
+    ("bookings", [("user", ASCENDING), ("booking_time", ASCENDING), ("_id", ASCENDING)], {"name": "user_booking_time"}),
+    ("bookings", [("flight_number", ASCENDING), ("booking_time", ASCENDING), ("_id", ASCENDING)],
+     {"name": "flight_booking_time"}),
+    # Date-range exports (exports.py) read in booking_time order
+    ("bookings", [("booking_time", ASCENDING), ("_id", ASCENDING)], {"name": "booking_time"}),
+    ("fare_calendar", [("departure_airport", ASCENDING), ("arrival_airport", ASCENDING), ("date", ASCENDING)],
+     {"name": "route_date"}),
+    # Reviews page in insertion order, per flight and across all flights
+    ("reviews", [("flight_number", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+     {"name": "flight_created_review"}),
+    ("reviews", [("created_at", ASCENDING), ("_id", ASCENDING)], {"name": "created_review"}),
+    # The reaper's scan for lapsed holds; finished holds are purged once purge_at passes
+    ("holds", [("status", ASCENDING), ("expires_at", ASCENDING)], {"name": "status_expires_at"}),
+    ("holds", [("purge_at", ASCENDING)], {"expireAfterSeconds": 0, "name": "purge_at_ttl"}),
+    # Revoked tokens are keyed by token hash; Mongo purges them once the token has expired
+    ("blacklist", [("exp", ASCENDING)], {"expireAfterSeconds": 0, "name": "exp_ttl"}),
+    ("blacklist", [("revoked_at", ASCENDING)], {"name": "revoked_at"}),
+]
+
+# Common search shapes that must stay index-backed, as (request args, description)
+SEARCH_SHAPES = [
+    ({"departure_location": "LHR", "arrival_location": "JFK"}, "route"),
+    ({"departure_location": "LHR", "arrival_location": "JFK", "date": "2025-06-15"}, "route + date"),
+    ({"departure_location": "LHR", "arrival_location": "JFK", "sort_by": "price"}, "route sorted by price"),
+    ({"departure_location": "LHR", "arrival_location": "JFK", "min_price": "100", "max_price": "900",
+      "sort_by": "price"}, "route + price range"),
+    ({"departure_location": "LHR", "arrival_location": "JFK", "sort_by": "rating", "sort_order": "desc"},
+     "route sorted by rating"),
+    ({"date": "2025-06-15"}, "date only"),
+    ({"sort_by": "price", "sort_order": "desc"}, "all flights by price"),
+]
+
+
+def duplicate_keys(collection, keys, limit=20):
+    """Up to `limit` key values held by more than one document - what blocks a unique index"""
+    fields = [field for field, _ in keys]
+    pipeline = [
+        {"$group": {"_id": {field: f"${field}" for field in fields}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    values = [group["_id"] for group in collection.aggregate(pipeline, allowDiskUse=True)]
+    return [value[fields[0]] if len(fields) == 1 else value for value in values]
+
+
+def ensure_indexes(db=None):
+    """Create all indexes the query paths rely on (no-op when they already exist).
+
+    Each index is created on its own, so one that cannot be built (e.g. a
+    unique index over duplicate data) does not hold back the rest. Returns
+    the failures as (collection, index name, message) and logs each one.
+    """
+    db = globalaccess.db if db is None else db
+    failures = []
+    for collection, keys, options in INDEXES:
+        try:
+            db[collection].create_index(keys, **options)
+        except PyMongoError as e:
+            message = str(e)
+            if isinstance(e, DuplicateKeyError):
+                message = f"duplicate values {duplicate_keys(db[collection], keys)!r}"
+            log.error("Could not build index %s.%s: %s", collection, options["name"], message)
+            failures.append((collection, options["name"], message))
+    return failures
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() winning plan tree"""
+    yield plan.get("stage")
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+    if "inputStage" in plan:
+        yield from _plan_stages(plan["inputStage"])
+    # SBE plans wrap the classic tree in queryPlan
+    if "queryPlan" in plan:
+        yield from _plan_stages(plan["queryPlan"])
+
+
+def check_search_plans(db=None):
+    """Explain every SEARCH_SHAPES query and return the ones that fall back to a COLLSCAN"""
+    from blueprints.flights.flights import build_search_query
+
+    db = globalaccess.db if db is None else db
+    failures = []
+    for args, description in SEARCH_SHAPES:
+        query, sort = build_search_query(args)
+        explain = db.flights.find(query).sort(sort).explain()
+        stages = set(_plan_stages(explain["queryPlanner"]["winningPlan"]))
+        if "COLLSCAN" in stages:
+            failures.append((description, query, sort))
+    return failures
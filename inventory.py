@@ -0,0 +1,126 @@
+from pymongo import ReturnDocument
+import globalaccess
+import async_mongo
+from signals import send_flight_changed
+
+flights = globalaccess.db.flights
+
+# Every seat write bumps seats_version, so subscribers can order the flight_changed signals it sends
+SEATS_FIELDS = {"_id": 0, "seats_available": 1, "seats_version": 1}
+REAPED_HOLDS_KEPT = 1000  # per flight; a flight never has more holds open than seats, see return_reaped_seats
+
+
+class FlightNotFound(Exception):
+    pass
+
+
+class SeatsUnavailable(Exception):
+    pass
+
+
+def _seats_changed(flight):
+    """flight_changed arguments for a seat write, from the flight it returned (SEATS_FIELDS)"""
+    return {"changes": {"seats_available": flight["seats_available"]}, "seats_version": flight["seats_version"]}
+
+
+def reserve_seats(flight_number, seats=1):
+    """Atomically take `seats` seats from a flight, guarded on enough seats being left.
+
+    Returns the updated seats_available count. Raises FlightNotFound or SeatsUnavailable.
+    """
+    flight = flights.find_one_and_update(
+        {"flight_number": flight_number, "seats_available": {"$gte": seats}},
+        {"$inc": {"seats_available": -seats, "seats_version": 1}},
+        projection=SEATS_FIELDS,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if flight is None:
+        # Only the failure path pays for a second round trip to tell the two cases apart
+        if flights.count_documents({"flight_number": flight_number}, limit=1) == 0:
+            raise FlightNotFound(flight_number)
+        raise SeatsUnavailable(flight_number)
+    seats_left = flight["seats_available"] - seats
+    send_flight_changed(flight_number, changes={"seats_available": seats_left},
+                        seats_version=flight.get("seats_version", 0) + 1)
+    return seats_left
+
+
+def release_seats(flight_number, seats=1):
+    """Give `seats` seats back to a flight (cancellation or compensation of a failed booking)"""
+    flight = flights.find_one_and_update(
+        {"flight_number": flight_number},
+        {"$inc": {"seats_available": seats, "seats_version": 1}},
+        projection=SEATS_FIELDS,
+        return_document=ReturnDocument.AFTER,
+    )
+    if flight is not None:
+        send_flight_changed(flight_number, **_seats_changed(flight))
+    return flight
+
+
+def _return_once(flight_number, hold_ids, seats):
+    return flights.find_one_and_update(
+        {"flight_number": flight_number, "reaped_holds": {"$nin": hold_ids}},
+        {"$inc": {"seats_available": seats, "seats_version": 1},
+         "$push": {"reaped_holds": {"$each": hold_ids, "$slice": -REAPED_HOLDS_KEPT}}},
+        projection=SEATS_FIELDS,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def return_reaped_seats(flight_number, holds):
+    """Give the seats of reaped holds back to a flight, at most once per hold.
+
+    `holds` is a list of (hold_id, seats). The ids are pushed onto the flight's
+    reaped_holds in the same update as the $inc, and the update is guarded on
+    them not being there yet, so a reaper pass that took over another's holds
+    cannot return their seats a second time. Only the last REAPED_HOLDS_KEPT
+    ids are kept, which bounds the document and is far more than a stalled
+    pass can fall behind by. Returns the seats returned.
+    """
+    hold_ids = [hold_id for hold_id, _ in holds]
+    returned = sum(seats for _, seats in holds)
+    flight = _return_once(flight_number, hold_ids, returned)
+    if flight is None:
+        # Some were returned already (or the flight is gone): settle the rest one hold at a time
+        returned = 0
+        for hold_id, seats in holds:
+            updated = _return_once(flight_number, [hold_id], seats)
+            if updated is not None:
+                flight = updated
+                returned += seats
+    if flight is not None:
+        send_flight_changed(flight_number, **_seats_changed(flight))
+    return returned
+
+
+async def reserve_seats_async(flight_number, seats=1):
+    """reserve_seats on the async client (ASGI app)"""
+    flights_async = async_mongo.db.flights
+    flight = await flights_async.find_one_and_update(
+        {"flight_number": flight_number, "seats_available": {"$gte": seats}},
+        {"$inc": {"seats_available": -seats, "seats_version": 1}},
+        projection=SEATS_FIELDS,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if flight is None:
+        if await flights_async.count_documents({"flight_number": flight_number}, limit=1) == 0:
+            raise FlightNotFound(flight_number)
+        raise SeatsUnavailable(flight_number)
+    seats_left = flight["seats_available"] - seats
+    await async_mongo.send_flight_changed(flight_number, changes={"seats_available": seats_left},
+                                          seats_version=flight.get("seats_version", 0) + 1)
+    return seats_left
+
+
+async def release_seats_async(flight_number, seats=1):
+    """release_seats on the async client (ASGI app)"""
+    flight = await async_mongo.db.flights.find_one_and_update(
+        {"flight_number": flight_number},
+        {"$inc": {"seats_available": seats, "seats_version": 1}},
+        projection=SEATS_FIELDS,
+        return_document=ReturnDocument.AFTER,
+    )
+    if flight is not None:
+        await async_mongo.send_flight_changed(flight_number, **_seats_changed(flight))
+    return flight
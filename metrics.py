@@ -0,0 +1,214 @@
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+# Latency bucket upper bounds in seconds; p50/p95/p99 come from histogram_quantile() over these
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Requests slower than this (milliseconds) are logged with the Mongo commands they ran; unset disables it
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 0)) or None
+
+slow_log = logging.getLogger('flightbooking.slow_requests')
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Process-local metric store; every update is a dict lookup and a few increments under one lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_latency = {}   # (blueprint, endpoint, method) -> Histogram
+        self.request_count = {}     # (blueprint, endpoint, method, status) -> int
+        self.mongo_latency = {}     # (command, collection) -> Histogram
+        self.mongo_failures = {}    # (command, collection) -> int
+
+    def observe_request(self, blueprint, endpoint, method, status, seconds):
+        with self._lock:
+            key = (blueprint, endpoint, method)
+            histogram = self.request_latency.get(key)
+            if histogram is None:
+                histogram = self.request_latency[key] = Histogram()
+            histogram.observe(seconds)
+            count_key = key + (str(status),)
+            self.request_count[count_key] = self.request_count.get(count_key, 0) + 1
+
+    def observe_mongo(self, command, collection, seconds, failed=False):
+        with self._lock:
+            key = (command, collection)
+            histogram = self.mongo_latency.get(key)
+            if histogram is None:
+                histogram = self.mongo_latency[key] = Histogram()
+            histogram.observe(seconds)
+            if failed:
+                self.mongo_failures[key] = self.mongo_failures.get(key, 0) + 1
+
+
+registry = Registry()
+# Mongo commands run by the current request; a context variable so it follows
+# both request threads (Flask) and request tasks (the ASGI app)
+_request_commands = contextvars.ContextVar('request_mongo_commands', default=None)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding the Mongo latency histograms (and the slow request log)"""
+
+    def __init__(self):
+        self._pending = {}  # request_id -> (command, collection)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ''
+        self._pending[event.request_id] = (event.command_name, collection)
+        commands = _request_commands.get()
+        if commands is not None:
+            commands.append({
+                'command': event.command_name,
+                'collection': collection,
+                'filter': event.command.get('filter', event.command.get('query', event.command.get('pipeline'))),
+            })
+
+    def succeeded(self, event):
+        command, collection = self._pending.pop(event.request_id, (event.command_name, ''))
+        registry.observe_mongo(command, collection, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        command, collection = self._pending.pop(event.request_id, (event.command_name, ''))
+        registry.observe_mongo(command, collection, event.duration_micros / 1e6, failed=True)
+
+
+mongo_listener = MongoCommandTimer()
+
+
+##################################### FLASK HOOKS #####################################
+def _start(g):
+    g.metrics_start = time.perf_counter()
+    if SLOW_REQUEST_MS:
+        _request_commands.set([])
+
+
+def _finish(g, request, response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    seconds = time.perf_counter() - start
+    endpoint = request.endpoint or 'unmatched'
+    registry.observe_request(request.blueprint or '', endpoint, request.method, response.status_code, seconds)
+
+    if SLOW_REQUEST_MS:
+        commands = _request_commands.get() or []
+        _request_commands.set(None)
+        if seconds * 1000 >= SLOW_REQUEST_MS:
+            slow_log.warning("slow request %s %s -> %s in %.1fms; mongo commands: %s",
+                             request.method, request.full_path.rstrip('?'), response.status_code, seconds * 1000, commands)
+    return response
+
+
+def _before_request():
+    _start(g)
+
+
+def _after_request(response):
+    return _finish(g, request, response)
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+
+def init_asgi_app(app):
+    """The same hooks and /metrics for the Quart app in asgi.py"""
+    import quart
+
+    # Coroutines, so they run in the request's task (Quart would run plain functions in a thread)
+    async def before_request():
+        _start(quart.g)
+
+    async def after_request(response):
+        return _finish(quart.g, quart.request, response)
+
+    async def view():
+        return quart.Response(render(), mimetype='text/plain; version=0.0.4')
+
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.add_url_rule('/metrics', 'metrics', view)
+
+
+##################################### PROMETHEUS EXPOSITION #####################################
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _render_histogram(lines, name, histogram, labels):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+def render():
+    from cache import search_cache, flight_cache
+
+    lines = []
+    with registry._lock:
+        lines.append('# HELP http_request_duration_seconds Request latency by route')
+        lines.append('# TYPE http_request_duration_seconds histogram')
+        for (blueprint, endpoint, method), histogram in sorted(registry.request_latency.items()):
+            _render_histogram(lines, 'http_request_duration_seconds', histogram,
+                              _labels(blueprint=blueprint, endpoint=endpoint, method=method))
+
+        lines.append('# HELP http_requests_total Requests by route and status code')
+        lines.append('# TYPE http_requests_total counter')
+        for (blueprint, endpoint, method, status), count in sorted(registry.request_count.items()):
+            lines.append(f'http_requests_total{{{_labels(blueprint=blueprint, endpoint=endpoint, method=method, status=status)}}} {count}')
+
+        lines.append('# HELP mongodb_command_duration_seconds Mongo command latency')
+        lines.append('# TYPE mongodb_command_duration_seconds histogram')
+        for (command, collection), histogram in sorted(registry.mongo_latency.items()):
+            _render_histogram(lines, 'mongodb_command_duration_seconds', histogram,
+                              _labels(command=command, collection=collection))
+
+        lines.append('# HELP mongodb_command_failures_total Failed Mongo commands')
+        lines.append('# TYPE mongodb_command_failures_total counter')
+        for (command, collection), count in sorted(registry.mongo_failures.items()):
+            lines.append(f'mongodb_command_failures_total{{{_labels(command=command, collection=collection)}}} {count}')
+
+    cache_stats = {'search': search_cache.stats(), 'flights': flight_cache.stats()}
+    for stat, metric, kind in (('hits', 'cache_hits_total', 'counter'), ('misses', 'cache_misses_total', 'counter'),
+                               ('evictions', 'cache_evictions_total', 'counter'), ('entries', 'cache_entries', 'gauge')):
+        lines.append(f'# TYPE {metric} {kind}')
+        for name, stats in cache_stats.items():
+            lines.append(f'{metric}{{{_labels(cache=name)}}} {stats[stat]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    return Response(render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,105 @@
+import base64
+import json
+
+from flask import Response, current_app, jsonify, make_response, stream_with_context
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+TOTAL_COUNT_HEADER = 'X-Total-Count'
+
+
+def parse_limit(args, default=DEFAULT_LIMIT):
+    """Read ?limit= and clamp it to MAX_LIMIT. Raises ValueError when it isn't a positive integer."""
+    value = args.get('limit')
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be a positive integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_LIMIT)
+
+
+def encode_cursor(values):
+    """Opaque token holding the sort key of the last item on a page"""
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor. Raises ValueError for tokens we didn't issue."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def fetch_page(cursor, limit):
+    """Read up to limit items from a Mongo cursor; the extra item fetched tells us if there is a next page"""
+    items = list(cursor.limit(limit + 1))
+    has_more = len(items) > limit
+    return items[:limit], has_more
+
+
+async def fetch_page_async(cursor, limit):
+    """fetch_page for an AsyncMongoClient cursor"""
+    items = await cursor.limit(limit + 1).to_list(None)
+    has_more = len(items) > limit
+    return items[:limit], has_more
+
+
+def page_headers(next_cursor=None, total=None):
+    headers = {}
+    if next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        headers[TOTAL_COUNT_HEADER] = str(total)
+    return headers
+
+
+def page_response(items, next_cursor=None, status=200, total=None):
+    """JSON list response; the token for the following page (if any) goes in the X-Next-Cursor header"""
+    response = make_response(jsonify(items), status)
+    response.headers.update(page_headers(next_cursor, total))
+    return response
+
+
+def keyset_filter(field, value, tiebreak_field, tiebreak_value, direction):
+    """Filter for the documents after (value, tiebreak_value) in a [(field, direction), (tiebreak_field, direction)] sort.
+
+    Handles null/missing sort values, which Mongo orders before every number or string.
+    """
+    after = "$gt" if direction == 1 else "$lt"
+    same_value = {field: value, tiebreak_field: {after: tiebreak_value}}
+    if value is None:
+        # Ascending: the non-null values are still to come; descending: only nulls remain
+        return {"$or": [same_value, {field: {"$ne": None}}]} if direction == 1 else same_value
+    clauses = [{field: {after: value}}, same_value]
+    if direction == -1:
+        clauses.append({field: None})
+    return {"$or": clauses}
+
+
+def wants_ndjson(request):
+    """True when the client explicitly prefers newline-delimited JSON over a JSON array"""
+    return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+
+def ndjson_response(cursor, transform=None):
+    """Stream a Mongo cursor as one JSON document per line without materializing it"""
+    def generate():
+        try:
+            for doc in cursor:
+                if transform is not None:
+                    doc = transform(doc)
+                yield current_app.json.dumps(doc) + '\n'
+        finally:
+            cursor.close()
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,94 @@
+"""bcrypt hashing in a bounded process pool.
+
+bcrypt is CPU-bound for hundreds of milliseconds per call at the usual costs,
+so it runs in a pool of HASH_WORKERS processes (default: one per core) instead
+of on request threads. At most HASH_WORKERS + HASH_QUEUE_LIMIT calls are in
+flight per web worker; beyond that HasherBusy is raised straight away so the
+caller can answer 503 rather than queue behind the burst.
+
+BCRYPT_ROUNDS sets the cost of new hashes. Hashes made at another cost are
+still accepted and check_password reports them as needing a rehash, which the
+login handlers do transparently.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', 0)) or os.cpu_count() or 1
+HASH_QUEUE_LIMIT = int(os.environ.get('HASH_QUEUE_LIMIT', HASH_WORKERS * 4))
+
+
+class HasherBusy(Exception):
+    """Every worker is busy and the queue is full"""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_cost(hashed):
+    """Cost factor of a $2b$<cost>$... hash (None if it isn't one)"""
+    try:
+        return int(hashed.split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT, rounds=BCRYPT_ROUNDS):
+        self.workers = workers
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        # Created on first use, so every (pre-forked) web worker starts its own pool
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _submit(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash_password(self, password):
+        return self._submit(_hash, password.encode('utf-8'), self.rounds).result()
+
+    def check_password(self, password, hashed):
+        """(matches, needs_rehash) for a stored hash"""
+        matches = self._submit(_check, password.encode('utf-8'), hashed).result()
+        return matches, matches and hash_cost(hashed) != self.rounds
+
+    async def hash_password_async(self, password):
+        return await asyncio.wrap_future(self._submit(_hash, password.encode('utf-8'), self.rounds))
+
+    async def check_password_async(self, password, hashed):
+        matches = await asyncio.wrap_future(self._submit(_check, password.encode('utf-8'), hashed))
+        return matches, matches and hash_cost(hashed) != self.rounds
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets: `burst` attempts at once, refilled at `rate` per second.
+
+    Buckets live in this process only and the least recently used ones are
+    dropped past max_keys, so memory stays bounded under key-spraying.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Take one token for key; returns (allowed, seconds until the next token)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+
+# Login attempts: a handful per username (password guessing), more per client IP (shared NATs)
+login_by_username = TokenBucketLimiter(rate=float(os.environ.get('LOGIN_USER_RATE_PER_MIN', 5)) / 60,
+                                       burst=int(os.environ.get('LOGIN_USER_BURST', 5)))
+login_by_ip = TokenBucketLimiter(rate=float(os.environ.get('LOGIN_IP_RATE_PER_MIN', 60)) / 60,
+                                 burst=int(os.environ.get('LOGIN_IP_BURST', 20)))
+
+
+def check_login(username, ip):
+    """(allowed, retry_after seconds) for a login attempt, charged to both the username and the IP"""
+    ip_ok, ip_wait = login_by_ip.allow(ip)
+    if not ip_ok:
+        return False, ip_wait
+    return login_by_username.allow(username.lower())
@@ -0,0 +1,131 @@
+from pymongo import ReturnDocument, UpdateOne
+import globalaccess
+import async_mongo
+from signals import send_flight_changed
+
+flights = globalaccess.db.flights
+reviews = globalaccess.db.reviews
+
+STARS = ("1", "2", "3", "4", "5")
+
+
+def empty_rating():
+    return {"avg": None, "count": 0, "sum": 0, "histogram": {star: 0 for star in STARS}}
+
+
+def full_rating(rating):
+    """Fill in the histogram buckets and fields $inc hasn't created yet"""
+    full = empty_rating()
+    if rating:
+        full.update({field: value for field, value in rating.items() if field != "histogram"})
+        full["histogram"].update(rating.get("histogram", {}))
+    return full
+
+
+def _rating_increments(added, removed):
+    inc = {}
+    for star, sign in ((added, 1), (removed, -1)):
+        if star is None:
+            continue
+        inc["rating.count"] = inc.get("rating.count", 0) + sign
+        inc["rating.sum"] = inc.get("rating.sum", 0) + sign * star
+        key = f"rating.histogram.{star}"
+        inc[key] = inc.get(key, 0) + sign
+    return {field: delta for field, delta in inc.items() if delta}
+
+
+def _with_average(rating):
+    rating = full_rating(rating)
+    rating["avg"] = round(rating["sum"] / rating["count"], 2) if rating["count"] else None
+    return rating
+
+
+def apply_rating_delta(flight_number, added=None, removed=None):
+    """Fold one review change into the flight's precomputed rating with $inc deltas.
+
+    added / removed are the star values entering and leaving the aggregate
+    (an edit that changes the stars passes both).
+    """
+    inc = _rating_increments(added, removed)
+    if not inc:
+        return None
+
+    flight = flights.find_one_and_update(
+        {"flight_number": flight_number},
+        {"$inc": inc},
+        projection={"rating": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if flight is None:
+        return None
+    rating = _with_average(flight["rating"])
+    # avg can't be $inc'ed; only write it if nobody changed count/sum since our $inc,
+    # otherwise that later writer sets it from the newer totals
+    flights.update_one(
+        {"flight_number": flight_number, "rating.count": rating["count"], "rating.sum": rating["sum"]},
+        {"$set": {"rating.avg": rating["avg"]}}
+    )
+    send_flight_changed(flight_number, changes={"rating": rating})
+    return rating
+
+
+async def apply_rating_delta_async(flight_number, added=None, removed=None):
+    """apply_rating_delta on the async client (ASGI app)"""
+    inc = _rating_increments(added, removed)
+    if not inc:
+        return None
+
+    flights_async = async_mongo.db.flights
+    flight = await flights_async.find_one_and_update(
+        {"flight_number": flight_number},
+        {"$inc": inc},
+        projection={"rating": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if flight is None:
+        return None
+    rating = _with_average(flight["rating"])
+    await flights_async.update_one(
+        {"flight_number": flight_number, "rating.count": rating["count"], "rating.sum": rating["sum"]},
+        {"$set": {"rating.avg": rating["avg"]}}
+    )
+    await async_mongo.send_flight_changed(flight_number, changes={"rating": rating})
+    return rating
+
+
+def rebuild_ratings(batch_size=1000):
+    """Recompute every flight's rating from the reviews collection in bulk.
+
+    Meant for backfills and repairs while review writes are quiet.
+    """
+    flights.update_many({}, {"$set": {"rating": empty_rating()}})
+    pipeline = [
+        {"$group": {"_id": {"flight_number": "$flight_number", "star": "$star"}, "n": {"$sum": 1}}},
+        {"$group": {
+            "_id": "$_id.flight_number",
+            "stars": {"$push": {"star": "$_id.star", "n": "$n"}},
+        }},
+    ]
+    writes = []
+    rebuilt = 0
+    for row in reviews.aggregate(pipeline, allowDiskUse=True):
+        rating = empty_rating()
+        for bucket in row["stars"]:
+            try:
+                star = int(bucket["star"])
+            except (TypeError, ValueError):
+                continue  # a review without a usable star doesn't count towards the rating
+            if not 1 <= star <= 5:
+                continue
+            rating["histogram"][str(star)] = bucket["n"]
+            rating["count"] += bucket["n"]
+            rating["sum"] += star * bucket["n"]
+        rating["avg"] = round(rating["sum"] / rating["count"], 2) if rating["count"] else None
+        writes.append(UpdateOne({"flight_number": row["_id"]}, {"$set": {"rating": rating}}))
+        rebuilt += 1
+        if len(writes) >= batch_size:
+            flights.bulk_write(writes, ordered=False)
+            writes = []
+    if writes:
+        flights.bulk_write(writes, ordered=False)
+    return rebuilt
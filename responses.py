@@ -0,0 +1,128 @@
+"""ETag / Cache-Control and gzip / brotli compression for buffered GET responses.
+
+Every 200 response to a GET gets a weak ETag over its JSON body and answers
+304 when If-None-Match matches, so pollers only pay for a body when something
+changed. Bodies of at least COMPRESS_MIN_BYTES are compressed with brotli
+when the client accepts it and the brotli package is installed, otherwise
+with gzip. Streamed responses (NDJSON, SSE) are left alone.
+"""
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain')
+
+# Public flight data may be reused briefly by browsers and CDNs; everything else is revalidated
+CACHE_CONTROL = {
+    'flights_bp.search_flights': 'public, max-age=5',
+    'flights_bp.get_flight_details': 'public, max-age=5',
+    'reviews_bp.get_review': 'public, max-age=30',
+    'reviews_bp.get_all_reviews': 'public, max-age=30',
+    'fares_bp.get_fare_calendar': 'public, max-age=60',
+    'itineraries_bp.search_itineraries': 'public, max-age=30',
+    'suggest_bp.suggest': 'public, max-age=300',
+}
+DEFAULT_CACHE_CONTROL = 'private, no-cache'
+
+
+def etag_for(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def choose_encoding(accept_encoding):
+    """Best content coding we can produce for an Accept-Encoding header (None for identity)"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _prepare(request, response, body):
+    """Set caching headers and pick the body to send; None means 304 Not Modified"""
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = CACHE_CONTROL.get(request.endpoint, DEFAULT_CACHE_CONTROL)
+    etag = etag_for(body)
+    # Weak, because the gzip, brotli and identity encodings of a body share one tag
+    response.set_etag(etag, weak=True)
+    if request.if_none_match.contains_weak(etag):
+        return None
+    if response.mimetype not in COMPRESSIBLE_TYPES or 'Content-Encoding' in response.headers:
+        return body
+    response.vary.add('Accept-Encoding')
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return body
+    response.headers['Content-Encoding'] = encoding
+    return compress(body, encoding)
+
+
+def _eligible(request, response):
+    return request.method in ('GET', 'HEAD') and response.status_code == 200
+
+
+def _not_modified(response):
+    response.status_code = 304
+    response.set_data(b'')
+    for header in ('Content-Type', 'Content-Length', 'Content-Encoding'):
+        response.headers.pop(header, None)
+
+
+def init_app(app):
+    from flask import request
+
+    def after_request(response):
+        if not _eligible(request, response) or response.is_streamed or response.direct_passthrough:
+            return response
+        body = _prepare(request, response, response.get_data())
+        if body is None:
+            _not_modified(response)
+        else:
+            response.set_data(body)
+        return response
+
+    app.after_request(after_request)
+
+
+def init_asgi_app(app):
+    """The same hook for the Quart app in asgi.py"""
+    import quart
+    from quart.wrappers.response import DataBody
+
+    async def after_request(response):
+        if not _eligible(quart.request, response) or not isinstance(response.response, DataBody):
+            return response
+        body = _prepare(quart.request, response, await response.get_data())
+        if body is None:
+            _not_modified(response)
+        else:
+            response.set_data(body)
+        return response
+
+    app.after_request(after_request)
@@ -0,0 +1,98 @@
+import datetime
+import hashlib
+import threading
+import time
+
+import jwt
+
+import globalaccess
+
+REFRESH_INTERVAL = 5  # seconds a revocation made by another process may take to be seen here
+CLOCK_SKEW = datetime.timedelta(seconds=30)  # re-read window covering concurrent inserts from other processes
+NEVER_EXPIRES = datetime.datetime(9999, 12, 31)  # exp stored for a revoked token that carries none
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class RevocationList:
+    """In-memory view of db.blacklist, refreshed incrementally.
+
+    Revocations are stored as {_id: sha256(token), exp, revoked_at}; a TTL index on
+    exp lets Mongo purge them once the token could no longer be used anyway.
+    """
+
+    def __init__(self, collection, refresh_interval=REFRESH_INTERVAL):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self._revoked = {}  # token hash -> exp (epoch seconds)
+        self._since = None
+        self._next_refresh = 0
+        self._lock = threading.Lock()
+
+    def is_revoked(self, token):
+        if self.refresh_due():
+            self.refresh()
+        return token_hash(token) in self._revoked
+
+    def refresh_due(self):
+        """True when the next is_revoked() call would query Mongo (async callers refresh off the event loop)"""
+        return time.monotonic() >= self._next_refresh
+
+    def revoke(self, token, exp):
+        digest = token_hash(token)
+        now = datetime.datetime.utcnow()
+        self.collection.update_one(
+            {'_id': digest},
+            {'$setOnInsert': {'exp': datetime.datetime.utcfromtimestamp(exp), 'revoked_at': now}},
+            upsert=True
+        )
+        with self._lock:
+            self._revoked[digest] = exp
+
+    def refresh(self):
+        with self._lock:
+            if time.monotonic() < self._next_refresh:
+                return
+            now = datetime.datetime.utcnow()
+            query = {'exp': {'$gt': now}}
+            if self._since is not None:
+                query['revoked_at'] = {'$gte': self._since - CLOCK_SKEW}
+            for entry in self.collection.find(query, {'exp': 1}):
+                self._revoked[entry['_id']] = entry['exp'].replace(tzinfo=datetime.timezone.utc).timestamp()
+
+            cutoff = time.time()
+            for digest in [d for d, exp in self._revoked.items() if exp <= cutoff]:
+                del self._revoked[digest]
+            self._since = now
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+
+def migrate_legacy_revocations(collection=None):
+    """Rewrite pre-hash blacklist rows ({token: ...}) as {_id: sha256(token), exp, revoked_at}.
+
+    The exp comes from the token itself (signature checked, expiry not), so a
+    token logged out before the upgrade stays revoked until it would have
+    expired. Rows whose token doesn't verify could never be used and are just
+    deleted. Returns the number of rows migrated.
+    """
+    collection = globalaccess.db.blacklist if collection is None else collection
+    now = datetime.datetime.utcnow()
+    migrated = 0
+    for row in collection.find({'token': {'$exists': True}}):
+        try:
+            claims = jwt.decode(row['token'], globalaccess.SECRET_KEY, algorithms='HS256',
+                                options={'verify_exp': False})
+        except jwt.InvalidTokenError:
+            claims = None
+        if claims is not None:
+            exp = datetime.datetime.utcfromtimestamp(claims['exp']) if 'exp' in claims else NEVER_EXPIRES
+            collection.update_one({'_id': token_hash(row['token'])},
+                                  {'$setOnInsert': {'exp': exp, 'revoked_at': now}}, upsert=True)
+            migrated += 1
+        collection.delete_one({'_id': row['_id']})
+    return migrated
+
+
+revocations = RevocationList(globalaccess.db.blacklist)
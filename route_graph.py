@@ -0,0 +1,281 @@
+import bisect
+import datetime
+import heapq
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import globalaccess
+from signals import flight_changed
+
+REBUILD_INTERVAL = 900   # seconds before a full reload picks up flights written outside this process
+MAX_EXPANSIONS = 50000   # hard bound on search work per query
+
+log = logging.getLogger('flightbooking.route_graph')
+
+LEG_FIELDS = {"_id": 0, "flight_number": 1, "airline": 1, "departure_airport": 1, "arrival_airport": 1,
+              "departure_time": 1, "arrival_time": 1, "price": 1, "seats_available": 1, "seats_version": 1, "status": 1}
+
+Leg = namedtuple("Leg", "departs arrives price flight_number departure_airport arrival_airport airline "
+                        "departure_time arrival_time")
+
+
+def _timestamp(value):
+    """departure/arrival times are naive ISO strings; compare them as UTC epoch seconds"""
+    if isinstance(value, datetime.datetime):
+        moment = value
+    else:
+        moment = datetime.datetime.fromisoformat(value)
+    return int(moment.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+class _Departures:
+    """Legs leaving one airport (or flying one route) ordered by departure time.
+
+    Writers (under the graph lock) build new lists and swap them in as one
+    tuple, so searches read a consistent (times, legs) pair without locking.
+    """
+
+    __slots__ = ("_lists",)
+
+    def __init__(self, legs=()):
+        legs = sorted(legs, key=lambda leg: leg.departs)
+        self._lists = ([leg.departs for leg in legs], legs)
+
+    def add(self, leg):
+        times, legs = self._lists
+        index = bisect.bisect_right(times, leg.departs)
+        self._lists = (times[:index] + [leg.departs] + times[index:], legs[:index] + [leg] + legs[index:])
+
+    def remove(self, leg):
+        times, legs = self._lists
+        index = bisect.bisect_left(times, leg.departs)
+        while index < len(legs) and times[index] == leg.departs:
+            if legs[index].flight_number == leg.flight_number:
+                self._lists = (times[:index] + times[index + 1:], legs[:index] + legs[index + 1:])
+                return
+            index += 1
+
+    def between(self, earliest, latest):
+        times, legs = self._lists
+        start = bisect.bisect_left(times, earliest)
+        stop = bisect.bisect_right(times, latest)
+        return legs[start:stop]
+
+
+class GraphLoading(Exception):
+    """The route graph is still being loaded; retry shortly"""
+
+
+class RouteGraph:
+    """Time-expanded flight graph held in memory for connection search.
+
+    Only bookable legs (not cancelled, seats left) are indexed. The graph is
+    loaded in a background thread (started by warm(), or by the first search,
+    which raises GraphLoading until it is ready), patched from flight_changed
+    signals and fully reloaded every REBUILD_INTERVAL seconds.
+    """
+
+    def __init__(self, collection, rebuild_interval=REBUILD_INTERVAL):
+        self.collection = collection
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        self._flights = {}       # flight_number -> (Leg or None, seats_available, status, seats_version)
+        self._by_origin = {}     # airport -> _Departures
+        self._by_route = {}      # (from, to) -> _Departures
+        self._loaded_at = None
+        self._rebuilding = False
+
+    # ------------------------------------------------------------------ maintenance
+    def load(self, flights=None):
+        """Replace the graph with the given flight documents (default: all of db.flights)"""
+        if flights is None:
+            flights = self.collection.find({}, LEG_FIELDS).batch_size(5000)
+        records, by_origin, by_route = {}, {}, {}
+        for flight in flights:
+            record = self._record(flight)
+            if record is None:
+                continue
+            records[flight["flight_number"]] = record
+            leg = record[0]
+            if self._bookable(record):
+                by_origin.setdefault(leg.departure_airport, []).append(leg)
+                by_route.setdefault((leg.departure_airport, leg.arrival_airport), []).append(leg)
+        by_origin = {airport: _Departures(legs) for airport, legs in by_origin.items()}
+        by_route = {route: _Departures(legs) for route, legs in by_route.items()}
+        with self._lock:
+            self._flights, self._by_origin, self._by_route = records, by_origin, by_route
+            self._loaded_at = time.monotonic()
+
+    @property
+    def ready(self):
+        return self._loaded_at is not None
+
+    def warm(self):
+        """Start loading the graph in the background unless it is already loading"""
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._background_rebuild, daemon=True, name="route-graph-load").start()
+
+    def ensure_loaded(self):
+        """Raise GraphLoading until the first load is done; start a reload once the graph is stale"""
+        if self._loaded_at is None:
+            self.warm()
+            raise GraphLoading()
+        if time.monotonic() - self._loaded_at > self.rebuild_interval and not self._rebuilding:
+            # Serve from the current graph while a fresh one is built in the background
+            self.warm()
+
+    def _background_rebuild(self):
+        try:
+            self.load()
+        except Exception:
+            log.exception("route graph load failed; retrying on the next search")
+        finally:
+            self._rebuilding = False
+
+    def update(self, flight_number, changes=None, seats_version=None):
+        """Apply a flight write: patch seats/status in place, otherwise re-read the flight.
+
+        A seat count older than the record's seats_version arrived out of order and is ignored.
+        """
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            current = self._flights.get(flight_number)
+            if current is not None and changes and set(changes) <= {"seats_available", "status", "gate", "rating"}:
+                seats, version = current[1], current[3]
+                if "seats_available" in changes and (seats_version is None or seats_version >= version):
+                    seats, version = changes["seats_available"], seats_version or version
+                record = (current[0], seats, changes.get("status", current[2]), version)
+                if record == current:
+                    return
+            else:
+                flight = self.collection.find_one({"flight_number": flight_number}, LEG_FIELDS)
+                record = self._record(flight) if flight else None
+            self._replace(flight_number, current, record)
+
+    def _replace(self, flight_number, current, record):
+        if current is not None and record is not None and current[0] == record[0] \
+                and self._bookable(current) == self._bookable(record):
+            self._flights[flight_number] = record  # same leg, still (un)bookable: the indexes are unchanged
+            return
+        if current is not None and self._bookable(current):
+            self._by_origin[current[0].departure_airport].remove(current[0])
+            self._by_route[(current[0].departure_airport, current[0].arrival_airport)].remove(current[0])
+        if record is None:
+            self._flights.pop(flight_number, None)
+            return
+        self._flights[flight_number] = record
+        if self._bookable(record):
+            leg = record[0]
+            self._by_origin.setdefault(leg.departure_airport, _Departures()).add(leg)
+            self._by_route.setdefault((leg.departure_airport, leg.arrival_airport), _Departures()).add(leg)
+
+    @staticmethod
+    def _record(flight):
+        try:
+            leg = Leg(_timestamp(flight["departure_time"]), _timestamp(flight["arrival_time"]),
+                      float(flight.get("price") or 0), flight["flight_number"], flight["departure_airport"],
+                      flight["arrival_airport"], flight.get("airline"), flight["departure_time"], flight["arrival_time"])
+        except (KeyError, TypeError, ValueError):
+            return None  # not enough data to route through
+        return leg, flight.get("seats_available", 0), flight.get("status"), flight.get("seats_version", 0)
+
+    @staticmethod
+    def _bookable(record):
+        return record[1] > 0 and record[2] != "Cancelled"
+
+    # ------------------------------------------------------------------ search
+    def search(self, origin, destination, day, max_stops=2, min_layover=45, max_layover=360,
+               optimize="price", limit=5):
+        """Best-first search for the cheapest (or fastest) itineraries departing on `day`.
+
+        Labels are expanded in cost order, so itineraries reach the destination in
+        optimal order and the search stops after `limit` of them. A label is pruned
+        when one with the same arrival, no higher cost and no more legs was already
+        expanded at that airport, since it could only reach the same connections.
+        """
+        self.ensure_loaded()
+        start = _timestamp(datetime.datetime.combine(day, datetime.time()))
+        min_gap, max_gap = min_layover * 60, max_layover * 60
+        by_origin, by_route = self._by_origin, self._by_route
+
+        def cost(first, leg, price):
+            return price if optimize == "price" else leg.arrives - first.departs
+
+        queue = []
+        counter = 0
+        departures = by_route.get((origin, destination)) if max_stops == 0 else by_origin.get(origin)
+        for leg in departures.between(start, start + 86399) if departures else ():
+            if leg.arrival_airport == origin:
+                continue
+            queue.append((cost(leg, leg, leg.price), leg.arrives, counter, leg.price, (leg,)))
+            counter += 1
+        heapq.heapify(queue)
+
+        results = []
+        expanded = {}  # airport -> [(cost, arrives, legs)] already expanded there
+        expansions = 0
+        while queue and len(results) < limit and expansions < MAX_EXPANSIONS:
+            label_cost, arrives, _, price, legs = heapq.heappop(queue)
+            airport = legs[-1].arrival_airport
+            if airport == destination:
+                results.append((label_cost, price, legs))
+                continue
+            stops = len(legs) - 1
+            if stops >= max_stops:
+                continue
+            seen = expanded.setdefault(airport, [])
+            if any(c <= label_cost and a == arrives and n <= len(legs) for c, a, n in seen):
+                continue
+            seen.append((label_cost, arrives, len(legs)))
+            expansions += 1
+
+            visited = {leg.departure_airport for leg in legs}
+            # The last allowed leg has to land at the destination, so only look at that route
+            if stops + 1 == max_stops:
+                candidates = by_route.get((airport, destination))
+            else:
+                candidates = by_origin.get(airport)
+            if not candidates:
+                continue
+            for leg in candidates.between(arrives + min_gap, arrives + max_gap):
+                if leg.arrival_airport in visited:
+                    continue
+                total = price + leg.price
+                heapq.heappush(queue, (cost(legs[0], leg, total), leg.arrives, counter, total, legs + (leg,)))
+                counter += 1
+
+        return [self._itinerary(price, legs) for _, price, legs in results]
+
+    @staticmethod
+    def _itinerary(price, legs):
+        return {
+            "stops": len(legs) - 1,
+            "total_price": round(price, 2),
+            "total_duration_minutes": (legs[-1].arrives - legs[0].departs) // 60,
+            "departure_time": legs[0].departure_time,
+            "arrival_time": legs[-1].arrival_time,
+            "layovers_minutes": [(b.departs - a.arrives) // 60 for a, b in zip(legs, legs[1:])],
+            "legs": [{
+                "flight_number": leg.flight_number,
+                "airline": leg.airline,
+                "departure_airport": leg.departure_airport,
+                "arrival_airport": leg.arrival_airport,
+                "departure_time": leg.departure_time,
+                "arrival_time": leg.arrival_time,
+                "price": leg.price,
+            } for leg in legs],
+        }
+
+
+route_graph = RouteGraph(globalaccess.db.flights)
+
+
+@flight_changed.connect
+def _update_route_graph(flight_number, changes=None, seats_version=None, **kwargs):
+    route_graph.update(flight_number, changes, seats_version)
@@ -0,0 +1,27 @@
+import logging
+
+from blinker import Namespace
+
+_signals = Namespace()
+log = logging.getLogger('flightbooking.signals')
+
+# Sent with the flight_number as sender whenever a write changes a flight document.
+# Optional keyword arguments: changes - dict of the fields that changed and their new values;
+# seats_version - with a seats_available change, the flight's seats_version after the write. Seat
+# writes come from concurrent requests and their signals can arrive out of order; a subscriber
+# keeping the count drops values older than the version it already has.
+flight_changed = _signals.signal('flight-changed')
+
+
+def send_flight_changed(flight_number, changes=None, **kwargs):
+    """flight_changed.send(), except that a failing subscriber is logged and skipped.
+
+    Subscribers maintain derived views (caches, the route graph, the fare
+    calendar...); the write that triggered them has already happened and must
+    not be reported as failed because one of them could not keep up.
+    """
+    for receiver in flight_changed.receivers_for(flight_number):
+        try:
+            receiver(flight_number, changes=changes, **kwargs)
+        except Exception:
+            log.exception("flight_changed subscriber %r failed for %s", receiver, flight_number)
@@ -0,0 +1,167 @@
+import bisect
+import logging
+import threading
+import time
+
+import globalaccess
+from signals import flight_changed
+from airports import AIRPORTS, AIRLINES
+
+REBUILD_INTERVAL = 900   # seconds before a full reload corrects volumes and drops values no flight uses
+MAX_LIMIT = 20
+
+log = logging.getLogger('flightbooking.suggest')
+
+AIRLINE_CODES_BY_NAME = {name: code for code, name in AIRLINES.items()}
+SUGGEST_FIELDS = {"_id": 0, "departure_airport": 1, "arrival_airport": 1, "airline": 1}
+
+
+def _keys(*labels):
+    """Lower-cased search keys for a suggestion: every label, and every later word of a multi-word label"""
+    keys = set()
+    for label in labels:
+        if not label:
+            continue
+        words = str(label).lower().split()
+        for start in range(len(words)):
+            keys.add(" ".join(words[start:]))
+    return keys
+
+
+class SuggestLoading(Exception):
+    """The suggestion index is still being loaded; retry shortly"""
+
+
+class SuggestIndex:
+    """Sorted-array prefix index over airports (code and city) and airlines (name and code).
+
+    Suggestions are ranked by flight volume: departures plus arrivals for an
+    airport, flights operated for an airline. The index is loaded in a
+    background thread (started by warm(), or by the first lookup, which raises
+    SuggestLoading until it is ready) from three $group aggregations and fully
+    reloaded every REBUILD_INTERVAL seconds. In between, airports and airlines first seen in a flight_changed
+    write are inserted as they arrive; volumes of known ones are only
+    corrected by the next reload.
+    """
+
+    def __init__(self, collection, rebuild_interval=REBUILD_INTERVAL):
+        self.collection = collection
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        # (sorted search keys, (type, value) for each key, {(type, value): suggestion}),
+        # replaced as one tuple so lock-free readers always see a consistent index
+        self._index = ([], [], {})
+        self._loaded_at = None
+        self._rebuilding = False
+
+    # ------------------------------------------------------------------ maintenance
+    def _volumes(self):
+        volumes = {}
+        for field, kind in (("departure_airport", "airport"), ("arrival_airport", "airport"), ("airline", "airline")):
+            for row in self.collection.aggregate([{"$group": {"_id": "$" + field, "count": {"$sum": 1}}}]):
+                if row["_id"]:
+                    key = (kind, row["_id"])
+                    volumes[key] = volumes.get(key, 0) + row["count"]
+        return volumes
+
+    def load(self, volumes=None):
+        """Replace the index with the given {(type, value): flight count} (default: counted from db.flights)"""
+        if volumes is None:
+            volumes = self._volumes()
+        entries = {target: self._entry(target, count) for target, count in volumes.items()}
+        pairs = sorted((key, target) for target, entry in entries.items() for key in self._entry_keys(entry))
+        with self._lock:
+            self._index = ([key for key, _ in pairs], [target for _, target in pairs], entries)
+            self._loaded_at = time.monotonic()
+
+    @property
+    def ready(self):
+        return self._loaded_at is not None
+
+    def warm(self):
+        """Start loading the index in the background unless it is already loading"""
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._background_rebuild, daemon=True, name="suggest-index-load").start()
+
+    def ensure_loaded(self):
+        """Raise SuggestLoading until the first load is done; start a reload once the index is stale"""
+        if self._loaded_at is None:
+            self.warm()
+            raise SuggestLoading()
+        if time.monotonic() - self._loaded_at > self.rebuild_interval and not self._rebuilding:
+            # Serve from the current index while a fresh one is built in the background
+            self.warm()
+
+    def _background_rebuild(self):
+        try:
+            self.load()
+        except Exception:
+            log.exception("suggest index load failed; retrying on the next lookup")
+        finally:
+            self._rebuilding = False
+
+    def update(self, flight_number, changes=None):
+        """Index the airports and airline of a written flight if they are new"""
+        if self._loaded_at is None:
+            return
+        if changes is not None and set(changes) <= {"seats_available", "status", "gate", "rating"}:
+            return
+        flight = self.collection.find_one({"flight_number": flight_number}, SUGGEST_FIELDS)
+        if flight is None:
+            return
+        targets = [("airport", flight.get("departure_airport")), ("airport", flight.get("arrival_airport")),
+                   ("airline", flight.get("airline"))]
+        with self._lock:
+            for target in targets:
+                if target[1] and target not in self._index[2]:
+                    self._add(target)
+
+    def _add(self, target):
+        keys, targets, entries = self._index
+        keys, targets, entries = list(keys), list(targets), dict(entries)
+        entries[target] = entry = self._entry(target, 1)
+        for key in self._entry_keys(entry):
+            index = bisect.bisect_left(keys, key)
+            keys.insert(index, key)
+            targets.insert(index, target)
+        self._index = (keys, targets, entries)
+
+    @staticmethod
+    def _entry(target, count):
+        kind, value = target
+        if kind == "airport":
+            return {"type": "airport", "code": value, "city": AIRPORTS.get(value), "flights": count}
+        return {"type": "airline", "name": value, "code": AIRLINE_CODES_BY_NAME.get(value), "flights": count}
+
+    @staticmethod
+    def _entry_keys(entry):
+        if entry["type"] == "airport":
+            return _keys(entry["code"], entry["city"])
+        return _keys(entry["name"], entry["code"])
+
+    # ------------------------------------------------------------------ lookup
+    def suggest(self, prefix, limit=10, kind=None):
+        """Airports and airlines with a key starting with `prefix`, exact code matches first, then by volume"""
+        self.ensure_loaded()
+        prefix = " ".join(prefix.lower().split())
+        if not prefix:
+            return []
+        keys, targets, entries = self._index
+        start = bisect.bisect_left(keys, prefix)
+        stop = bisect.bisect_left(keys, prefix + "\uffff", start)
+        matches = {target for target in targets[start:stop] if kind is None or target[0] == kind}
+        ranked = sorted((entries[target] for target in matches),
+                        key=lambda entry: ((entry["code"] or "").lower() != prefix, -entry["flights"],
+                                           entry.get("code") or "", entry.get("name") or ""))
+        return ranked[:limit]
+
+
+suggest_index = SuggestIndex(globalaccess.db.flights)
+
+
+@flight_changed.connect
+def _update_suggest_index(flight_number, changes=None, **kwargs):
+    suggest_index.update(flight_number, changes)